@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Measures the throughput and peak memory of 'seqerakit' applying generated
+configurations against the stateful fake 'tw' in fake_tw.py.
+
+Every size is applied twice in a new child process with a fresh fake Platform:
+'apply' creates every resource, then 'reapply' runs the same configuration with
+'--on-exists ignore', so that every resource is found to exist already.
+
+Usage:
+    python benchmarks/bench_apply.py [--sizes 100,1000,10000] [--jobs 4]
+        [--latency 0] [--output results.json]
+        [--baseline results.json --max-regression 0.2]
+        [-- extra seqerakit options]
+
+With --baseline, exits with status 1 if the throughput of any run dropped, or
+its peak RSS grew, by more than --max-regression compared to the baseline.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_executor import install_fake_tw  # noqa: E402
+from seqerakit.bench import dump, generate_config as generate  # noqa: E402
+
+# Resources per workspace in generated configurations
+RESOURCES_PER_WORKSPACE = 50
+
+
+def generate_config(size):
+    """
+    Returns a configuration of about 'size' resources: an organization and
+    workspaces, each holding a credential, a compute environment and pipelines.
+    """
+    workspaces = max(1, size // RESOURCES_PER_WORKSPACE)
+    return generate(
+        workspaces=workspaces,
+        credentials_per_ws=1,
+        compute_envs_per_ws=1,
+        pipelines_per_ws=max(1, size // workspaces - 3),
+    )
+
+
+def peak_rss_mb(usage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / scale
+
+
+def run_child(result_path, args):
+    """
+    Runs seqerakit in this process and writes its duration and peak RSS.
+    """
+    from seqerakit import cli
+
+    start = time.perf_counter()
+    status = 0
+    try:
+        cli.main(args)
+    except SystemExit as err:
+        status = err.code or 0
+    elapsed = time.perf_counter() - start
+    with open(result_path, "w") as f:
+        json.dump(
+            {
+                "seconds": elapsed,
+                "peak_rss_mb": peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF)),
+                "status": status,
+            },
+            f,
+        )
+
+
+def bench(config_path, state_path, seqerakit_args):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    env = dict(os.environ, FAKE_TW_STATE=state_path, BENCH_TOKEN="token")
+    try:
+        subprocess.run(
+            [sys.executable, __file__, "--child", result_path, "--"]
+            + [config_path, "--log_level", "WARNING"]
+            + seqerakit_args,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(result_path) as f:
+            result = json.load(f)
+    finally:
+        os.remove(result_path)
+    if result["status"]:
+        raise RuntimeError(f"seqerakit exited with status {result['status']}")
+    return result
+
+
+def check_regressions(results, baseline, max_regression):
+    failures = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result["resources_per_second"] < previous["resources_per_second"] * (
+            1 - max_regression
+        ):
+            failures.append(
+                f"{key}: {result['resources_per_second']:.1f} resources/s, "
+                f"baseline {previous['resources_per_second']:.1f}"
+            )
+        if result["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + max_regression):
+            failures.append(
+                f"{key}: peak RSS {result['peak_rss_mb']:.1f} MB, "
+                f"baseline {previous['peak_rss_mb']:.1f} MB"
+            )
+    return failures
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] == "--child":
+        run_child(args[1], args[3:])
+        return
+
+    extra = []
+    if "--" in args:
+        extra = args[args.index("--") + 1 :]
+        args = args[: args.index("--")]
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the results to a JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results of a JSON file.")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    options = parser.parse_args(args)
+
+    os.environ["FAKE_TW_LATENCY"] = str(options.latency)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        install_fake_tw(tmp)
+        for size in [int(size) for size in options.sizes.split(",")]:
+            config_path = os.path.join(tmp, f"config-{size}.yaml")
+            config = generate_config(size)
+            resources = sum(len(items) for items in config.values())
+            with open(config_path, "w") as f:
+                dump(config, f)
+            state_path = os.path.join(tmp, f"state-{size}.db")
+            jobs = ["--jobs", str(options.jobs)]
+            phases = {
+                "apply": jobs,
+                "reapply": jobs + ["--on-exists", "ignore"],
+            }
+            for phase, phase_args in phases.items():
+                result = bench(config_path, state_path, phase_args + extra)
+                result["resources"] = resources
+                result["resources_per_second"] = resources / result["seconds"]
+                results[f"{phase}-{size}"] = result
+                print(
+                    f"{phase:>8} {resources:>6} resources: {result['seconds']:8.2f}s, "
+                    f"{result['resources_per_second']:8.1f} resources/s, "
+                    f"peak RSS {result['peak_rss_mb']:7.1f} MB",
+                    flush=True,
+                )
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            failures = check_regressions(results, json.load(f), options.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Compares the fork-per-command and batch executors against a fake 'tw'.
+
+Usage:
+    python benchmarks/bench_executor.py [--commands 200] [--workers 1]
+"""
+
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from seqerakit import seqeraplatform
+from seqerakit.executor import get_executor
+
+FAKE_TW = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_tw.py")
+
+
+def install_fake_tw(bin_dir):
+    """
+    Writes a 'tw' shim into bin_dir that runs fake_tw.py and prepends
+    bin_dir to PATH.
+    """
+    shim = os.path.join(bin_dir, "tw")
+    with open(shim, "w") as f:
+        # Skip site initialization to keep the startup of the fake 'tw' short
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" -I -S "{FAKE_TW}" "$@"\n')
+    os.chmod(shim, os.stat(shim).st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+
+def bench(executor, commands, workers):
+    sp = seqeraplatform.SeqeraPlatform(
+        print_stdout=False, json=True, executor=get_executor(executor, workers=workers)
+    )
+    start = time.perf_counter()
+    try:
+        with sp.suppress_output():
+            for i in range(commands):
+                sp.pipelines("list", "-w", f"org/ws{i % 10}")
+    finally:
+        sp.close()
+    return time.perf_counter() - start
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    options = parser.parse_args(args)
+
+    with tempfile.TemporaryDirectory() as bin_dir:
+        install_fake_tw(bin_dir)
+        results = {
+            name: bench(name, options.commands, options.workers)
+            for name in ("fork", "batch")
+        }
+
+    for name, elapsed in results.items():
+        print(
+            f"{name:>6}: {elapsed:8.3f}s total, "
+            f"{elapsed / options.commands * 1000:7.2f} ms/command"
+        )
+    print(f"speedup: {results['fork'] / results['batch']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
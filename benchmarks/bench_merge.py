@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Measures the time to merge the configurations of many files, to check that it
+grows linearly with the number of resources.
+
+Usage:
+    python benchmarks/bench_merge.py [--sizes 10000,100000] [--files 1000]
+"""
+
+import argparse
+import sys
+import time
+
+from seqerakit.bench import generate_parts
+from seqerakit.merge import MergeEngine
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--files", type=int, default=1000)
+    options = parser.parse_args(args)
+
+    for size in [int(size) for size in options.sizes.split(",")]:
+        # One workspace of 50 resources per part, parts spread over the files
+        parts = generate_parts(workspaces=max(1, size // 50), pipelines_per_ws=46)
+        files = [[] for _ in range(min(options.files, len(parts)))]
+        for i, part in enumerate(parts):
+            files[i % len(files)].append(part)
+        configs = []
+        for file_parts in files:
+            config = {}
+            for part in file_parts:
+                for block, items in part.items():
+                    config.setdefault(block, []).extend(items)
+            configs.append(config)
+        resources = sum(len(items) for part in parts for items in part.values())
+
+        engine = MergeEngine()
+        start = time.perf_counter()
+        for i, config in enumerate(configs):
+            engine.add(config, f"file-{i}.yml")
+        elapsed = time.perf_counter() - start
+        print(
+            f"{resources:>8} resources in {len(configs):>5} files: {elapsed:7.3f}s, "
+            f"{elapsed / resources * 1e6:6.2f} us/resource",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Compares existence checks against a synthetic 'tw pipelines list' payload using
+the previous string-based lookup (utils.check_if_exists) and the ResourceIndex
+used by Overwrite.
+
+Usage:
+    python benchmarks/bench_overwrite.py [--entries 10000] [--checks 200]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from seqerakit import utils
+from seqerakit.overwrite import ResourceIndex
+
+
+def pipelines_list(entries):
+    return json.dumps(
+        {
+            "pipelines": [
+                {
+                    "pipelineId": i,
+                    "name": f"pipeline-{i}",
+                    "description": f"Synthetic pipeline {i}",
+                    "repository": "https://github.com/nextflow-io/hello",
+                    "labels": [{"id": i, "name": f"label-{i % 50}", "value": None}],
+                }
+                for i in range(entries)
+            ]
+        }
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=200)
+    options = parser.parse_args(args)
+
+    # check_if_exists() logs every lookup
+    logging.disable(logging.INFO)
+
+    payload = pipelines_list(options.entries)
+    # Look up names spread over the whole list, plus some that do not exist
+    names = [
+        f"pipeline-{(i * 7919) % (options.entries * 2)}" for i in range(options.checks)
+    ]
+
+    start = time.perf_counter()
+    expected = [bool(utils.check_if_exists(payload, "name", n)) for n in names]
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ResourceIndex(payload)
+    found = [index.exists("name", n) for n in names]
+    indexed = time.perf_counter() - start
+
+    assert found == expected
+    print(f"payload: {options.entries} pipelines, {len(payload) / 1e6:.1f} MB")
+    print(f" legacy: {legacy:8.3f}s for {options.checks} checks")
+    print(f"indexed: {indexed:8.3f}s for {options.checks} checks (incl. parsing)")
+    print(f"speedup: {legacy / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
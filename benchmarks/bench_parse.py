@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Measures the time to load and parse a generated configuration with the pure
+Python and libyaml implementations of PyYAML.
+
+Usage:
+    python benchmarks/bench_parse.py [--workspaces 200] [--pipelines-per-ws 50]
+        [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import yaml
+
+from seqerakit import helper, yaml_io
+from seqerakit.bench import SECRET_ENV_VAR, dump, generate_config
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load_with(loader, path):
+    with open(path) as f:
+        return yaml.load(f, Loader=loader)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workspaces", type=int, default=200)
+    parser.add_argument("--pipelines-per-ws", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(args)
+
+    os.environ.setdefault(SECRET_ENV_VAR, "token")
+    config = generate_config(
+        workspaces=options.workspaces, pipelines_per_ws=options.pipelines_per_ws
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "config.yml")
+        with open(path, "w") as f:
+            dump(config, f)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        resources = sum(len(items) for items in config.values())
+        print(f"{resources} resources, {size_mb:.1f} MB, backend {yaml_io.BACKEND}")
+
+        loaders = {"pure Python": yaml.SafeLoader}
+        if yaml.__with_libyaml__:
+            loaders["libyaml"] = yaml.CSafeLoader
+        for name, loader in loaders.items():
+            load = best_of(options.repeat, lambda: load_with(loader, path))
+            # parse_all_yaml writes the params of pipelines to temporary files
+            with patch.object(yaml_io, "SafeLoader", loader), patch.object(
+                tempfile, "tempdir", tmp
+            ):
+                parse = best_of(options.repeat, lambda: helper.parse_all_yaml([path]))
+            print(f"{name:>12}: load {load:7.3f}s, parse_all_yaml {parse:7.3f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+"""
+Stand-in for the 'tw' CLI used by the seqerakit benchmarks.
+
+Without FAKE_TW_STATE, every command succeeds: 'list' subcommands print an
+empty list and anything else prints a confirmation message.
+
+With FAKE_TW_STATE set to the path of a SQLite database, resources are stored
+per block, workspace or organization and name, so that 'add' fails for existing
+resources, 'delete' and 'update' fail for missing ones, and 'list' prints the
+stored resources with fields shaped like the output of 'tw -o json'. Concurrent
+invocations share the database safely.
+
+Environment variables:
+    FAKE_TW_STATE: Path of the SQLite database holding the resources.
+    FAKE_TW_LATENCY: Seconds every command sleeps for (default 0).
+    FAKE_TW_LATENCY_JITTER: Maximum random seconds added to the latency
+    (default 0).
+    FAKE_TW_ERROR_RATE: Fraction of commands failing with a transient HTTP 503
+    error (default 0).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+# Key of the list in the JSON output of 'tw <block> list'
+LIST_KEYS = {
+    "compute-envs": "computeEnvs",
+    "data-links": "dataLinks",
+    "secrets": "pipelineSecrets",
+}
+
+# Options holding the name of a resource, by block
+NAME_OPTIONS = {"members": ("--user",)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    block TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    options TEXT NOT NULL,
+    UNIQUE (block, scope, name)
+)
+"""
+
+
+class CommandFailed(Exception):
+    pass
+
+
+def split_command(argv):
+    """
+    Returns the arguments of a command without the global options preceding
+    the block (e.g. '-o json'), and whether JSON output was requested.
+    """
+    json_output = False
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        if argv[i] == "-o" and i + 1 < len(argv):
+            json_output = argv[i + 1] == "json"
+            i += 2
+        else:
+            i += 1
+    return argv[i:], json_output
+
+
+def parse_options(args):
+    """
+    Returns the '--option value' pairs of a command as a dictionary, where
+    options without a value are set to True, and the positional arguments.
+    """
+    options = {}
+    positional = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith("-") and "=" in arg:
+            key, value = arg.split("=", 1)
+            options[key] = value
+        elif arg.startswith("-"):
+            if i + 1 < len(args) and not args[i + 1].startswith("-"):
+                options[arg] = args[i + 1]
+                i += 1
+            else:
+                options[arg] = True
+        else:
+            positional.append(arg)
+        i += 1
+    return options, positional
+
+
+def option(options, *names, default=None):
+    for name in names:
+        if name in options:
+            return options[name]
+    return default
+
+
+def scope_of(options):
+    return option(
+        options, "--workspace", "-w", default=option(options, "--organization", "-o")
+    )
+
+
+def name_of(block, options):
+    return option(options, *NAME_OPTIONS.get(block, ("--name", "-n")))
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # Durability is not needed for a benchmark, only consistency
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute(SCHEMA)
+    return connection
+
+
+def to_record(block, resource_id, scope, name, options):
+    """
+    Returns a resource as listed by 'tw -o json <block> list'.
+    """
+    timestamp = "2024-01-01T00:00:00Z"
+    if block == "organizations":
+        return {
+            "orgId": resource_id,
+            "orgName": name,
+            "orgFullName": options.get("--full-name", name),
+            "description": options.get("--description"),
+        }
+    if block == "workspaces":
+        return {
+            "orgId": 1,
+            "orgName": scope,
+            "workspaceId": resource_id,
+            "workspaceName": name,
+            "workspaceFullName": options.get("--full-name", name),
+            "visibility": options.get("--visibility", "PRIVATE"),
+        }
+    if block == "members":
+        return {
+            "memberId": resource_id,
+            "email": name,
+            "userName": name.split("@")[0],
+            "role": "member",
+        }
+    if block == "participants":
+        record = {
+            "participantId": resource_id,
+            "type": options.get("--type", "MEMBER"),
+            "wspRole": str(options.get("--role", "launch")).lower(),
+        }
+        record["teamName" if record["type"] == "TEAM" else "email"] = name
+        return record
+    if block == "teams":
+        return {
+            "teamId": resource_id,
+            "name": name,
+            "description": options.get("--description"),
+            "membersCount": 0,
+        }
+    if block == "labels":
+        return {
+            "id": resource_id,
+            "name": name,
+            "value": options.get("--value"),
+            "resource": "--value" in options,
+            "isDefault": False,
+        }
+    if block == "pipelines":
+        return {
+            "pipelineId": resource_id,
+            "name": name,
+            "description": options.get("--description"),
+            "icon": "https://raw.githubusercontent.com/nextflow-io/trademark/main/"
+            "nextflow-icon-128x128.png",
+            "repository": options.get("repository"),
+            "userId": 1,
+            "userName": "bench",
+            "userFirstName": None,
+            "userLastName": None,
+            "orgId": 1,
+            "orgName": scope.split("/")[0],
+            "workspaceId": 1,
+            "workspaceName": scope.split("/")[-1],
+            "visibility": "PRIVATE",
+            "deleted": False,
+            "lastUpdated": timestamp,
+            "optimizationId": None,
+            "optimizationTargets": None,
+            "optimizationStatus": None,
+            "labels": [],
+            "computeEnv": None,
+        }
+    if block == "compute-envs":
+        return {
+            "id": f"ce{resource_id}",
+            "name": name,
+            "platform": options.get("platform", "aws-batch"),
+            "status": "AVAILABLE",
+            "message": None,
+            "lastUsed": None,
+            "primary": False,
+            "workspaceName": scope.split("/")[-1],
+            "visibility": "SHARED",
+            "workDir": options.get("--work-dir"),
+            "region": options.get("--region"),
+        }
+    return {
+        "id": str(resource_id),
+        "name": name,
+        "description": options.get("--description"),
+        "provider": options.get("provider"),
+        "dateCreated": timestamp,
+        "lastUpdated": timestamp,
+    }
+
+
+def run(connection, args, json_output):
+    block = args[0] if args else ""
+    subcommand = args[1] if len(args) > 1 else None
+    options, positional = parse_options(args[2:])
+    scope = scope_of(options) or ""
+
+    if block == "info":
+        return "Seqera Platform (fake) - connection OK"
+    if block == "launch":
+        scope = scope_of(parse_options(args[1:])[0]) or ""
+        return f"Workflow {random.getrandbits(48):012x} submitted at [{scope}]"
+    if subcommand == "url":
+        return f"https://fake.cloud.seqera.io/datasets/{name_of(block, options)}"
+
+    if subcommand == "list":
+        rows = connection.execute(
+            "SELECT id, scope, name, options FROM resources "
+            "WHERE block = ? AND scope = ? ORDER BY id",
+            (block, scope),
+        ).fetchall()
+        records = [
+            to_record(block, resource_id, row_scope, name, json.loads(stored))
+            for resource_id, row_scope, name, stored in rows
+        ]
+        return json.dumps({LIST_KEYS.get(block, block): records})
+
+    name = name_of(block, options)
+    if subcommand in ("add", "import", "create"):
+        if not name:
+            raise CommandFailed("ERROR: Missing required option '--name'")
+        # The type of credentials or compute-envs, or the repository of pipelines
+        if positional and block == "pipelines":
+            options["repository"] = positional[-1]
+        elif positional:
+            options["provider"] = options["platform"] = positional[0]
+        try:
+            connection.execute(
+                "INSERT INTO resources (block, scope, name, options) "
+                "VALUES (?, ?, ?, ?)",
+                (block, scope, name, json.dumps(options)),
+            )
+        except sqlite3.IntegrityError:
+            raise CommandFailed(f"ERROR: A {block} with name '{name}' already exists")
+        if json_output:
+            return json.dumps({"name": name, "workspace": scope})
+        return f"New {block} '{name}' added at [{scope}]"
+
+    if subcommand in ("delete", "update"):
+        resource_id = option(options, "--id")
+        if resource_id is not None:
+            digits = "".join(c for c in str(resource_id) if c.isdigit())
+            where, params = "block = ? AND id = ?", (block, int(digits or 0))
+        else:
+            where, params = "block = ? AND scope = ? AND name = ?", (block, scope, name)
+        row = connection.execute(
+            f"SELECT id, options FROM resources WHERE {where}", params
+        ).fetchone()
+        if row is None:
+            raise CommandFailed(f"ERROR: {block} '{name or resource_id}' not found")
+        if subcommand == "delete":
+            connection.execute("DELETE FROM resources WHERE id = ?", (row[0],))
+        else:
+            stored = {**json.loads(row[1]), **options}
+            connection.execute(
+                "UPDATE resources SET options = ? WHERE id = ?",
+                (json.dumps(stored), row[0]),
+            )
+        return f"{block} '{name or resource_id}' {subcommand}d at [{scope}]"
+
+    return f"OK: {' '.join(args)}"
+
+
+def main(argv):
+    latency = float(os.environ.get("FAKE_TW_LATENCY", "0"))
+    latency += random.uniform(0, float(os.environ.get("FAKE_TW_LATENCY_JITTER", "0")))
+    time.sleep(latency)
+
+    if random.random() < float(os.environ.get("FAKE_TW_ERROR_RATE", "0")):
+        print("ERROR: Unexpected response: 503 Service Unavailable")
+        return 1
+
+    args, json_output = split_command(argv)
+    state = os.environ.get("FAKE_TW_STATE")
+    if not state:
+        if len(args) >= 2 and args[1] == "list":
+            print(json.dumps({LIST_KEYS.get(args[0], args[0]): []}))
+        else:
+            print(f"OK: {' '.join(args)}")
+        return 0
+
+    connection = connect(state)
+    try:
+        print(run(connection, args, json_output))
+    except CommandFailed as err:
+        print(err)
+        return 1
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,380 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Generator of large synthetic YAML configurations for scale testing, run with
+'seqerakit-bench generate'.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+
+from seqerakit import yaml_io
+
+# Order of the blocks in generated files, following the templates
+BLOCKS = (
+    "organizations",
+    "workspaces",
+    "credentials",
+    "compute-envs",
+    "pipelines",
+    "launch",
+)
+
+# Environment variable referenced by the secrets of generated credentials
+SECRET_ENV_VAR = "BENCH_TOKEN"
+
+REGIONS = ("eu-west-1", "eu-central-1", "us-east-1", "us-west-2")
+PROVISIONING_MODELS = ("SPOT", "EC2")
+MAX_CPUS = (100, 500, 1000)
+REPOSITORIES = (
+    "nf-core/rnaseq",
+    "nf-core/sarek",
+    "nf-core/chipseq",
+    "nf-core/atacseq",
+    "nf-core/fetchngs",
+    "nextflow-io/hello",
+)
+REVISIONS = ("main", "master", "dev")
+PROFILES = ("test", "docker", "test,docker")
+REGISTRIES = ("docker.io", "quay.io", "ghcr.io")
+
+
+def _credentials(rng, org, workspace, index, count):
+    """
+    Returns the credentials of a workspace. The first ones are AWS credentials
+    used by the compute environments, the others are for Git or container
+    registries.
+    """
+    secret = f"${SECRET_ENV_VAR}"
+    credentials = []
+    for c in range(count):
+        kind = "aws" if c == 0 else rng.choice(("github", "container-reg"))
+        item = {
+            "type": kind,
+            "name": f"ws-{index}-{kind}-{c}",
+            "workspace": f"{org}/{workspace}",
+        }
+        if kind == "aws":
+            item.update({"access-key": secret, "secret-key": secret})
+        else:
+            item.update({"username": "bench", "password": secret})
+        if kind == "container-reg":
+            item["registry"] = rng.choice(REGISTRIES)
+        credentials.append(item)
+    return credentials
+
+
+def generate_workspace(
+    index,
+    organizations=1,
+    credentials_per_ws=2,
+    compute_envs_per_ws=1,
+    pipelines_per_ws=10,
+    launches_per_ws=0,
+    seed=0,
+):
+    """
+    Returns the configuration of one workspace and the resources it holds.
+
+    Compute environments use the AWS credentials of the workspace, pipelines
+    one of its compute environments and launches one of its pipelines. The
+    random choices only depend on the seed and the index of the workspace, so
+    that a workspace is the same whatever the number of workspaces generated.
+    """
+    rng = random.Random(f"{seed}:{index}")
+    org = f"bench-org-{index % organizations}"
+    workspace = f"ws-{index}"
+    full_name = f"{org}/{workspace}"
+    work_dir = f"s3://{org}-bucket/{workspace}"
+
+    config = {
+        "workspaces": [
+            {
+                "name": workspace,
+                "full-name": f"Benchmark workspace {index}",
+                "organization": org,
+                "description": f"Workspace {index} generated by seqerakit-bench",
+                "visibility": "PRIVATE",
+            }
+        ],
+        "credentials": _credentials(rng, org, workspace, index, credentials_per_ws),
+        "compute-envs": [],
+        "pipelines": [],
+        "launch": [],
+    }
+
+    for c in range(compute_envs_per_ws):
+        config["compute-envs"].append(
+            {
+                "type": "aws-batch",
+                "config-mode": "forge",
+                "name": f"ws-{index}-ce-{c}",
+                "workspace": full_name,
+                "credentials": config["credentials"][0]["name"],
+                "region": rng.choice(REGIONS),
+                "work-dir": f"{work_dir}/work",
+                "provisioning-model": rng.choice(PROVISIONING_MODELS),
+                "max-cpus": rng.choice(MAX_CPUS),
+            }
+        )
+    compute_envs = [ce["name"] for ce in config["compute-envs"]]
+
+    for p in range(pipelines_per_ws):
+        name = f"ws-{index}-pipeline-{p}"
+        pipeline = {
+            "name": name,
+            "workspace": full_name,
+            "description": f"Pipeline {p} of workspace {index}",
+            "compute-env": rng.choice(compute_envs),
+            "work-dir": f"{work_dir}/work",
+            "profile": rng.choice(PROFILES),
+            "revision": rng.choice(REVISIONS),
+            "url": f"https://github.com/{rng.choice(REPOSITORIES)}",
+        }
+        if rng.random() < 0.5:
+            pipeline["params"] = {"outdir": f"{work_dir}/results/{name}"}
+        config["pipelines"].append(pipeline)
+    pipelines = [pipeline["name"] for pipeline in config["pipelines"]]
+
+    for n in range(launches_per_ws):
+        name = f"ws-{index}-launch-{n}"
+        config["launch"].append(
+            {
+                "name": name,
+                "workspace": full_name,
+                "pipeline": rng.choice(pipelines),
+                "params": {"outdir": f"{work_dir}/results/{name}"},
+            }
+        )
+
+    return {block: items for block, items in config.items() if items}
+
+
+def generate_parts(
+    workspaces=10,
+    organizations=1,
+    credentials_per_ws=2,
+    compute_envs_per_ws=1,
+    pipelines_per_ws=10,
+    launches_per_ws=0,
+    seed=0,
+):
+    """
+    Returns the configuration split in parts: the organizations, then one part
+    per workspace generated by generate_workspace().
+    """
+    if workspaces < 1 or organizations < 1:
+        raise ValueError("At least one workspace and organization are needed.")
+    if organizations > workspaces:
+        raise ValueError("There cannot be more organizations than workspaces.")
+    counts = {
+        "credentials_per_ws": credentials_per_ws,
+        "compute_envs_per_ws": compute_envs_per_ws,
+        "pipelines_per_ws": pipelines_per_ws,
+        "launches_per_ws": launches_per_ws,
+    }
+    if any(count < 0 for count in counts.values()):
+        raise ValueError("The number of resources per workspace cannot be negative.")
+    if counts["compute_envs_per_ws"] and not counts["credentials_per_ws"]:
+        raise ValueError("Compute environments need credentials in each workspace.")
+    if counts["pipelines_per_ws"] and not counts["compute_envs_per_ws"]:
+        raise ValueError("Pipelines need a compute environment in each workspace.")
+    if counts["launches_per_ws"] and not counts["pipelines_per_ws"]:
+        raise ValueError("Launches need a pipeline in each workspace.")
+
+    parts = [
+        {
+            "organizations": [
+                {
+                    "name": f"bench-org-{o}",
+                    "full-name": f"Benchmark organization {o}",
+                    "description": "Organization generated by seqerakit-bench",
+                }
+                for o in range(organizations)
+            ]
+        }
+    ]
+    for index in range(workspaces):
+        parts.append(
+            generate_workspace(index, organizations=organizations, seed=seed, **counts)
+        )
+    return parts
+
+
+def merge_parts(parts):
+    """
+    Returns a configuration holding the resources of all parts, with the
+    blocks in the order of BLOCKS.
+    """
+    config = {}
+    for block in BLOCKS:
+        items = [item for part in parts for item in part.get(block, [])]
+        if items:
+            config[block] = items
+    return config
+
+
+def generate_config(**options):
+    """
+    Returns a configuration in a single dictionary. Takes the options of
+    generate_parts().
+    """
+    return merge_parts(generate_parts(**options))
+
+
+def dump(config, stream=None):
+    return yaml_io.dump(config, stream, sort_keys=False)
+
+
+def write_files(parts, output, files=1, dirs=0):
+    """
+    Writes the parts of a configuration to 'files' files in the output
+    directory, spread over 'dirs' subdirectories if dirs is not 0, and returns
+    their paths. Workspaces are assigned to files in turn, and the extensions
+    alternate between '.yml' and '.yaml'.
+    """
+    if files < 1 or dirs < 0:
+        raise ValueError("At least one file is needed and dirs cannot be negative.")
+    if os.path.isdir(output) and os.listdir(output):
+        raise ValueError(f"The output directory '{output}' is not empty.")
+
+    assigned = [[] for _ in range(files)]
+    for i, part in enumerate(parts):
+        # The organizations come first and go with the first workspace
+        assigned[max(0, i - 1) % files].append(part)
+
+    paths = []
+    for f, file_parts in enumerate(assigned):
+        if not file_parts:
+            continue
+        directory = os.path.join(output, f"dir-{f % dirs}") if dirs else output
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"config-{f}.{'yml' if f % 2 == 0 else 'yaml'}")
+        with open(path, "w") as stream:
+            dump(merge_parts(file_parts), stream)
+        paths.append(path)
+    return paths
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Tools for scale testing of seqerakit."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser(
+        "generate",
+        help="Generate a large synthetic YAML configuration.",
+        description="Generate a synthetic YAML configuration of workspaces, "
+        "credentials, compute environments, pipelines and launches referencing "
+        "each other. Credentials read their secrets from the environment "
+        f"variable {SECRET_ENV_VAR}.",
+    )
+    generate.add_argument(
+        "--workspaces", type=int, default=10, help="Number of workspaces."
+    )
+    generate.add_argument(
+        "--organizations",
+        type=int,
+        default=1,
+        help="Number of organizations the workspaces are spread over.",
+    )
+    generate.add_argument(
+        "--credentials-per-ws",
+        type=int,
+        default=2,
+        help="Number of credentials per workspace.",
+    )
+    generate.add_argument(
+        "--compute-envs-per-ws",
+        type=int,
+        default=1,
+        help="Number of compute environments per workspace.",
+    )
+    generate.add_argument(
+        "--pipelines-per-ws",
+        type=int,
+        default=10,
+        help="Number of pipelines per workspace.",
+    )
+    generate.add_argument(
+        "--launches-per-ws",
+        type=int,
+        default=0,
+        help="Number of pipeline launches per workspace.",
+    )
+    generate.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the random choices, the same seed generates the same files.",
+    )
+    generate.add_argument(
+        "--output",
+        "-o",
+        help="Directory to write the YAML files to. Print a single configuration "
+        "to stdout if not given.",
+    )
+    generate.add_argument(
+        "--files",
+        type=int,
+        default=1,
+        help="Number of YAML files to split the configuration into.",
+    )
+    generate.add_argument(
+        "--dirs",
+        type=int,
+        default=0,
+        help="Number of subdirectories of the output directory to spread the "
+        "YAML files over.",
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(args if args is not None else sys.argv[1:])
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        parts = generate_parts(
+            workspaces=options.workspaces,
+            organizations=options.organizations,
+            seed=options.seed,
+            credentials_per_ws=options.credentials_per_ws,
+            compute_envs_per_ws=options.compute_envs_per_ws,
+            pipelines_per_ws=options.pipelines_per_ws,
+            launches_per_ws=options.launches_per_ws,
+        )
+        if options.output is None:
+            if options.files != 1 or options.dirs:
+                raise ValueError("'--files' and '--dirs' need an '--output' directory.")
+            dump(merge_parts(parts), sys.stdout)
+            return
+        paths = write_files(parts, options.output, options.files, options.dirs)
+    except ValueError as err:
+        logging.error(err)
+        sys.exit(1)
+
+    resources = sum(len(items) for part in parts for items in part.values())
+    logging.info(
+        f" Generated {resources} resources in {len(paths)} files in {options.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cache for the output of read-only 'tw' commands (e.g. 'list', 'view', 'info').
+
+Entries are kept in an in-memory LRU and, optionally, in a directory on disk so
+that they can be reused by runs a few minutes apart. Any other command
+invalidates the entries of the workspace or organization it applies to.
+
+Identical read-only commands running at the same time are coalesced into a
+single subprocess with SingleFlight and AsyncSingleFlight.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from seqerakit import tracing
+from seqerakit.helper import find_option
+
+# Subcommands that do not change anything on Seqera Platform
+READ_ONLY_SUBCOMMANDS = {"list", "view", "url"}
+READ_ONLY_COMMANDS = {"info"}
+
+# Environment variables selecting the Seqera Platform instance and user
+ENVIRONMENT_VARIABLES = ("TOWER_API_ENDPOINT", "TOWER_ACCESS_TOKEN")
+
+
+def _environment_digest():
+    digest = hashlib.sha256()
+    for name in ENVIRONMENT_VARIABLES:
+        digest.update(f"{name}={os.environ.get(name, '')}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def command_name(command):
+    """
+    Returns the (block, subcommand) of a 'tw' command, e.g. ("pipelines", "list").
+    """
+    args = list(command)
+    if args[:2] == ["-o", "json"]:
+        args = args[2:]
+    block = args[0] if args else None
+    subcommand = args[1] if len(args) > 1 else None
+    return block, subcommand
+
+
+def command_scope(command):
+    """
+    Returns the workspace or organization a 'tw' command applies to, or None if
+    it applies to the whole Platform instance (e.g. 'organizations add').
+    """
+    args = list(command)
+    if args[:2] == ["-o", "json"]:
+        args = args[2:]
+    scope = find_option(args[1:], {"-w", "--workspace"}) or find_option(
+        args[1:], {"-o", "--organization"}
+    )
+    return os.path.expandvars(scope) if scope else None
+
+
+def command_key(full_cmd):
+    """
+    Returns a key identifying a constructed command, with its environment
+    variables expanded, on the current Platform endpoint and access token.
+    """
+    if isinstance(full_cmd, list):
+        full_cmd = json.dumps(full_cmd)
+    data = f"{_environment_digest()}\0{os.path.expandvars(full_cmd)}"
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def is_read_only(command):
+    block, subcommand = command_name(command)
+    return block in READ_ONLY_COMMANDS or subcommand in READ_ONLY_SUBCOMMANDS
+
+
+def _organization(scope):
+    return scope.split("/", 1)[0]
+
+
+def _affects(mutated_scope, scope):
+    """
+    Returns True if a command changing mutated_scope may change the output of a
+    command reading scope. Changes to a workspace can show in lists of its
+    organization, and changes to an organization in lists of its workspaces.
+    """
+    if mutated_scope is None or scope is None:
+        return True
+    if "/" in mutated_scope:
+        return scope in (mutated_scope, _organization(mutated_scope))
+    return _organization(scope) == mutated_scope
+
+
+class ResultCache:
+    """
+    A cache of the output of read-only 'tw' commands, keyed by the command line
+    and a hash of the Platform endpoint and access token.
+
+    Args:
+        max_entries: Number of entries kept in memory, the least recently used
+        entries are evicted first.
+        ttl: Seconds after which entries expire, or None for no expiry.
+        cache_dir: Optional directory where entries are also stored, so that
+        they can be reused by later runs until they expire.
+    """
+
+    def __init__(self, max_entries=256, ttl=None, cache_dir=None):
+        if cache_dir is not None and ttl is None:
+            raise ValueError("A ttl is required to cache results on disk.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Incremented by every invalidation, see put()
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._disk_scopes = None
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+    def key(self, full_cmd):
+        """
+        Returns the cache key of a constructed command.
+        """
+        return command_key(full_cmd)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """
+        Returns the cached output for a key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry["created"]):
+                del self._entries[key]
+                entry = None
+            if entry is None and self.cache_dir is not None:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["output"]
+
+    def put(self, key, command, output, generation=None):
+        """
+        Stores the output of a successful read-only command. If the generation
+        read before running the command is given, the output is not stored when
+        an invalidation happened in the meantime, as it may predate a change
+        made by a concurrent command.
+        """
+        entry = {
+            "created": time.time(),
+            "scope": command_scope(command),
+            "output": output,
+        }
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remember(key, entry)
+            if self.cache_dir is not None:
+                self._write_disk(key, entry)
+
+    def invalidate(self, command):
+        """
+        Drops the entries whose output may have been changed by a command.
+        """
+        mutated_scope = command_scope(command)
+        with self._lock:
+            keys = {
+                key
+                for key, entry in self._entries.items()
+                if _affects(mutated_scope, entry["scope"])
+            }
+            if self.cache_dir is not None:
+                keys.update(
+                    key
+                    for key, scope in self._load_disk_scopes().items()
+                    if _affects(mutated_scope, scope)
+                )
+            for key in keys:
+                self._entries.pop(key, None)
+                if self.cache_dir is not None:
+                    self._remove_disk(key)
+            self.invalidations += len(keys)
+            self.generation += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry.get("created", 0)):
+            self._remove_disk(key)
+            return None
+        return entry
+
+    def _write_disk(self, key, entry):
+        try:
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.cache_dir, delete=False, suffix=".tmp"
+            ) as f:
+                json.dump(entry, f)
+            os.replace(f.name, self._path(key))
+        except OSError as err:
+            logging.debug(f" Could not write cache entry to {self.cache_dir}: {err}")
+            return
+        if self._disk_scopes is not None:
+            self._disk_scopes[key] = entry["scope"]
+
+    def _remove_disk(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        if self._disk_scopes is not None:
+            self._disk_scopes.pop(key, None)
+
+    def _load_disk_scopes(self):
+        # Read the scope of the entries on disk once, then keep it up to date
+        if self._disk_scopes is None:
+            self._disk_scopes = {}
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                key = name[: -len(".json")]
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._disk_scopes[key] = entry.get("scope")
+        return self._disk_scopes
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key, so that only the first caller
+    runs the function and the others wait for and share its result, or its
+    exception.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            logging.debug(" Waiting for an identical command already running")
+            with tracing.span("wait for identical command", "wait"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Same as SingleFlight for coroutines. The coroutine of the first caller runs
+    as a task shared by all callers, so cancelling one caller does not cancel
+    the others.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._tasks = {}
+
+    async def do(self, key, coroutine_fn):
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get((loop, key))
+        if task is None:
+            task = asyncio.ensure_future(coroutine_fn())
+            self._tasks[(loop, key)] = task
+            task.add_done_callback(lambda _: self._tasks.pop((loop, key), None))
+        else:
+            self.shared += 1
+            logging.debug(" Waiting for an identical command already running")
+        return await asyncio.shield(task)
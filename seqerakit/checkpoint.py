@@ -0,0 +1,206 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Append-only journal of the resources completed by a run, so that a run that
+failed part way through can be resumed without repeating the completed ones.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import Counter, deque
+
+from seqerakit.state import resource_digest, resource_key
+
+CHECKPOINT_VERSION = 1
+
+
+def config_digest(file_paths, targets=None, destroy=False, env_file=None):
+    """
+    Returns a hash of the YAML files of a run and the options that change which
+    resources are applied. The YAML must be read from files, as stdin cannot be
+    read again to check that it has not changed.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([targets, destroy]).encode("utf-8"))
+    for path in list(file_paths) + ([env_file] if env_file else []):
+        if not isinstance(path, str) or path == "-":
+            raise ValueError(" Runs reading YAML from stdin cannot be checkpointed.")
+        digest.update(path.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def entry_key(block, cmd_args):
+    return f"{resource_key(block, cmd_args)}:{resource_digest(cmd_args)}"
+
+
+def source_key(block, item):
+    """
+    Returns the key of the YAML definition of a resource before it is parsed,
+    with the environment variables it references expanded.
+    """
+    content = os.path.expandvars(json.dumps(item, sort_keys=True, default=str))
+    return f"{block}:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+
+class Checkpoint:
+    """
+    A JSON lines file with a header holding the digest of the configuration,
+    followed by one line per completed resource. Every line is flushed to disk
+    before the next resource is recorded.
+
+    Each line holds the entry_key() of the parsed resource and, when it was
+    parsed with skip(), the source_key() of its YAML definition, so that
+    completed resources can be skipped before they are parsed again.
+
+    Args:
+        path: Path of the checkpoint file.
+        digest: The config_digest() of the run.
+        resume: If True, the resources recorded in an existing file are loaded
+        and new ones are appended. Otherwise any existing file is replaced.
+    """
+
+    def __init__(self, path, digest, resume=False):
+        self.path = path
+        self.digest = digest
+        self.completed = Counter()
+        self._lock = threading.Lock()
+        # Completed resources not skipped yet, by entry and source key
+        self._remaining = Counter()
+        self._remaining_sources = Counter()
+        self._source_entries = {}
+        # Source keys of the resources passed by skip(), in the order they are
+        # parsed, and of the pending resources, by entry key
+        self._parsed = deque()
+        self._sources = {}
+        self._skipped = 0
+
+        if resume:
+            content = self._load()
+            self._file = open(path, "a")
+            if not content.endswith("\n"):
+                self._file.write("\n")
+        else:
+            self._file = open(path, "w")
+            self._write({"version": CHECKPOINT_VERSION, "digest": digest})
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise ValueError(f" The checkpoint file '{self.path}' does not exist.")
+        with open(self.path, "r") as f:
+            content = f.read()
+        lines = content.splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f" '{self.path}' is not a valid checkpoint file.")
+        if header.get("digest") != self.digest:
+            raise ValueError(
+                f" The checkpoint file '{self.path}' was written for a different "
+                "configuration. Remove '--resume' to apply it from scratch."
+            )
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                key = entry["key"]
+            except (ValueError, KeyError):
+                # A line cut short by the failure that ended the previous run
+                logging.debug(f" Ignoring incomplete checkpoint entry: {line}")
+                continue
+            self.completed[key] += 1
+            self._remaining[key] += 1
+            if entry.get("source"):
+                self._remaining_sources[entry["source"]] += 1
+                self._source_entries[entry["source"]] = key
+        return content
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def pending(self, cmd_args_dict):
+        """
+        Returns the parsed YAML configuration without the resources recorded as
+        completed, so that no command is run for them.
+        """
+        pending = {block: [] for block in cmd_args_dict}
+        resources = (
+            (block, args)
+            for block, args_list in cmd_args_dict.items()
+            for args in args_list
+        )
+        for block, args in self.iter_pending(resources):
+            pending[block].append(args)
+        return pending
+
+    def iter_pending(self, resources):
+        """
+        Like pending(), for an iterator of the block and arguments of each
+        resource as returned by helper.iter_parse_all_yaml().
+        """
+        for block, args in resources:
+            key = entry_key(block, args["cmd_args"])
+            with self._lock:
+                source = self._parsed.popleft() if self._parsed else None
+                if self._remaining[key] > 0:
+                    self._remaining[key] -= 1
+                    self._skipped += 1
+                    continue
+                if source is not None:
+                    self._sources.setdefault(key, []).append(source)
+            yield block, args
+        if self._skipped:
+            logging.info(
+                f" Resuming from '{self.path}', skipping {self._skipped} resources "
+                "completed by the previous run."
+            )
+
+    def skip(self, block, item):
+        """
+        Returns True if the resource defined by a YAML item was recorded as
+        completed. Passed to helper.parse_all_yaml() and iter_parse_all_yaml(),
+        so that completed resources are not parsed again, which may run
+        commands, e.g. to resolve the URL of a dataset. The resources parsed
+        must then be passed to pending() or iter_pending().
+        """
+        source = source_key(block, item)
+        with self._lock:
+            if self._remaining_sources[source] > 0:
+                self._remaining_sources[source] -= 1
+                self._remaining[self._source_entries[source]] -= 1
+                self._skipped += 1
+                return True
+            self._parsed.append(source)
+        return False
+
+    def record(self, block, cmd_args):
+        """
+        Records a resource as completed.
+        """
+        key = entry_key(block, cmd_args)
+        with self._lock:
+            self.completed[key] += 1
+            entry = {"block": block, "key": key}
+            sources = self._sources.get(key)
+            if sources:
+                entry["source"] = sources.pop(0)
+            self._write(entry)
+
+    def close(self):
+        self._file.close()
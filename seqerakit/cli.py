@@ -18,24 +18,31 @@ Requires a YAML file that defines the resources to be created in Seqera Platform
 the required options for each resource based on the Seqera Platform CLI.
 """
 import argparse
+import fnmatch
 import logging
 import sys
 import os
-import yaml  # type: ignore
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from seqerakit import seqeraplatform, helper, overwrite
+from seqerakit import seqeraplatform, helper, overwrite, scheduler, plan, state
+from seqerakit import cache, checkpoint, compiled, limiter, metrics, retry, tracing
+from seqerakit import yaml_io
 from seqerakit.seqeraplatform import (
     ResourceExistsError,
     ResourceNotFoundError,
     CommandError,
 )
 from seqerakit import __version__
+from seqerakit import executor
 from seqerakit.on_exists import OnExists
 
 logger = logging.getLogger(__name__)
 
+# Commands that can be given before the YAML files, e.g. 'seqerakit plan file.yaml'
+COMMANDS = ("plan", "apply", "compile")
+
 
 def parse_args(args=None):
     parser = argparse.ArgumentParser(
@@ -78,7 +85,10 @@ def parse_args(args=None):
     yaml_processing.add_argument(
         "yaml",
         nargs="*",
-        help="One or more YAML files with Seqera Platform resource definitions.",
+        help="One or more YAML files with Seqera Platform resource definitions. "
+        "Can be preceded by 'plan' to only print the changes needed to apply the "
+        "YAML files, by 'apply' to apply only those changes, or by 'compile' to "
+        "write the parsed YAML files to the '--plan' file.",
     )
     yaml_processing.add_argument(
         "--delete",
@@ -101,6 +111,38 @@ def parse_args(args=None):
         help="Specify the resources to be targeted for creation in a YAML file through "
         "a comma-separated list (e.g. '--targets=teams,participants').",
     )
+    yaml_processing.add_argument(
+        "--ignore",
+        metavar="PATTERN",
+        action="append",
+        help="Glob pattern of the files and directories to skip when searching "
+        "directories for YAML files, matched against their path relative to the "
+        "directory and against their name (e.g. '--ignore drafts'). Can be "
+        "specified multiple times.",
+    )
+    yaml_processing.add_argument(
+        "--parse-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Number of processes parsing the YAML files when there are many of "
+        "them (default: the number of CPUs, up to 8).",
+    )
+    yaml_processing.add_argument(
+        "--plan",
+        dest="plan",
+        type=str,
+        help="Path to a compiled plan file, written by 'compile' and applied "
+        "instead of parsing YAML files otherwise (e.g. 'seqerakit apply --plan "
+        "plan.json'). YAML files given with it must not have changed since.",
+    )
+    yaml_processing.add_argument(
+        "--plan-cache",
+        dest="plan_cache",
+        type=str,
+        help="Path to a compiled plan file reused instead of parsing the YAML "
+        "files while they, the env file and the environment variables they "
+        "reference have not changed, and compiled again otherwise.",
+    )
     yaml_processing.add_argument(
         "--env-file",
         dest="env_file",
@@ -121,7 +163,197 @@ def parse_args(args=None):
         Globally enable overwrite for all resources defined in YAML input(s).
         Deprecated: Please use '--on-exists=overwrite' instead.""",
     )
-    return parser.parse_args(args)
+
+    # Execution options
+    execution = parser.add_argument_group("Execution Options")
+    execution.add_argument(
+        "--executor",
+        dest="executor",
+        type=str,
+        default="fork",
+        choices=list(executor.EXECUTORS),
+        help="How 'tw' commands are started: 'fork' starts a new shell for every "
+        "command, 'batch' feeds commands to a long-lived shell worker.",
+    )
+    execution.add_argument(
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=1,
+        help="Number of resources to apply in parallel. Resources are ordered by "
+        "the references between them (e.g. a pipeline waits for its compute "
+        "environment), independent resources are applied concurrently.",
+    )
+    execution.add_argument(
+        "--adaptive-concurrency",
+        dest="adaptive_concurrency",
+        action="store_true",
+        help="Adapt the number of 'tw' commands running at the same time, up to "
+        "--jobs, to Seqera Platform: it grows while latencies are stable and is "
+        "halved on throttling or server errors.",
+    )
+    execution.add_argument(
+        "--max-per-workspace",
+        dest="max_per_workspace",
+        type=int,
+        help="Maximum number of 'tw' commands running at the same time in a "
+        "workspace or organization.",
+    )
+    execution.add_argument(
+        "--report",
+        action="store_true",
+        help="Log a performance report at the end of the run, with the time spent "
+        "per block and per phase (existence checks, creates, updates and deletes) "
+        "and the slowest commands.",
+    )
+    execution.add_argument(
+        "--report-file",
+        dest="report_file",
+        type=str,
+        help="Path to a JSON file where the timing, exit code, output size and "
+        "retries of every command and resource of the run are written.",
+    )
+    execution.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        type=str,
+        help="Path to a file where metrics of the run (command latencies, resources "
+        "created, skipped, overwritten or deleted, cache hits and duration) are "
+        "written for the textfile collector of the Prometheus node_exporter. "
+        "The file name must end with '.prom'.",
+    )
+    execution.add_argument(
+        "--trace-file",
+        dest="trace_file",
+        type=str,
+        help="Path to a JSON file where spans of the run (YAML parsing, resource "
+        "lists, existence checks, 'tw' commands and waits) are written as Chrome "
+        "trace events, which can be opened in Perfetto or chrome://tracing.",
+    )
+    execution.add_argument(
+        "--no-shell",
+        dest="shell",
+        action="store_false",
+        help="Run 'tw' directly instead of through a shell. Environment variables "
+        "are expanded by seqerakit and output is streamed to a temporary file when "
+        "it is large. Shell syntax such as command substitution is not supported.",
+    )
+    execution.add_argument(
+        "--cache-ttl",
+        dest="cache_ttl",
+        type=float,
+        default=300,
+        help="Seconds for which the output of read-only 'tw' commands (e.g. 'list') "
+        "is reused. Other commands invalidate the output cached for their "
+        "workspace or organization (default: 300).",
+    )
+    execution.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        help="Directory where the output of read-only 'tw' commands is also cached, "
+        "so that it can be reused by later runs until it expires.",
+    )
+    execution.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Do not cache the output of read-only 'tw' commands.",
+    )
+    execution.add_argument(
+        "--retries",
+        dest="retries",
+        type=int,
+        help="Number of times a 'tw' command failing with a transient error (e.g. "
+        "HTTP 429, 502, 503, 504 or a timeout) is retried, with an exponential "
+        "backoff and jitter between attempts. Overrides the 'retry' settings of the "
+        "YAML configuration (default: 0).",
+    )
+    execution.add_argument(
+        "--retry-delay",
+        dest="retry_delay",
+        type=float,
+        help="Seconds to wait before the first retry of a command, doubling on "
+        "every retry up to 30 seconds (default: 1).",
+    )
+    execution.add_argument(
+        "--retry-deadline",
+        dest="retry_deadline",
+        type=float,
+        help="Seconds after the first attempt of a command after which it is no "
+        "longer retried.",
+    )
+    execution.add_argument(
+        "--no-prefetch",
+        dest="prefetch",
+        action="store_false",
+        help="Do not fetch the resource lists used to check for existing resources "
+        "concurrently before applying, fetch each one when it is first needed.",
+    )
+    execution.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse each resource just before applying it instead of parsing the "
+        "whole configuration first, so that the first commands run while the rest "
+        "is parsed. Resource lists are then fetched when first needed. Cannot be "
+        "used with the 'plan' and 'apply' commands.",
+    )
+    execution.add_argument(
+        "--state-file",
+        dest="state_file",
+        type=str,
+        help="Path to a local state file recording the resources applied "
+        "successfully. Resources whose definition has not changed since they were "
+        "recorded are skipped.",
+    )
+    execution.add_argument(
+        "--force",
+        action="store_true",
+        help="Apply every resource, ignoring the state file.",
+    )
+    execution.add_argument(
+        "--checkpoint",
+        dest="checkpoint",
+        type=str,
+        help="Path to a checkpoint file recording each resource as it is completed, "
+        "so that a failed run can be resumed with '--resume'.",
+    )
+    execution.add_argument(
+        "--resume",
+        dest="resume",
+        type=str,
+        help="Resume a failed run from its checkpoint file, skipping the resources "
+        "it completed. The YAML files must not have changed since.",
+    )
+    options = parser.parse_args(args)
+
+    options.command = None
+    if (
+        options.yaml
+        and options.yaml[0] in COMMANDS
+        and not os.path.exists(options.yaml[0])
+    ):
+        options.command = options.yaml.pop(0)
+    return options
+
+
+def copy_platform(sp, json=None):
+    """
+    Returns a new Seqera Platform client instance sharing the executor, cache
+    and settings of sp, with its own JSON output setting.
+    """
+    return seqeraplatform.SeqeraPlatform(
+        cli_args=sp.cli_args,
+        dryrun=sp.dryrun,
+        json=sp.json if json is None else json,
+        executor=sp.executor,
+        shell=sp.shell,
+        cache=sp.cache,
+        single_flight=sp.single_flight,
+        retry_policy=sp.retry_policy,
+        limiter=sp.limiter,
+        stats=sp.stats,
+    )
 
 
 class BlockParser:
@@ -130,7 +362,9 @@ class BlockParser:
     functions for each block for custom handling of command-line arguments to _tw_run().
     """
 
-    def __init__(self, sp, list_for_add_method):
+    def __init__(
+        self, sp, list_for_add_method, state_journal=None, checkpoint_file=None
+    ):
         """
         Initializes a BlockParser instance.
 
@@ -138,28 +372,54 @@ class BlockParser:
         sp: A Seqera Platform class instance.
         list_for_add_method: A list of blocks that need to be
         handled by the 'add' method.
+        state_journal: An optional StateJournal used to skip resources that
+        have not changed since they were last applied.
+        checkpoint_file: An optional Checkpoint recording the resources completed
+        by this run.
         """
         self.sp = sp
         self.list_for_add_method = list_for_add_method
+        self.state_journal = state_journal
+        self.checkpoint_file = checkpoint_file
 
         # Create a separate Seqera Platform client instance without
         # JSON output to avoid mixing resource checks with creation
         # output during overwrite operations.
-        sp_without_json = seqeraplatform.SeqeraPlatform(
-            cli_args=sp.cli_args,
-            dryrun=sp.dryrun,
-            json=False,
-        )
+        sp_without_json = copy_platform(sp, json=False)
         self.overwrite_method = overwrite.Overwrite(sp_without_json)
 
     def handle_block(self, block, args, destroy=False, dryrun=False):
+        name = helper.find_name(args)
+        stats = getattr(self.sp, "stats", None)
+        with tracing.span(f"{block} {name}", "resource"):
+            if stats is None:
+                self._apply_block(block, args, destroy, dryrun)
+                return
+            with stats.resource(block, name) as record:
+                record["action"] = self._apply_block(block, args, destroy, dryrun)
+
+    # Applies a resource and returns what was done with it, e.g. 'create'
+    def _apply_block(self, block, args, destroy, dryrun):
         # Check if delete is set to True, and call delete handler
         if destroy:
             logging.debug(" The '--delete' flag has been specified.\n")
             self.overwrite_method.handle_overwrite(
                 block, args["cmd_args"], on_exists=OnExists.FAIL, destroy=True
             )
-            return
+            if self.state_journal is not None and not dryrun:
+                self.state_journal.forget(block, args["cmd_args"])
+            if self.checkpoint_file is not None and not dryrun:
+                self.checkpoint_file.record(block, args["cmd_args"])
+            return "dryrun" if dryrun else "delete"
+
+        if self.state_journal is not None and self.state_journal.is_unchanged(
+            block, args["cmd_args"]
+        ):
+            logging.info(
+                f" The {block} resource has not changed since it was last applied."
+                " Skipping.\n"
+            )
+            return "unchanged"
 
         # Handles a block of commands by calling the appropriate function.
         block_handler_map = {
@@ -208,9 +468,13 @@ class BlockParser:
                 block, args["cmd_args"], on_exists=on_exists
             )
 
-            # If on_exists is "ignore" and resource exists, skip creation
+            # If on_exists is "ignore" or "update" and resource exists, skip creation
             if not should_continue:
-                return
+                if self.checkpoint_file is not None:
+                    self.checkpoint_file.record(block, args["cmd_args"])
+                if self.state_journal is not None and on_exists == OnExists.UPDATE:
+                    self.state_journal.record(block, args["cmd_args"])
+                return on_exists.name.lower()
 
         if block in self.list_for_add_method:
             helper.handle_generic_block(self.sp, block, args["cmd_args"])
@@ -218,21 +482,106 @@ class BlockParser:
             block_handler_map[block](self.sp, args["cmd_args"])
         else:
             logger.error(f"Unrecognized resource block in YAML: {block}")
+            return None
+
+        if not dryrun:
+            # Keep the cached resource lists in sync with what was just created
+            self.overwrite_method.record_created(block, args["cmd_args"])
+            if self.state_journal is not None:
+                self.state_journal.record(block, args["cmd_args"])
+            if self.checkpoint_file is not None:
+                self.checkpoint_file.record(block, args["cmd_args"])
+        return "dryrun" if dryrun else "create"
+
+
+# Extensions of the YAML files found in directories, matched case-insensitively
+YAML_EXTENSIONS = (".yaml", ".yml")
 
+# Number of threads listing the subdirectories of a directory at the same time
+DISCOVERY_WORKERS = 8
 
-def find_yaml_files(path_list=None):
+
+def _is_ignored(relative_path, ignore):
+    name = os.path.basename(relative_path)
+    return any(
+        fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in ignore
+    )
+
+
+def _walk_yaml_files(root, directory, ignore):
+    """
+    Returns the YAML files under a directory, skipping the files and
+    directories whose path relative to root, or name, matches one of the
+    ignore patterns.
+    """
+    yaml_files = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        relative_dir = os.path.relpath(dirpath, root)
+        if relative_dir == ".":
+            relative_dir = ""
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not _is_ignored(Path(relative_dir, d).as_posix(), ignore)
+        ]
+        for filename in filenames:
+            if filename.lower().endswith(YAML_EXTENSIONS) and not _is_ignored(
+                Path(relative_dir, filename).as_posix(), ignore
+            ):
+                yaml_files.append(os.path.join(dirpath, filename))
+    return yaml_files
+
+
+def _find_in_directory(root, ignore, workers):
+    """
+    Returns the YAML files under a directory sorted by path, listing its
+    subdirectories on a pool of threads.
+    """
+    yaml_files = []
+    subdirectories = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if _is_ignored(entry.name, ignore):
+                continue
+            if entry.is_dir():
+                subdirectories.append(entry.path)
+            elif entry.name.lower().endswith(YAML_EXTENSIONS):
+                yaml_files.append(entry.path)
+
+    if len(subdirectories) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            found = pool.map(
+                lambda directory: _walk_yaml_files(root, directory, ignore),
+                subdirectories,
+            )
+            for directory_files in found:
+                yaml_files.extend(directory_files)
+    else:
+        for directory in subdirectories:
+            yaml_files.extend(_walk_yaml_files(root, directory, ignore))
+    return sorted(yaml_files)
+
+
+def find_yaml_files(path_list=None, ignore=None, workers=DISCOVERY_WORKERS):
     """
     Find YAML files in the given path list.
 
     Args:
         path_list (list, optional): A list of paths to search for YAML files.
+        ignore (list, optional): Glob patterns of the files and directories to
+        skip in directories, matched against their path relative to the
+        directory given and against their name (e.g. 'drafts', '*.local.yml').
+        workers (int, optional): Number of threads listing subdirectories.
 
     Returns:
         list: A list of YAML files found in the given path list or stdin.
+        The files found in a directory are sorted by path, so that they are
+        merged in the same order on every run.
     """
 
     yaml_files = []
-    yaml_exts = ["**/*.[yY][aA][mM][lL]", "**/*.[yY][mM][lL]"]
+    ignore = ignore or []
 
     if not path_list:
         if sys.stdin.isatty():
@@ -251,20 +600,71 @@ def find_yaml_files(path_list=None):
         if not path.exists():
             raise FileExistsError(f"File {path} does not exist")
 
-        if path.is_file():
-            yaml_files.append(str(path))
-        elif path.is_dir():
-            for ext in yaml_exts:
-                yaml_files.extend(str(p) for p in path.rglob(ext))
+        if path.is_dir():
+            yaml_files.extend(_find_in_directory(str(path), ignore, workers))
         else:
             yaml_files.append(str(path))
 
     return yaml_files
 
 
+def configure_retries(retry_policy, yaml_settings, options):
+    """
+    Applies the 'retry' settings of the YAML configuration to the retry policy,
+    then the retry options given on the command line, which take precedence.
+    """
+    if yaml_settings is not None:
+        if not isinstance(yaml_settings, dict):
+            raise ValueError(" The 'retry' setting must be a mapping.")
+        retry_policy.configure(**yaml_settings)
+    cli_settings = {
+        "retries": options.retries,
+        "base_delay": options.retry_delay,
+        "deadline": options.retry_deadline,
+    }
+    retry_policy.configure(
+        **{key: value for key, value in cli_settings.items() if value is not None}
+    )
+
+
 def main(args=None):
     options = parse_args(args if args is not None else sys.argv[1:])
     logging.basicConfig(level=getattr(logging, options.log_level.upper()))
+    logging.debug(f" Using the {yaml_io.BACKEND} YAML backend")
+
+    if options.jobs < 1:
+        logging.error("The '--jobs' option must be at least 1.")
+        sys.exit(1)
+    if options.max_per_workspace is not None and options.max_per_workspace < 1:
+        logging.error("The '--max-per-workspace' option must be at least 1.")
+        sys.exit(1)
+    if options.parse_workers < 1:
+        logging.error("The '--parse-workers' option must be at least 1.")
+        sys.exit(1)
+    if options.stream and options.command:
+        logging.error(
+            f"The '--stream' option cannot be used with '{options.command}', "
+            "which needs the whole configuration to be parsed first."
+        )
+        sys.exit(1)
+    if options.stream and (options.plan or options.plan_cache):
+        logging.error(
+            "The '--stream' option cannot be used with a compiled plan, "
+            "whose resources are already parsed."
+        )
+        sys.exit(1)
+    if options.metrics_file and not options.metrics_file.endswith(".prom"):
+        logging.error(
+            "The '--metrics-file' name must end with '.prom' to be read by the "
+            "textfile collector of the Prometheus node_exporter."
+        )
+        sys.exit(1)
+    if options.command == "compile" and not options.plan:
+        logging.error("The 'compile' command needs a '--plan' file to write.")
+        sys.exit(1)
+
+    if options.trace_file:
+        tracing.start()
 
     # Parse CLI arguments into a list
     cli_args_list = []
@@ -276,7 +676,7 @@ def main(args=None):
     # Will prioritize env_file values
     if options.env_file:
         with open(options.env_file, "r") as f:
-            env_vars = yaml.safe_load(f)
+            env_vars = yaml_io.load(f)
             # Only update environment variables that are explicitly defined in env_file
             for key, value in env_vars.items():
                 if value is not None:
@@ -284,7 +684,38 @@ def main(args=None):
                     os.environ[key] = full_value
 
     sp = seqeraplatform.SeqeraPlatform(
-        cli_args=cli_args_list, dryrun=options.dryrun, json=options.json
+        cli_args=cli_args_list,
+        dryrun=options.dryrun,
+        json=options.json,
+        executor=executor.get_executor(options.executor, workers=options.jobs),
+        shell=options.shell,
+        cache=(
+            cache.ResultCache(ttl=options.cache_ttl, cache_dir=options.cache_dir)
+            if options.cache
+            else None
+        ),
+        retry_policy=retry.RetryPolicy(),
+        limiter=(
+            limiter.AdaptiveLimiter(
+                options.jobs,
+                # Without --adaptive-concurrency, only the limit per workspace
+                # applies and up to --jobs commands run at the same time
+                initial=(
+                    max(1, options.jobs // 2)
+                    if options.adaptive_concurrency
+                    else options.jobs
+                ),
+                max_per_scope=options.max_per_workspace,
+                adaptive=options.adaptive_concurrency,
+            )
+            if options.adaptive_concurrency or options.max_per_workspace
+            else None
+        ),
+        stats=(
+            metrics.RunStats()
+            if options.report or options.report_file or options.metrics_file
+            else None
+        ),
     )
     sp.overwrite = options.overwrite  # If global overwrite is set
 
@@ -309,7 +740,36 @@ def main(args=None):
         logging.error(e)
         sys.exit(1)
 
-    yaml_files = find_yaml_files(options.yaml)
+    # A compiled plan can be applied without the YAML files it was compiled from
+    apply_compiled = options.plan is not None and options.command != "compile"
+    yaml_files = None
+    if options.yaml or not apply_compiled:
+        yaml_files = find_yaml_files(options.yaml, ignore=options.ignore)
+
+    state_journal = None
+    if options.state_file:
+        state_journal = state.StateJournal(options.state_file, force=options.force)
+
+    checkpoint_file = None
+    if (
+        (options.checkpoint or options.resume)
+        and not options.dryrun
+        and options.command != "compile"
+    ):
+        try:
+            checkpoint_file = checkpoint.Checkpoint(
+                options.resume or options.checkpoint,
+                checkpoint.config_digest(
+                    yaml_files or [options.plan],
+                    targets=options.targets,
+                    destroy=options.delete,
+                    env_file=options.env_file,
+                ),
+                resume=options.resume is not None,
+            )
+        except (ValueError, OSError) as e:
+            logging.error(e)
+            sys.exit(1)
 
     block_manager = BlockParser(
         sp,
@@ -325,22 +785,160 @@ def main(args=None):
             "studios",
             "data-links",
         ],
+        state_journal=state_journal,
+        checkpoint_file=checkpoint_file,
     )
 
     # Parse the YAML file(s) by blocks
     # and get a dictionary of command line arguments
-    try:
-        cmd_args_dict = helper.parse_all_yaml(
-            yaml_files, destroy=options.delete, targets=options.targets, sp=sp
+    settings = {}
+    succeeded = False
+
+    def apply_node(node):
+        block_manager.handle_block(
+            node.block, node.args, destroy=options.delete, dryrun=options.dryrun
         )
-        for block, args_list in cmd_args_dict.items():
-            for args in args_list:
-                block_manager.handle_block(
-                    block, args, destroy=options.delete, dryrun=options.dryrun
-                )
+
+    try:
+        if options.stream:
+            # Parsing resolves datasets with its own client instance, as it
+            # runs while resources are applied
+            resources = helper.iter_parse_all_yaml(
+                yaml_files,
+                destroy=options.delete,
+                targets=options.targets,
+                sp=copy_platform(sp),
+                settings=settings,
+                workers=options.parse_workers,
+                skip=checkpoint_file.skip if checkpoint_file is not None else None,
+            )
+            configure_retries(sp.retry_policy, settings.get("retry"), options)
+            if checkpoint_file is not None:
+                resources = checkpoint_file.iter_pending(resources)
+            scheduler.run_stream(
+                resources, apply_node, jobs=options.jobs, destroy=options.delete
+            )
+            succeeded = True
+            return
+
+        if options.command == "compile":
+            compiled_plan = compiled.compile_plan(
+                yaml_files,
+                destroy=options.delete,
+                targets=options.targets,
+                sp=sp,
+                settings=settings,
+                workers=options.parse_workers,
+                env_file=options.env_file,
+            )
+            compiled_plan.write(options.plan)
+            logging.info(
+                f" Compiled {len(compiled_plan)} resources to '{options.plan}'."
+            )
+            succeeded = True
+            return
+        if apply_compiled:
+            compiled_plan = compiled.load(options.plan)
+            compiled_plan.check(
+                yaml_files,
+                targets=options.targets,
+                destroy=options.delete,
+                env_file=options.env_file,
+            )
+            settings.update(compiled_plan.settings)
+            cmd_args_dict = compiled_plan.resources()
+        elif options.plan_cache:
+            cmd_args_dict = compiled.parse_cached(
+                options.plan_cache,
+                yaml_files,
+                destroy=options.delete,
+                targets=options.targets,
+                sp=sp,
+                settings=settings,
+                workers=options.parse_workers,
+                env_file=options.env_file,
+            )
+        else:
+            # Completed resources are skipped before they are parsed, so that
+            # no command is run for them, e.g. to resolve datasets
+            cmd_args_dict = helper.parse_all_yaml(
+                yaml_files,
+                destroy=options.delete,
+                targets=options.targets,
+                sp=sp,
+                settings=settings,
+                workers=options.parse_workers,
+                skip=checkpoint_file.skip if checkpoint_file is not None else None,
+            )
+        configure_retries(sp.retry_policy, settings.get("retry"), options)
+        if checkpoint_file is not None:
+            cmd_args_dict = checkpoint_file.pending(cmd_args_dict)
+        if options.prefetch and not options.dryrun:
+            block_manager.overwrite_method.prefetch(
+                cmd_args_dict, max_workers=max(options.jobs, 4)
+            )
+        if options.command:
+            resource_plan = plan.build_plan(
+                block_manager.overwrite_method, cmd_args_dict, destroy=options.delete
+            )
+            print(resource_plan.to_json() if options.json else resource_plan.to_text())
+            if options.command == "plan":
+                succeeded = True
+                return
+            # The plan decides what to do with existing resources
+            cmd_args_dict = resource_plan.pending()
+            sp.global_on_exists = None
+            sp.overwrite = False
+        if options.jobs > 1:
+            nodes = scheduler.build_graph(cmd_args_dict, destroy=options.delete)
+            scheduler.run_graph(nodes, apply_node, jobs=options.jobs)
+        else:
+            for block, args_list in cmd_args_dict.items():
+                for args in args_list:
+                    block_manager.handle_block(
+                        block, args, destroy=options.delete, dryrun=options.dryrun
+                    )
+        succeeded = True
     except (ResourceExistsError, ResourceNotFoundError, CommandError, ValueError) as e:
         logging.error(e)
         sys.exit(1)
+    finally:
+        sp.close()
+        if sp.cache is not None:
+            logging.debug(f" Result cache statistics: {sp.cache.stats()}")
+        if sp.limiter is not None:
+            logging.info(sp.limiter.summary())
+        if options.report:
+            logging.info(sp.stats.report())
+        if options.report_file:
+            sp.stats.write_json(options.report_file)
+        if options.metrics_file:
+            sp.stats.write_textfile(
+                options.metrics_file,
+                cache_stats=sp.cache.stats() if sp.cache is not None else None,
+                success=succeeded,
+                info={
+                    "version": __version__,
+                    "endpoint": os.environ.get("TOWER_API_ENDPOINT", ""),
+                },
+            )
+        if options.trace_file:
+            tracing.stop().write(options.trace_file)
+        if sp.retry_policy.total_retries:
+            logging.info(
+                f" Retried {sp.retry_policy.retried_commands} commands after "
+                f"transient errors ({sp.retry_policy.total_retries} retries)."
+            )
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+        if state_journal is not None:
+            if state_journal.skipped:
+                logging.info(
+                    f" Skipped {state_journal.skipped} resources that have not "
+                    "changed since they were last applied."
+                )
+            if not options.dryrun:
+                state_journal.save()
 
 
 if __name__ == "__main__":
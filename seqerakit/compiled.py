@@ -0,0 +1,361 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compiled plans: the parsed command line arguments of every resource of a YAML
+configuration, with the params files generated for them, saved to a file so
+that they can be applied again without parsing the configuration.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from seqerakit import __version__, helper, utils
+from seqerakit.checkpoint import config_digest
+from seqerakit.on_exists import OnExists
+
+COMPILED_PLAN_VERSION = 1
+
+# References to environment variables, as expanded by utils.resolve_env_var()
+ENV_VAR_PATTERN = re.compile(r"\$\{?(\w+)\}?")
+
+# Options of the YAML files pointing to files read when they are parsed
+FILE_OPTION_PATTERN = re.compile(
+    r"""\b(?:params-file|file-path)["']?\s*:\s*"""
+    r"""(?:"([^"]*)"|'([^']*)'|([^\s,}#]+))"""
+)
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def referenced_files(file_paths):
+    """
+    Returns the paths of the files referenced by the 'params-file' and
+    'file-path' options of the YAML files, with environment variables expanded.
+    """
+    paths = set()
+    for path in file_paths:
+        for match in FILE_OPTION_PATTERN.finditer(_read(path) or ""):
+            value = next(group for group in match.groups() if group is not None)
+            paths.add(os.path.expandvars(value))
+    return sorted(paths)
+
+
+def referenced_env_vars(file_paths):
+    """
+    Returns the names of the environment variables referenced in the files.
+    """
+    names = set()
+    for path in file_paths:
+        names.update(ENV_VAR_PATTERN.findall(_read(path) or ""))
+    return sorted(names)
+
+
+def plan_key(file_paths, targets=None, destroy=False, env_file=None):
+    """
+    Returns the key of the plan compiled from the YAML files: a hash of the
+    files, the env file, the options changing which resources are applied, the
+    files referenced by 'params-file' and 'file-path' options, and the values
+    of the environment variables all of them reference, which may be written
+    to params files when the plan is compiled.
+    """
+    if any(not isinstance(path, str) or path == "-" for path in file_paths):
+        raise ValueError(" Plans cannot be compiled from YAML read from stdin.")
+    digest = hashlib.sha256()
+    digest.update(f"{COMPILED_PLAN_VERSION}:{__version__}\0".encode("utf-8"))
+    digest.update(config_digest(file_paths, targets, destroy, env_file).encode())
+    extra_files = referenced_files(file_paths)
+    for path in extra_files:
+        content = _read(path)
+        digest.update(path.encode("utf-8") + b"\0")
+        if content is not None:
+            digest.update(hashlib.sha256(content.encode("utf-8")).digest())
+    for name in referenced_env_vars(list(file_paths) + extra_files):
+        value = os.environ.get(name)
+        digest.update(name.encode("utf-8") + b"\0")
+        if value is not None:
+            digest.update(hashlib.sha256(value.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class CompiledPlan:
+    """
+    The output of helper.parse_all_yaml() for a configuration, in the order it
+    is applied, with the settings of the configuration and the contents of the
+    params files generated while parsing it.
+
+    Args:
+        key: The plan_key() of the YAML files the plan was compiled from.
+        cmd_args_dict: The output of helper.parse_all_yaml().
+        settings: The settings read from the configuration (e.g. 'retry').
+        destroy: True if the plan deletes the resources.
+        targets: The '--targets' the plan was compiled with.
+        params_files: The contents of the generated params files, by path.
+        Read from the files referenced by cmd_args_dict if not given.
+    """
+
+    def __init__(
+        self,
+        key,
+        cmd_args_dict,
+        settings=None,
+        destroy=False,
+        targets=None,
+        params_files=None,
+    ):
+        self.key = key
+        self.cmd_args_dict = cmd_args_dict
+        self.settings = settings or {}
+        self.destroy = destroy
+        self.targets = targets
+        if params_files is None:
+            params_files = {}
+            for path in self._params_file_paths():
+                with open(path, "r") as f:
+                    params_files[path] = f.read()
+        self.params_files = params_files
+
+    def _params_file_paths(self):
+        for args_list in self.cmd_args_dict.values():
+            for args in args_list:
+                cmd_args = args["cmd_args"]
+                for option, value in zip(cmd_args, cmd_args[1:]):
+                    if option == "--params-file" and utils.is_params_file(value):
+                        yield value
+
+    def __len__(self):
+        return sum(len(args_list) for args_list in self.cmd_args_dict.values())
+
+    def to_dict(self):
+        return {
+            "version": COMPILED_PLAN_VERSION,
+            "seqerakit": __version__,
+            "key": self.key,
+            "destroy": self.destroy,
+            "targets": self.targets,
+            "settings": self.settings,
+            "params_files": self.params_files,
+            "resources": {
+                block: [
+                    {
+                        "cmd_args": args["cmd_args"],
+                        "on_exists": OnExists(args["on_exists"]).name.lower(),
+                    }
+                    for args in args_list
+                ]
+                for block, args_list in self.cmd_args_dict.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != COMPILED_PLAN_VERSION:
+            raise ValueError(" Unsupported compiled plan version.")
+        cmd_args_dict = {
+            block: [
+                {
+                    "cmd_args": args["cmd_args"],
+                    "on_exists": OnExists[args["on_exists"].upper()],
+                }
+                for args in args_list
+            ]
+            for block, args_list in data["resources"].items()
+        }
+        return cls(
+            data["key"],
+            cmd_args_dict,
+            settings=data.get("settings"),
+            destroy=data.get("destroy", False),
+            targets=data.get("targets"),
+            params_files=data.get("params_files", {}),
+        )
+
+    def write(self, path):
+        """
+        Writes the plan to a JSON file, replacing it atomically. The file is
+        only readable by its owner, as params files may hold the values of
+        environment variables.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump(self.to_dict(), f)
+        os.replace(f.name, path)
+
+    def resources(self):
+        """
+        Returns the cmd_args_dict of the plan, with the params files written
+        again to new temporary files unless they still exist unchanged.
+        """
+        paths = {}
+        for path, content in self.params_files.items():
+            paths[path] = path if _has_content(path, content) else _write_temp(content)
+
+        return {
+            block: [
+                dict(args, cmd_args=_replace_paths(args["cmd_args"], paths))
+                for args in args_list
+            ]
+            for block, args_list in self.cmd_args_dict.items()
+        }
+
+    def check(self, file_paths=None, targets=None, destroy=False, env_file=None):
+        """
+        Raises a ValueError if the plan cannot be applied with the options
+        given, or was compiled from other YAML files than file_paths.
+        """
+        if destroy != self.destroy:
+            with_delete = "with" if self.destroy else "without"
+            raise ValueError(
+                f" The plan was compiled {with_delete} '--delete', which changes "
+                "the order of its resources. Please compile it again."
+            )
+        if targets and targets != self.targets:
+            raise ValueError(
+                f" The plan was compiled with '--targets={self.targets}'. Please "
+                "compile it again to apply other targets."
+            )
+        if (
+            file_paths
+            and plan_key(file_paths, self.targets, destroy, env_file) != self.key
+        ):
+            raise ValueError(
+                " The YAML files, env file or environment variables have changed "
+                "since the plan was compiled. Please compile it again."
+            )
+
+
+def _replace_paths(cmd_args, paths):
+    # The cmd_args of teams are a list of lists of arguments
+    return [
+        (
+            _replace_paths(arg, paths)
+            if isinstance(arg, (list, tuple))
+            else paths.get(arg, arg)
+        )
+        for arg in cmd_args
+    ]
+
+
+def _has_content(path, content):
+    try:
+        with open(path, "r") as f:
+            return f.read() == content
+    except OSError:
+        return False
+
+
+def _write_temp(content):
+    with tempfile.NamedTemporaryFile(
+        mode="w", delete=False, prefix=utils.PARAMS_FILE_PREFIX, suffix=".yaml"
+    ) as temp_file:
+        temp_file.write(content)
+        return temp_file.name
+
+
+def load(path):
+    """
+    Reads a compiled plan from a file written by CompiledPlan.write().
+    """
+    try:
+        with open(path, "r") as f:
+            return CompiledPlan.from_dict(json.load(f))
+    except FileNotFoundError:
+        raise ValueError(f" The compiled plan '{path}' does not exist.")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(f" '{path}' is not a valid compiled plan.")
+
+
+def compile_plan(
+    file_paths,
+    destroy=False,
+    targets=None,
+    sp=None,
+    settings=None,
+    workers=1,
+    env_file=None,
+    key=None,
+):
+    """
+    Parses the YAML files with helper.parse_all_yaml() and returns the
+    CompiledPlan of the result.
+    """
+    if key is None:
+        key = plan_key(file_paths, targets, destroy, env_file)
+    if settings is None:
+        settings = {}
+    cmd_args_dict = helper.parse_all_yaml(
+        file_paths,
+        destroy=destroy,
+        targets=targets,
+        sp=sp,
+        settings=settings,
+        workers=workers,
+    )
+    return CompiledPlan(
+        key, cmd_args_dict, settings=settings, destroy=destroy, targets=targets
+    )
+
+
+def parse_cached(
+    cache_path,
+    file_paths,
+    destroy=False,
+    targets=None,
+    sp=None,
+    settings=None,
+    workers=1,
+    env_file=None,
+):
+    """
+    Like helper.parse_all_yaml(), but reuses the plan compiled to cache_path
+    by a previous run when the YAML files, env file, options and referenced
+    environment variables have not changed, and compiles it again otherwise.
+    """
+    if settings is None:
+        settings = {}
+    key = plan_key(file_paths, targets, destroy, env_file)
+    if os.path.exists(cache_path):
+        try:
+            cached = load(cache_path)
+        except ValueError as e:
+            logging.debug(f" Ignoring the plan cache:{e}")
+        else:
+            if cached.key == key:
+                logging.info(f" Reusing the plan compiled to '{cache_path}'.")
+                settings.update(cached.settings)
+                return cached.resources()
+
+    compiled = compile_plan(
+        file_paths,
+        destroy=destroy,
+        targets=targets,
+        sp=sp,
+        settings=settings,
+        workers=workers,
+        key=key,
+    )
+    compiled.write(cache_path)
+    return compiled.cmd_args_dict
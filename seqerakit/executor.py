@@ -0,0 +1,289 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Executor backends used by SeqeraPlatform to run 'tw' commands.
+
+An executor takes a fully constructed command and returns a tuple of
+(returncode, output) where output is the decoded and stripped combined
+stdout/stderr of the command. The command is either a shell command line
+(str) or an argv list, which is run without a shell.
+"""
+
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import tempfile
+import threading
+import uuid
+
+# Outputs larger than this are spilled from memory to a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def _stripped_range(spool, size):
+    """
+    Returns the (start, end) offsets of the output in a spooled file without its
+    leading and trailing whitespace.
+    """
+    start = 0
+    spool.seek(0)
+    while start < size:
+        chunk = spool.read(CHUNK_SIZE)
+        stripped = chunk.lstrip()
+        start += len(chunk) - len(stripped)
+        if stripped:
+            break
+
+    end = size
+    while end > start:
+        offset = max(start, end - CHUNK_SIZE)
+        spool.seek(offset)
+        stripped = spool.read(end - offset).rstrip()
+        end = offset + len(stripped)
+        if stripped:
+            break
+    return start, end
+
+
+def _decode_spool(spool):
+    start, end = _stripped_range(spool, spool.tell())
+    spool.seek(start)
+    return spool.read(end - start).decode("utf-8")
+
+
+def read_output(stream):
+    """
+    Reads a binary stream in chunks as it is produced and returns it decoded and
+    stripped. The chunks are written to a spooled temporary file, which moves to
+    disk once SPOOL_MAX_SIZE is reached, instead of being kept in memory.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            spool.write(chunk)
+        return _decode_spool(spool)
+
+
+async def read_output_async(stream):
+    """
+    Same as read_output() for an asyncio.StreamReader.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        while True:
+            chunk = await stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+        return _decode_spool(spool)
+
+
+class SubprocessExecutor:
+    """
+    Runs every command in a new shell subprocess (one fork per command).
+    """
+
+    name = "fork"
+
+    def __init__(self, workers=None):
+        # 'workers' is accepted for interface compatibility with BatchExecutor,
+        # every command gets a process of its own.
+        pass
+
+    def run(self, full_cmd):
+        if isinstance(full_cmd, list):
+            return self._run_argv(full_cmd)
+
+        process = subprocess.Popen(
+            full_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True
+        )
+        stdout, _ = process.communicate()
+        return process.returncode, stdout.decode("utf-8").strip()
+
+    def _run_argv(self, argv):
+        try:
+            process = subprocess.Popen(
+                argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+            )
+        except FileNotFoundError:
+            # Same status and message as a shell that cannot find the command
+            return 127, f"{argv[0]}: command not found"
+        with process:
+            stdout = read_output(process.stdout)
+            returncode = process.wait()
+        return returncode, stdout
+
+    def close(self):
+        pass
+
+
+class _ShellWorker:
+    """
+    A long-lived '/bin/sh' process that reads commands from its stdin.
+
+    Each command is followed by a sentinel line carrying the exit status so
+    the output of consecutive commands can be told apart on the shared pipe.
+    """
+
+    def __init__(self, shell="/bin/sh"):
+        self.marker = f"__SEQERAKIT_DONE_{uuid.uuid4().hex}__".encode()
+        self.env_key = _environment_key()
+        self.process = subprocess.Popen(
+            [shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, full_cmd):
+        # Commands must not read from the worker pipe, so stdin is detached.
+        # They are eval'd in a subshell so that a syntax error, e.g. an
+        # unbalanced quote, only fails that command and the sentinel is printed.
+        script = (
+            f"( eval {shlex.quote(full_cmd)} ) </dev/null 2>&1; "
+            f"printf '\\n%s %d\\n' {self.marker.decode()} $?\n"
+        )
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            return 127, ""
+
+        lines = []
+        for line in iter(self.process.stdout.readline, b""):
+            if line.startswith(self.marker):
+                returncode = int(line[len(self.marker) :].strip() or b"1")
+                return returncode, b"".join(lines).decode("utf-8").strip()
+            lines.append(line)
+
+        # The shell exited before printing the sentinel (e.g. syntax error)
+        returncode = self.process.wait()
+        return returncode, b"".join(lines).decode("utf-8").strip()
+
+    def close(self):
+        if self.alive():
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
+
+
+class BatchExecutor:
+    """
+    Feeds commands over a pipe to a pool of long-lived shell workers,
+    avoiding the '/bin/sh' startup cost of SubprocessExecutor for every
+    command.
+
+    Workers are spawned lazily, up to 'workers' at a time, and are restarted
+    when they exit or when the environment of the current process changed
+    since they were started (so that exported variables stay visible).
+    """
+
+    name = "batch"
+
+    def __init__(self, workers=1, shell="/bin/sh"):
+        if workers < 1:
+            raise ValueError("BatchExecutor requires at least one worker.")
+        self.shell = shell
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = None
+
+        if worker is not None and (
+            not worker.alive() or worker.env_key != _environment_key()
+        ):
+            self._discard(worker)
+            worker = None
+
+        if worker is None:
+            logging.debug(" Starting a new batch executor shell worker")
+            worker = _ShellWorker(self.shell)
+            with self._lock:
+                self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker):
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def run(self, full_cmd):
+        if isinstance(full_cmd, list):
+            # Arguments are already expanded, quote them so the shell keeps them
+            full_cmd = shlex.join(full_cmd)
+        worker = self._acquire()
+        try:
+            returncode, stdout = worker.run(full_cmd)
+        except BaseException:
+            self._discard(worker)
+            self._slots.release()
+            raise
+        if worker.alive():
+            self._idle.put(worker)
+        else:
+            self._discard(worker)
+        self._slots.release()
+        return returncode, stdout
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+
+EXECUTORS = {
+    SubprocessExecutor.name: SubprocessExecutor,
+    BatchExecutor.name: BatchExecutor,
+}
+
+
+def get_executor(executor=None, **kwargs):
+    """
+    Returns an executor instance from a name in EXECUTORS, an existing executor
+    instance, or the default SubprocessExecutor if executor is None.
+    """
+    if executor is None:
+        return SubprocessExecutor()
+    if isinstance(executor, str):
+        try:
+            executor_cls = EXECUTORS[executor]
+        except KeyError:
+            raise ValueError(
+                f"Invalid executor: '{executor}'. "
+                f"Valid options are: {', '.join(EXECUTORS)}"
+            )
+        return executor_cls(**kwargs)
+    return executor
+
+
+def _environment_key():
+    return hash(frozenset(os.environ.items()))
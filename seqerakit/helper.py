@@ -17,23 +17,36 @@ This file contains helper functions for the library.
 Including handling methods for each block in the YAML file, and parsing
 methods for each block in the YAML file.
 """
-import yaml  # type: ignore
-from seqerakit import utils
+
+from seqerakit import tracing, utils, yaml_io
+from seqerakit.merge import MergeEngine
 import sys
-import json
+from concurrent.futures import ProcessPoolExecutor
 from seqerakit.on_exists import OnExists
 
 
-def parse_yaml_block(yaml_data, block_name, sp=None):
+def parse_yaml_block(yaml_data, block_name, sp=None, skip=None):
+    # Parse every resource of the block into a list of command line arguments.
+    cmd_args_list = [
+        args for _, args in iter_yaml_block(yaml_data, block_name, sp, skip=skip)
+    ]
+
+    # Return the block name and list of command line argument lists.
+    return block_name, cmd_args_list
+
+
+def iter_yaml_block(yaml_data, block_name, sp=None, skip=None):
+    """
+    Parses the resources of a block one at a time, yielding the block name and
+    the command line arguments of each resource. Resources for which
+    skip(block_name, item) returns True are not parsed.
+    """
     # Get the name of the specified block/resource.
     block = yaml_data.get(block_name)
 
-    # If block is not found in the YAML, return an empty list.
+    # If block is not found in the YAML, there is nothing to parse.
     if not block:
-        return block_name, []
-
-    # Initialize an empty list to hold the lists of command line arguments.
-    cmd_args_list = []
+        return
 
     # Initialize a set to track the --name values within the block.
     name_values = set()
@@ -41,6 +54,9 @@ def parse_yaml_block(yaml_data, block_name, sp=None):
     # Iterate over each item in the block.
     # TODO: fix for resources that can be duplicate named in an org
     for item in block:
+        if skip is not None and skip(block_name, item):
+            name_values.add(_item_name(item))
+            continue
         cmd_args = parse_block(block_name, item, sp)
         name = find_name(cmd_args)
         if name in name_values:
@@ -50,63 +66,110 @@ def parse_yaml_block(yaml_data, block_name, sp=None):
             )
         name_values.add(name)
 
-        cmd_args_list.append(cmd_args)
+        yield block_name, cmd_args
 
-    # Return the block name and list of command line argument lists.
-    return block_name, cmd_args_list
+
+def _item_name(item):
+    # Same as find_name() for a resource that is not parsed
+    for key in ("name", "user", "email"):
+        if key in item:
+            return str(item[key])
+    return None
+
+
+# Top-level YAML keys holding settings of seqerakit rather than resources
+SETTINGS_KEYS = {"retry"}
 
 
-def parse_all_yaml(file_paths, destroy=False, targets=None, sp=None):
+# Minimum number of YAML files for them to be parsed on a pool of processes
+PARALLEL_PARSE_MIN_FILES = 32
+
+
+def _load_yaml_file(file_path):
+    """
+    Returns the data of a YAML file, the lines of the items of its lists, and
+    an error message if it is empty or not valid YAML. Runs in the processes
+    parsing the YAML files in parallel.
+    """
+    try:
+        with open(file_path, "r") as f:
+            data, lines = yaml_io.load_with_lines(f)
+    except yaml_io.YAMLError as e:
+        return None, None, f" The file '{file_path}' is not valid YAML: {e}"
+    if not data:
+        error = f" The file '{file_path}' is empty or does not contain valid data."
+        return None, None, error
+    return data, lines, None
+
+
+def _load_yaml_files(file_paths, workers=1):
+    """
+    Returns the data of the YAML files in the order of file_paths, parsing
+    them on a pool of processes when there are enough of them.
+    """
+    if workers > 1 and len(file_paths) >= PARALLEL_PARSE_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(file_paths) // (workers * 4))
+            return list(pool.map(_load_yaml_file, file_paths, chunksize=chunksize))
+    return [_load_yaml_file(file_path) for file_path in file_paths]
+
+
+@tracing.traced("parse")
+def load_all_yaml(file_paths, settings=None, workers=1):
+    """
+    Reads the YAML files, or stdin for "-", and merges them into one
+    dictionary with a MergeEngine, dropping the resources defined identically
+    in several files and failing on conflicting definitions of a resource.
+    The top-level keys configuring seqerakit itself are copied to settings.
+
+    With workers > 1, many files are parsed on a pool of that many processes,
+    and merged in the order they were given. The files that cannot be parsed
+    are all reported in a single ValueError.
+    """
     # If multiple yamls, merge them into one dictionary
-    merged_data = {}
+    engine = MergeEngine()
 
     # Special handling for stdin represented by "-"
     if not file_paths or "-" in file_paths:
         # Read YAML directly from stdin
-        data = yaml.safe_load(sys.stdin)
+        data, lines = yaml_io.load_with_lines(sys.stdin)
         if not data:
             raise ValueError(
                 " The input from stdin is empty or does not contain valid YAML data."
             )
-        merged_data.update(data)
+        engine.add(data, "<stdin>", lines)
 
-    for file_path in file_paths:
-        if file_path == "-":
-            continue
-        try:
-            with open(file_path, "r") as f:
-                data = yaml.safe_load(f)
-                if not data:
-                    raise ValueError(
-                        f" The file '{file_path}' is empty or "
-                        "does not contain valid data."
-                    )
-            # Process each key-value pair in YAML data
-            for key, new_value in data.items():
-                # Check if key exist in merged_data and
-                # new value is a list of dictionaries
-                if (
-                    key in merged_data
-                    and isinstance(new_value, list)
-                    and all(isinstance(i, dict) for i in new_value)
-                ):
-                    # Serialize dictionaries to JSON strings for comparison
-                    existing_items = {
-                        json.dumps(d, sort_keys=True) for d in merged_data[key]
-                    }
-                    for item in new_value:
-                        # Check if item is not already present in merged data
-                        item_json = json.dumps(item, sort_keys=True)
-                        if item_json not in existing_items:
-                            # Append item to merged data
-                            merged_data[key].append(item)
-                else:
-                    merged_data[key] = new_value
-
-        except FileNotFoundError:
-            print(f"Error: The file '{file_path}' was not found.")
-            sys.exit(1)
+    file_paths = [file_path for file_path in file_paths if file_path != "-"]
+    try:
+        loaded = _load_yaml_files(file_paths, workers=workers)
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        sys.exit(1)
 
+    errors = [error for _, _, error in loaded if error is not None]
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    for file_path, (data, lines, _) in zip(file_paths, loaded):
+        engine.add(data, file_path, lines)
+    if engine.conflicts:
+        raise ValueError("\n".join(engine.conflict_messages()))
+    merged_data = engine.data
+
+    # Copy the top-level keys configuring seqerakit itself (e.g. 'retry')
+    if settings is not None:
+        for key in SETTINGS_KEYS:
+            if key in merged_data:
+                settings[key] = merged_data[key]
+
+    return merged_data
+
+
+def ordered_blocks(merged_data, destroy=False, targets=None):
+    """
+    Returns the blocks of a merged YAML configuration in the order their
+    resources must be created, or deleted if destroy is True.
+    """
     block_names = list(merged_data.keys())
 
     # Filter blocks based on targets if provided
@@ -137,20 +200,68 @@ def parse_all_yaml(file_paths, destroy=False, targets=None, sp=None):
     if destroy:
         resource_order = resource_order[:-1][::-1]
 
+    return [block_name for block_name in resource_order if block_name in block_names]
+
+
+@tracing.traced("parse")
+def parse_all_yaml(
+    file_paths,
+    destroy=False,
+    targets=None,
+    sp=None,
+    settings=None,
+    workers=1,
+    skip=None,
+):
+    merged_data = load_all_yaml(file_paths, settings=settings, workers=workers)
+
     # Initialize an empty dictionary to hold all the command arguments.
     cmd_args_dict = {}
 
     # Iterate over each block name in the desired order.
-    for block_name in resource_order:
-        if block_name in block_names:
-            # Parse the block and add its command line arguments to the dictionary.
-            block_name, cmd_args_list = parse_yaml_block(merged_data, block_name, sp)
-            cmd_args_dict[block_name] = cmd_args_list
+    for block_name in ordered_blocks(merged_data, destroy=destroy, targets=targets):
+        # Parse the block and add its command line arguments to the dictionary.
+        with tracing.span("parse_yaml_block", "parse", block=block_name):
+            block_name, cmd_args_list = parse_yaml_block(
+                merged_data, block_name, sp, skip=skip
+            )
+        cmd_args_dict[block_name] = cmd_args_list
 
     # Return the dictionary of command arguments.
     return cmd_args_dict
 
 
+def iter_parse_all_yaml(
+    file_paths,
+    destroy=False,
+    targets=None,
+    sp=None,
+    settings=None,
+    workers=1,
+    skip=None,
+):
+    """
+    Like parse_all_yaml(), but returns an iterator of the block name and
+    command line arguments of each resource, in the same order.
+
+    The files are read and merged, and settings filled in, before returning.
+    Each resource is only parsed when the iterator reaches it, so that the
+    side effects of parsing (e.g. resolving datasets or writing params files)
+    are spread over the run, and the parsed resources do not all need to be
+    held in memory at once.
+    """
+    merged_data = load_all_yaml(file_paths, settings=settings, workers=workers)
+    block_names = ordered_blocks(merged_data, destroy=destroy, targets=targets)
+    return _iter_resources(merged_data, block_names, sp, skip)
+
+
+def _iter_resources(merged_data, block_names, sp, skip=None):
+    for block_name in block_names:
+        # Release the items of each block once it has been parsed
+        block = {block_name: merged_data.pop(block_name)}
+        yield from iter_yaml_block(block, block_name, sp, skip=skip)
+
+
 def parse_block(block_name, item, sp=None):
     # Define the mapping from block names to functions.
     block_to_function = {
@@ -473,8 +584,21 @@ def find_name(cmd_args):
     Returns:
     - The value associated with the first key found, or None if none are found.
     """
-    # Predefined list of keys to search for
-    keys = {"--name", "--user", "--email"}
+    return find_option(cmd_args.get("cmd_args", []), {"--name", "--user", "--email"})
+
+
+def find_option(cmd_args, keys):
+    """
+    Find and return the value following the first of the given option keys in
+    cmd_args, searching nested lists and tuples depth-first.
+
+    Parameters:
+    - cmd_args: The command arguments (list, tuple, or nested structures).
+    - keys: A collection of option names to search for (e.g. {"--workspace"}).
+
+    Returns:
+    - The value associated with the first key found, or None if none are found.
+    """
 
     def search(args):
         it = iter(args)
@@ -487,4 +611,17 @@ def find_name(cmd_args):
                     return result
         return None
 
-    return search(cmd_args.get("cmd_args", []))
+    return search(cmd_args)
+
+
+def find_scope(block, cmd_args):
+    """
+    Find and return the organization or workspace that a resource belongs to,
+    i.e. '--organization' for organization-level resources and '--workspace'
+    for the others. Returns None for organizations.
+    """
+    if block == "organizations":
+        return None
+    if block in ("teams", "members", "workspaces"):
+        return find_option(cmd_args, {"--organization"})
+    return find_option(cmd_args, {"--workspace", "-w"})
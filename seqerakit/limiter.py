@@ -0,0 +1,195 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Limit on the number of 'tw' commands running at the same time, adapted to the
+latency and errors observed from Seqera Platform.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from seqerakit import tracing
+from seqerakit.cache import command_name, command_scope
+from seqerakit.retry import RETRYABLE_PATTERNS
+
+# Weight of the latest latency in the moving average of each command
+LATENCY_SMOOTHING = 0.1
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of commands running at the same time, overall and per
+    workspace or organization.
+
+    The overall limit follows an AIMD (additive increase, multiplicative
+    decrease) scheme: it grows by one for every 'limit' commands that complete
+    with a latency close to the average of previous runs of the same command,
+    and is halved when a command fails with a throttling or server error. Only
+    commands started after the last decrease can decrease it again, so that a
+    burst of errors from the same period halves it once.
+
+    Args:
+        max_limit: Maximum number of commands running at the same time.
+        min_limit: Minimum number of commands running at the same time.
+        initial: Initial limit, half of max_limit by default when adaptive, and
+        max_limit otherwise.
+        max_per_scope: Optional maximum number of commands running at the same
+        time in a workspace or organization.
+        adaptive: If False, the limit stays at its initial value.
+        latency_tolerance: Factor of the average latency of a command above
+        which its latency is considered unstable and the limit is not increased.
+    """
+
+    def __init__(
+        self,
+        max_limit,
+        min_limit=1,
+        initial=None,
+        max_per_scope=None,
+        adaptive=True,
+        latency_tolerance=2.0,
+    ):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("The concurrency limits must be at least 1.")
+        if max_per_scope is not None and max_per_scope < 1:
+            raise ValueError("The concurrency limit per workspace must be at least 1.")
+        if initial is None:
+            initial = max(min_limit, max_limit // 2) if adaptive else max_limit
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.max_per_scope = max_per_scope
+        self.adaptive = adaptive
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in RETRYABLE_PATTERNS]
+        self.peak = self.lowest = int(self.limit)
+        self.increases = 0
+        self.decreases = 0
+        self.waits = 0
+        self._in_flight = 0
+        self._scope_in_flight = Counter()
+        self._latencies = {}
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def _available(self, scope):
+        if self._in_flight >= int(self.limit):
+            return False
+        return (
+            scope is None
+            or self.max_per_scope is None
+            or self._scope_in_flight[scope] < self.max_per_scope
+        )
+
+    def acquire(self, scope=None):
+        """
+        Waits for a slot to run a command and returns the time it started.
+        """
+        with self._condition:
+            if not self._available(scope):
+                self.waits += 1
+                logging.debug(
+                    f" Waiting for a command slot ({self._in_flight} running, "
+                    f"limit {int(self.limit)})"
+                )
+                with tracing.span("wait for command slot", "wait", scope=scope):
+                    self._condition.wait_for(lambda: self._available(scope))
+            self._in_flight += 1
+            if scope is not None:
+                self._scope_in_flight[scope] += 1
+        return time.monotonic()
+
+    def release(self, scope, started, name=None, returncode=0, output=""):
+        """
+        Frees the slot of a command and adapts the limit to its outcome.
+        """
+        latency = time.monotonic() - started
+        with self._condition:
+            self._in_flight -= 1
+            if scope is not None:
+                self._scope_in_flight[scope] -= 1
+                if not self._scope_in_flight[scope]:
+                    del self._scope_in_flight[scope]
+            if self.adaptive:
+                if returncode != 0 and self.is_throttled(output):
+                    self._decrease(started)
+                elif returncode == 0:
+                    self._observe(name, latency)
+            self._condition.notify_all()
+
+    def call(self, command, fn):
+        """
+        Runs fn, which returns the (returncode, output) of a 'tw' command, in a
+        slot of the workspace or organization of the command.
+        """
+        scope = command_scope(command) if command is not None else None
+        name = command_name(command) if command is not None else None
+        started = self.acquire(scope)
+        returncode, output = 1, ""
+        try:
+            returncode, output = fn()
+        finally:
+            self.release(scope, started, name, returncode, output)
+        return returncode, output
+
+    def is_throttled(self, output):
+        return any(pattern.search(output) for pattern in self.patterns)
+
+    def _decrease(self, started):
+        if started < self._last_decrease:
+            return
+        previous = int(self.limit)
+        self.limit = max(float(self.min_limit), self.limit / 2)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+        self.lowest = min(self.lowest, int(self.limit))
+        logging.debug(
+            f" Concurrency limit decreased from {previous} to {int(self.limit)} "
+            "after a throttling or server error"
+        )
+
+    def _observe(self, name, latency):
+        average = self._latencies.get(name)
+        if average is None:
+            self._latencies[name] = latency
+        else:
+            self._latencies[name] = (
+                1 - LATENCY_SMOOTHING
+            ) * average + LATENCY_SMOOTHING * latency
+            if latency > self.latency_tolerance * average:
+                logging.debug(
+                    f" Not increasing the concurrency limit, latency {latency:.2f}s "
+                    f"is above the average of {average:.2f}s"
+                )
+                return
+        if self.limit >= self.max_limit:
+            return
+        previous = int(self.limit)
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        if int(self.limit) > previous:
+            self.increases += 1
+            self.peak = max(self.peak, int(self.limit))
+            logging.debug(f" Concurrency limit increased to {int(self.limit)}")
+
+    def summary(self):
+        return (
+            f" Concurrency limit: {int(self.limit)} at the end of the run "
+            f"(lowest {self.lowest}, highest {self.peak}, maximum {self.max_limit}), "
+            f"{self.increases} increases, {self.decreases} decreases after "
+            f"throttling or server errors, {self.waits} commands waited for a slot."
+        )
@@ -0,0 +1,146 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Merging of the YAML configurations of several files into one.
+"""
+
+import hashlib
+import json
+from collections import namedtuple
+
+# Keys identifying a resource within its workspace or organization
+NAME_KEYS = ("name", "user", "email")
+
+# Where a resource is defined: file path and line, or None if unknown
+Source = namedtuple("Source", ["file", "line"])
+
+
+def item_digest(item):
+    """
+    Returns a digest of the canonical JSON form of a resource, equal for
+    resources with the same keys and values in any order.
+    """
+    canonical = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+
+def item_identity(item):
+    """
+    Returns the name of a resource and the workspace or organization it
+    belongs to, or None if it has no name.
+    """
+    for key in NAME_KEYS:
+        if item.get(key) is not None:
+            scope = item.get("workspace", item.get("organization"))
+            return str(item[key]), None if scope is None else str(scope)
+    return None
+
+
+class MergeEngine:
+    """
+    Merges the YAML configurations of several files into one dictionary.
+
+    Lists of resources under the same key are concatenated, without the
+    resources already defined identically by a previous file. Identical
+    resources are found with a set of digests per key, kept across files, so
+    that merging takes a time linear in the number of resources. Resources
+    with the same name in the same workspace or organization but different
+    definitions are reported as conflicts. Other values are replaced by those
+    of the last file defining them.
+
+    The file and line each resource comes from are kept in 'sources', with the
+    same keys and order as 'data'.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.sources = {}
+        self.conflicts = []
+        self._digests = {}
+        self._identities = {}
+
+    def add(self, data, file=None, lines=None):
+        """
+        Merges the configuration of a file, where lines holds the line numbers
+        of the items of its top-level lists as returned by
+        yaml_io.load_with_lines().
+        """
+        lines = lines or {}
+        for key, new_value in data.items():
+            if not (
+                isinstance(new_value, list)
+                and all(isinstance(i, dict) for i in new_value)
+            ):
+                self.data[key] = new_value
+                self._reset(key)
+                continue
+
+            item_lines = lines.get(key) or [None] * len(new_value)
+            if key not in self.sources:
+                existing = self.data.get(key)
+                existing = existing if isinstance(existing, list) else []
+                self._reset(key)
+                self.data[key] = list(existing)
+                self.sources[key] = [Source(None, None)] * len(existing)
+                self._digests[key].update(item_digest(i) for i in existing)
+
+            # Only resources merged from previous files are dropped, so that
+            # identical resources in the same file still fail as duplicates
+            previous = self._digests[key]
+            added = []
+            for item, line in zip(new_value, item_lines):
+                digest = item_digest(item)
+                if digest in previous:
+                    continue
+                source = Source(file, line)
+                self._check_conflict(key, item, digest, source)
+                self.data[key].append(item)
+                self.sources[key].append(source)
+                added.append(digest)
+            previous.update(added)
+
+    def _reset(self, key):
+        self._digests[key] = set()
+        self._identities[key] = {}
+        self.sources.pop(key, None)
+
+    def _check_conflict(self, key, item, digest, source):
+        identity = item_identity(item)
+        if identity is None:
+            return
+        existing = self._identities[key].get(identity)
+        if existing is None:
+            self._identities[key][identity] = (digest, source)
+        elif existing[0] != digest:
+            self.conflicts.append((key, identity, existing[1], source))
+
+    def conflict_messages(self):
+        messages = []
+        for key, (name, scope), first, second in self.conflicts:
+            where = f" in '{scope}'" if scope is not None else ""
+            messages.append(
+                f" Conflicting definitions of {key} '{name}'{where}: "
+                f"{format_source(first)} and {format_source(second)}. Please "
+                "define it once or give the definitions unique names."
+            )
+        return messages
+
+
+def format_source(source):
+    if source.file is None:
+        return "unknown location"
+    if source.line is None:
+        return str(source.file)
+    return f"{source.file}:{source.line}"
@@ -0,0 +1,364 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Timing of the 'tw' commands and resources of a run, and the performance report
+printed at the end of it.
+"""
+
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from seqerakit.cache import READ_ONLY_SUBCOMMANDS, command_name
+
+# Number of commands listed in the report as the slowest
+SLOWEST_COMMANDS = 10
+
+# Phases of a run that commands are counted in, by subcommand
+PHASES = {
+    **{subcommand: "check" for subcommand in READ_ONLY_SUBCOMMANDS},
+    "add": "create",
+    "create": "create",
+    "import": "create",
+    "update": "update",
+    "delete": "delete",
+}
+
+
+# Upper bounds in seconds of the buckets of the command latency histogram
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Outcomes of resources as labelled in the metrics textfile
+ACTION_LABELS = {
+    "create": "created",
+    "overwrite": "overwritten",
+    "update": "updated",
+    "delete": "deleted",
+    "unchanged": "skipped",
+    "ignore": "skipped",
+    "failed": "failed",
+    "dryrun": "dryrun",
+}
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    pairs = ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def command_phase(command):
+    """
+    Returns the phase of a run a 'tw' command belongs to, e.g. 'check' for the
+    commands listing resources to find out whether they already exist.
+    """
+    block, subcommand = command_name(command)
+    if block == "launch":
+        return "launch"
+    return PHASES.get(subcommand, "other")
+
+
+class RunStats:
+    """
+    Records the wall time, exit code, output size and number of retries of every
+    'tw' command, and the wall time of every resource, attributing commands to
+    the resource being applied by the same thread or task.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.commands = []
+        self.resources = []
+        self._lock = threading.Lock()
+        self._current_resource = contextvars.ContextVar(
+            f"seqerakit_resource_{id(self)}", default=None
+        )
+
+    def record_command(
+        self, command, started, returncode, output, retries=0, cached=False
+    ):
+        record = {
+            "command": " ".join(command),
+            "block": command_name(command)[0],
+            "subcommand": " ".join(part for part in command_name(command) if part),
+            "phase": command_phase(command),
+            "resource": None,
+            "seconds": time.monotonic() - started,
+            "returncode": returncode,
+            "output_bytes": len(output.encode("utf-8")) if output else 0,
+            "retries": retries,
+            "cached": cached,
+        }
+        resource = self._current_resource.get()
+        if resource is not None:
+            record["resource"] = f"{resource['block']}/{resource['name']}"
+            resource["phases"].add(record["phase"])
+        with self._lock:
+            self.commands.append(record)
+
+    @contextmanager
+    def resource(self, block, name):
+        """
+        Times the resource applied in the body of the with statement. The body
+        sets record["action"] to what was done with it, e.g. 'create'.
+        """
+        record = {"block": block, "name": name, "action": None, "seconds": None}
+        current = {"block": block, "name": name, "phases": set()}
+        token = self._current_resource.set(current)
+        started = time.monotonic()
+        try:
+            yield record
+        except BaseException:
+            record["action"] = "failed"
+            raise
+        finally:
+            record["seconds"] = time.monotonic() - started
+            self._current_resource.reset(token)
+            # A resource deleted before being created again was overwritten
+            if record["action"] == "create" and "delete" in current["phases"]:
+                record["action"] = "overwrite"
+            with self._lock:
+                self.resources.append(record)
+
+    def to_dict(self):
+        with self._lock:
+            commands = list(self.commands)
+            resources = list(self.resources)
+
+        blocks = defaultdict(
+            lambda: {"resources": 0, "seconds": 0.0, "commands": 0, "actions": {}}
+        )
+        for record in resources:
+            totals = blocks[record["block"]]
+            totals["resources"] += 1
+            totals["seconds"] += record["seconds"]
+            action = record["action"] or "none"
+            totals["actions"][action] = totals["actions"].get(action, 0) + 1
+        for record in commands:
+            if record["resource"] is not None:
+                blocks[record["resource"].split("/", 1)[0]]["commands"] += 1
+
+        phases = defaultdict(lambda: {"commands": 0, "seconds": 0.0})
+        for record in commands:
+            phases[record["phase"]]["commands"] += 1
+            phases[record["phase"]]["seconds"] += record["seconds"]
+
+        return {
+            "seconds": time.monotonic() - self.started,
+            "commands": len(commands),
+            "command_seconds": sum(record["seconds"] for record in commands),
+            "retries": sum(record["retries"] for record in commands),
+            "cached": sum(1 for record in commands if record["cached"]),
+            "output_bytes": sum(record["output_bytes"] for record in commands),
+            "blocks": dict(blocks),
+            "phases": dict(phases),
+            "slowest_commands": sorted(
+                commands, key=lambda record: record["seconds"], reverse=True
+            )[:SLOWEST_COMMANDS],
+            "command_log": commands,
+            "resource_log": resources,
+        }
+
+    def report(self):
+        """
+        Returns the performance report of the run as text.
+        """
+        data = self.to_dict()
+        lines = [
+            f" Performance report: {data['commands']} commands "
+            f"({data['cached']} cached, {data['retries']} retries) took "
+            f"{data['command_seconds']:.2f}s, the run took {data['seconds']:.2f}s.",
+            " Time per block:",
+        ]
+        for block, totals in data["blocks"].items():
+            actions = ", ".join(
+                f"{count} {action}"
+                for action, count in sorted(totals["actions"].items())
+            )
+            lines.append(
+                f"   {block}: {totals['resources']} resources ({actions}), "
+                f"{totals['commands']} commands, {totals['seconds']:.2f}s"
+            )
+        lines.append(" Time per phase:")
+        for phase, totals in sorted(data["phases"].items()):
+            lines.append(
+                f"   {phase}: {totals['commands']} commands, {totals['seconds']:.2f}s"
+            )
+        lines.append(" Slowest commands:")
+        for record in data["slowest_commands"]:
+            lines.append(
+                f"   {record['seconds']:.2f}s (exit code {record['returncode']}, "
+                f"{record['retries']} retries): {record['command']}"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_textfile(self, cache_stats=None, success=True, info=None):
+        """
+        Returns the metrics of the run in the text format read by the textfile
+        collector of the Prometheus node_exporter.
+
+        Args:
+            cache_stats: Optional ResultCache.stats() of the run.
+            success: Whether the run completed without errors.
+            info: Optional labels of the seqerakit_run_info metric, e.g. the
+            Platform endpoint.
+        """
+        data = self.to_dict()
+        metrics = []
+
+        def add(name, kind, description, samples):
+            lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for suffix, labels, value in samples:
+                lines.append(
+                    f"{name}{suffix}{_labels(**labels)} {_format_value(value)}"
+                )
+            metrics.append("\n".join(lines))
+
+        add(
+            "seqerakit_run_info",
+            "gauge",
+            "Information about the run.",
+            [("", info or {}, 1)],
+        )
+        add(
+            "seqerakit_run_duration_seconds",
+            "gauge",
+            "Duration of the run.",
+            [("", {}, data["seconds"])],
+        )
+        add(
+            "seqerakit_run_success",
+            "gauge",
+            "1 if the run completed without errors.",
+            [("", {}, int(success))],
+        )
+        add(
+            "seqerakit_run_timestamp_seconds",
+            "gauge",
+            "Time the run ended.",
+            [("", {}, time.time())],
+        )
+
+        latencies = {}
+        failures = {}
+        retries = {}
+        for record in data["command_log"]:
+            if record["cached"]:
+                continue
+            subcommand = record["subcommand"]
+            latencies.setdefault(subcommand, []).append(record["seconds"])
+            failures[subcommand] = failures.get(subcommand, 0) + int(
+                record["returncode"] != 0
+            )
+            retries[subcommand] = retries.get(subcommand, 0) + record["retries"]
+
+        samples = []
+        for subcommand, values in sorted(latencies.items()):
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for value in values if value <= bound)
+                samples.append(
+                    ("_bucket", {"subcommand": subcommand, "le": str(bound)}, count)
+                )
+            samples.append(
+                ("_bucket", {"subcommand": subcommand, "le": "+Inf"}, len(values))
+            )
+            samples.append(("_sum", {"subcommand": subcommand}, sum(values)))
+            samples.append(("_count", {"subcommand": subcommand}, len(values)))
+        add(
+            "seqerakit_command_duration_seconds",
+            "histogram",
+            "Duration of the tw commands, including retries.",
+            samples,
+        )
+        add(
+            "seqerakit_command_failures_total",
+            "counter",
+            "Number of tw commands that exited with an error.",
+            [("", {"subcommand": k}, v) for k, v in sorted(failures.items())],
+        )
+        add(
+            "seqerakit_command_retries_total",
+            "counter",
+            "Number of retries of tw commands after transient errors.",
+            [("", {"subcommand": k}, v) for k, v in sorted(retries.items())],
+        )
+
+        resources = {}
+        for record in data["resource_log"]:
+            action = ACTION_LABELS.get(record["action"], "none")
+            key = (record["block"], action)
+            resources[key] = resources.get(key, 0) + 1
+        add(
+            "seqerakit_resources_total",
+            "counter",
+            "Number of resources by block and outcome.",
+            [
+                ("", {"block": block, "action": action}, count)
+                for (block, action), count in sorted(resources.items())
+            ],
+        )
+
+        if cache_stats is not None:
+            hits, misses = cache_stats["hits"], cache_stats["misses"]
+            add(
+                "seqerakit_cache_hits_total",
+                "counter",
+                "Number of cache hits.",
+                [("", {}, hits)],
+            )
+            add(
+                "seqerakit_cache_misses_total",
+                "counter",
+                "Number of cache misses.",
+                [("", {}, misses)],
+            )
+            add(
+                "seqerakit_cache_hit_ratio",
+                "gauge",
+                "Ratio of read-only tw commands answered from the cache.",
+                [("", {}, hits / (hits + misses) if hits + misses else 0.0)],
+            )
+
+        return "\n".join(metrics) + "\n# EOF\n"
+
+    def write_textfile(self, path, **kwargs):
+        """
+        Writes the metrics of the run to a textfile, replacing it atomically so
+        that the node_exporter never reads a partially written file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            f.write(self.to_textfile(**kwargs))
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
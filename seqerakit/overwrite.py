@@ -13,12 +13,108 @@
 # limitations under the License.
 
 import json
-from seqerakit import utils
-from seqerakit.seqeraplatform import ResourceExistsError
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from seqerakit import tracing, utils
+from seqerakit.seqeraplatform import (
+    CommandError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
 from seqerakit.on_exists import OnExists
 import logging
 
 
+class ResourceIndex:
+    """
+    Parsed JSON output of a 'tw <block> list' command, with hash indexes on
+    record fields so that existence checks and ID lookups are O(1).
+
+    Every dictionary in the JSON document is a record, matching the recursive
+    search of utils.find_key_value_in_dict(). The items of top-level lists also
+    remember the key of their list (e.g. "workspaces" or "dataLinks").
+    Indexes are built lazily the first time a field is looked up.
+    """
+
+    def __init__(self, jsondata=None):
+        self.records = []
+        self._indexes = {}
+        if jsondata:
+            if isinstance(jsondata, (str, bytes)):
+                jsondata = json.loads(jsondata)
+            self._collect(jsondata)
+
+    def _collect(self, data):
+        if isinstance(data, dict):
+            self.records.append((None, data))
+            roots = list(data.items())
+        else:
+            roots = [(None, data)]
+
+        # Depth-first walk in document order, without recursion. Only the items
+        # of top-level lists are tagged with their collection.
+        stack = []
+        for collection, value in reversed(roots):
+            if isinstance(value, list):
+                stack.extend((collection, item) for item in reversed(value))
+            else:
+                stack.append((collection, value))
+        while stack:
+            collection, value = stack.pop()
+            if isinstance(value, dict):
+                self.records.append((collection, value))
+                children = list(value.values())
+            elif isinstance(value, list):
+                children = value
+            else:
+                continue
+            stack.extend((None, child) for child in reversed(children))
+
+    def _index(self, key):
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for entry in self.records:
+                value = entry[1].get(key)
+                if value is not None and not isinstance(value, (dict, list)):
+                    index.setdefault(value, []).append(entry)
+            self._indexes[key] = index
+        return index
+
+    def find(self, criteria, collection=None):
+        """
+        Return the first record whose fields match all of the criteria, optionally
+        restricted to records under a top-level key, or None if there is none.
+        """
+        (first_key, first_value), *others = criteria.items()
+        for entry_collection, record in self._index(first_key).get(first_value, []):
+            if collection is not None and entry_collection != collection:
+                continue
+            if all(record.get(key) == value for key, value in others):
+                return record
+        return None
+
+    def exists(self, key, value):
+        return bool(self._index(key).get(value))
+
+    def add(self, record, collection=None):
+        entry = (collection, record)
+        self.records.append(entry)
+        for key, index in self._indexes.items():
+            value = record.get(key)
+            if value is not None and not isinstance(value, (dict, list)):
+                index.setdefault(value, []).append(entry)
+
+    def remove(self, record):
+        self.records = [entry for entry in self.records if entry[1] is not record]
+        for index in self._indexes.values():
+            for value, entries in list(index.items()):
+                entries[:] = [entry for entry in entries if entry[1] is not record]
+                if not entries:
+                    del index[value]
+
+
 class Overwrite:
     """
     Manages overwrite functionality for Seqera Platform resources.
@@ -50,13 +146,18 @@ class Overwrite:
 
         Attributes:
         sp: A SeqeraPlatform class instance used to execute CLI commands.
-        cached_jsondata: A cached placeholder for JSON data. Default value is None.
-        block_jsondata: A dictionary to store JSON data for each block.
-        Key is the block name, and value is the corresponding JSON data.
+        block_jsondata: A dictionary to store JSON data for each block and scope.
+        Key is a tuple of the block name and the workspace or organization the
+        block was listed in (None for unscoped blocks), and value is the
+        corresponding ResourceIndex. It is shared by the threads applying
+        resources, and only accessed while holding the lock, whereas 'tw'
+        commands run without it.
         """
         self.sp = sp
-        self.cached_jsondata = None
-        self.block_jsondata = {}  # New dict to hold JSON data per block
+        self.block_jsondata = {}  # Dict to hold JSON data per (block, scope)
+        self._partial = set()  # Keys of lists updated by record_created()
+        self._missing = set()  # Keys of lists whose scope does not exist yet
+        self._lock = threading.RLock()
 
         # Define special handlers for resources deleted with specific args
         self.block_operations = {
@@ -98,6 +199,78 @@ class Overwrite:
                 "name_key": "name",
             },
         }
+        for block in Overwrite.generic_deletion:
+            self.block_operations[block] = {
+                "keys": ["name", "workspace"],
+                "method_args": self._get_generic_deletion_args,
+                "name_key": "name",
+            }
+
+        # Define resources that can be updated in place with 'tw <block> update'.
+        # 'options' are the options of the YAML definition that can be updated,
+        # or None if all of them can. If any other option is set, or for blocks
+        # missing from this table (e.g. compute-envs, which can only be renamed),
+        # the resource is deleted and created again instead.
+        self.block_updates = {
+            "organizations": {
+                "options": {
+                    "--name",
+                    "--full-name",
+                    "--description",
+                    "--location",
+                    "--website",
+                },
+                "method_args": self._get_update_args,
+            },
+            "workspaces": {
+                "options": {
+                    "--name",
+                    "--organization",
+                    "--full-name",
+                    "--description",
+                },
+                "method_args": self._get_workspace_update_args,
+            },
+            "labels": {
+                "options": {"--name", "--value", "--workspace"},
+                "method_args": self._get_label_update_args,
+            },
+            "participants": {
+                "options": {"--name", "--type", "--workspace", "--role"},
+                "method_args": self._get_update_args,
+            },
+            "credentials": {
+                "options": None,
+                "method_args": self._get_update_args,
+            },
+            "secrets": {
+                "options": {"--name", "--value", "--workspace"},
+                "method_args": self._get_update_args,
+            },
+            "pipelines": {
+                "options": {
+                    "--name",
+                    "--workspace",
+                    "--description",
+                    "--compute-env",
+                    "--work-dir",
+                    "--profile",
+                    "--params-file",
+                    "--revision",
+                    "--config",
+                    "--pre-run",
+                    "--post-run",
+                    "--pull-latest",
+                    "--stub-run",
+                    "--main-script",
+                    "--entry-name",
+                    "--schema-name",
+                    "--user-secrets",
+                    "--workspace-secrets",
+                },
+                "method_args": self._get_pipeline_update_args,
+            },
+        }
 
     def handle_overwrite(
         self, block, args, on_exists=OnExists.FAIL, destroy=False, overwrite=None
@@ -112,6 +285,8 @@ class Overwrite:
                 - OnExists.FAIL (default): Raise an error if resource exists
                 - OnExists.IGNORE: Skip creation if resource exists
                 - OnExists.OVERWRITE: Delete existing resource and create new one
+                - OnExists.UPDATE: Update existing resource in place if possible,
+                  otherwise delete it and create a new one
             destroy: Whether to delete the resource
             overwrite: Legacy parameter for backward compatibility
         """
@@ -129,54 +304,55 @@ class Overwrite:
         if overwrite is not None:
             on_exists = OnExists.OVERWRITE if overwrite else OnExists.FAIL
 
-        if block in Overwrite.generic_deletion:
-            self.block_operations[block] = {
-                "keys": ["name", "workspace"],
-                "method_args": self._get_generic_deletion_args,
-                "name_key": "name",
-            }
-
-        if block in self.block_operations:
-            operation = self.block_operations[block]
-            keys_to_get = operation["keys"]
-            self.cached_jsondata, sp_args = self._get_json_data(
-                block, args, keys_to_get
-            )
-
-            if block == "participants":
-                if sp_args.get("type") == "TEAM":
-                    self.block_operations["participants"]["name_key"] = "teamName"
-                else:
-                    self.block_operations["participants"]["name_key"] = "email"
-            elif block == "members":
-                # Rename the user key to name to correctly index JSON data
-                sp_args["name"] = sp_args.pop("user")
-
-            if self.check_resource_exists(operation["name_key"], sp_args):
-                # Handle based on on_exists parameter
-                if on_exists == OnExists.OVERWRITE:
-                    logging.info(
-                        f" The attempted {block} resource already exists."
-                        " Overwriting.\n"
-                    )
-                    self.delete_resource(block, operation, sp_args)
-                elif on_exists == OnExists.IGNORE:
-                    logging.info(
-                        f" The {block} resource already exists." " Skipping creation.\n"
-                    )
-                    return False
-                elif destroy:
-                    logging.info(f" Deleting the {block} resource.")
-                    self.delete_resource(block, operation, sp_args)
-                else:  # fail
-                    raise ResourceExistsError(
-                        f"The {block} resource already exists and "
-                        "will not be created. Please set 'on_exists: overwrite' "
-                        "to replace the resource or set 'on_exists: ignore' to "
-                        "ignore this error.\n"
-                    )
+        with tracing.span(f"{block} existence check", "check"):
+            if block in self.block_operations:
+                operation = self.block_operations[block]
+                keys_to_get = operation["keys"]
+                index, key, sp_args = self._get_json_data(block, args, keys_to_get)
+
+                if block == "members":
+                    # Copy the user key to name to correctly index JSON data
+                    sp_args["name"] = sp_args["user"]
+
+                name_key = self._get_name_key(block, sp_args)
+                if self.check_resource_exists(name_key, sp_args, index):
+                    # Handle based on on_exists parameter
+                    if on_exists == OnExists.OVERWRITE:
+                        logging.info(
+                            f" The attempted {block} resource already exists."
+                            " Overwriting.\n"
+                        )
+                        self.delete_resource(block, operation, sp_args, key)
+                    elif on_exists == OnExists.UPDATE:
+                        if self.can_update(block, args):
+                            logging.info(
+                                f" The {block} resource already exists." " Updating.\n"
+                            )
+                            self.update_resource(block, args, sp_args, key)
+                            return False
+                        logging.info(
+                            f" The {block} resource already exists and cannot be"
+                            " updated in place. Overwriting.\n"
+                        )
+                        self.delete_resource(block, operation, sp_args, key)
+                    elif on_exists == OnExists.IGNORE:
+                        logging.info(
+                            f" The {block} resource already exists."
+                            " Skipping creation.\n"
+                        )
+                        return False
+                    elif destroy:
+                        logging.info(f" Deleting the {block} resource.")
+                        self.delete_resource(block, operation, sp_args, key)
+                    else:  # fail
+                        raise ResourceExistsError(
+                            f"The {block} resource already exists and "
+                            "will not be created. Please set 'on_exists: overwrite' "
+                            "to replace the resource or set 'on_exists: ignore' to "
+                            "ignore this error.\n"
+                        )
+                return True
             return True
-        return True
 
     def _get_organization_args(self, args):
         """
@@ -187,22 +363,14 @@ class Overwrite:
     def _get_team_args(self, args):
         """
         Returns a list of arguments for the delete() method for teams. The teamId
-        used to delete will be retrieved using the find_key_value_in_dict() method.
+        used to delete will be retrieved from the indexed teams list.
         """
-        jsondata = self.block_jsondata.get("teams", None)
-
-        if not jsondata:
-            json_method = getattr(self.sp, "-o json")
-            with self.sp.suppress_output():
-                json_out = json_method("teams", "list", "-o", args["organization"])
-            self.block_jsondata["teams"] = json_out
-        else:
-            json_out = jsondata
+        index = self._get_list("teams", ("-o", args["organization"]))
 
         # Get the teamId from the json data
-        team_id = utils.find_key_value_in_dict(
-            json.loads(json_out), "name", utils.resolve_env_var(args["name"]), "teamId"
-        )
+        with self._lock:
+            team = index.find({"name": utils.resolve_env_var(args["name"])})
+        team_id = team.get("teamId") if team else None
         return ("delete", "--id", str(team_id), "--organization", args["organization"])
 
     def _get_members_args(self, args):
@@ -249,9 +417,11 @@ class Overwrite:
         label_id used to delete will be retrieved using the _find_id() method.
         """
         if resource_type == "labels":
-            resource_id = self._find_id(resource_type, args["name"], args["value"])
+            resource_id = self._find_id(
+                resource_type, args["workspace"], args["name"], args["value"]
+            )
         else:  # data-links
-            resource_id = self._find_id(resource_type, args["name"])
+            resource_id = self._find_id(resource_type, args["workspace"], args["name"])
 
         return ("delete", "--id", str(resource_id), "-w", args["workspace"])
 
@@ -274,71 +444,337 @@ class Overwrite:
         the command line arguments and return a dictionary of values.
 
         Also, gets json data from Seqera Platform by calling the list() method
-        once and caches the json data for that block in self.block_jsondata.
-        If the block data already exists, it will be retrieved from the dictionary
+        once per scope (the workspace or organization it is listed in) and caches
+        it in self.block_jsondata under the (block, scope) key. If the data for
+        that scope already exists, it will be retrieved from the dictionary
         instead of calling the list().
 
-        Returns a tuple of json data and a dictionary of values to run delete() on.
+        Returns a tuple of the json data, its key in self.block_jsondata and a
+        dictionary of values to run delete() on.
+        """
+        if block == "teams":
+            sp_args = self._get_values_from_cmd_args(args[0], keys_to_get)
+        else:
+            sp_args = self._get_values_from_cmd_args(args, keys_to_get)
+
+        list_args = self._get_list_args(block, sp_args)
+        key = (block, list_args[1] if list_args else None)
+        return self._get_list(block, list_args), key, sp_args
+
+    def _get_list_args(self, block, sp_args):
+        """
+        Returns the scope arguments of the list() method for a block, i.e. the
+        organization or workspace that the resource belongs to.
+        """
+        if block in {"teams", "members", "workspaces"}:
+            return ("-o", sp_args["organization"])
+        elif block in Overwrite.generic_deletion or block in {
+            "participants",
+            "labels",
+            "data-links",
+        }:
+            return ("-w", sp_args["workspace"])
+        return ()
+
+    def _get_list(self, block, list_args, refresh=False):
         """
+        Returns the cached ResourceIndex for a block in the scope given by
+        list_args, calling the list() method if it has not been fetched yet.
+        The list() method is called without holding the lock, so that threads
+        checking other resources are not blocked by it.
+        """
+        key = (block, list_args[1] if list_args else None)
+        with self._lock:
+            if not refresh and key in self.block_jsondata:
+                return self.block_jsondata[key]
+        index = self._fetch_list(block, list_args)
+        with self._lock:
+            if refresh or key not in self.block_jsondata:
+                self.block_jsondata[key] = index
+                self._partial.discard(key)
+            return self.block_jsondata[key]
+
+    def _fetch_list(self, block, list_args):
         json_method = getattr(self.sp, "-o json")
-        sp_args = []  # Default value for sp_args
+        scope = list_args[1] if list_args else None
+        with tracing.span(f"{block} list", "list", scope=scope):
+            with self.sp.suppress_output():
+                return ResourceIndex(json_method(block, "list", *list_args))
 
-        # Check if block data already exists
-        if block in self.block_jsondata:
-            self.cached_jsondata = self.block_jsondata[block]
-            if block == "teams":
-                sp_args = self._get_values_from_cmd_args(args[0], keys_to_get)
-            else:
-                sp_args = self._get_values_from_cmd_args(args, keys_to_get)
-        else:
-            # Fetch the data if it does not exist
-            if block == "teams":
-                sp_args = self._get_values_from_cmd_args(args[0], keys_to_get)
-                with self.sp.suppress_output():
-                    self.cached_jsondata = json_method(
-                        block, "list", "-o", sp_args["organization"]
-                    )
-            elif block in Overwrite.generic_deletion or block in {
-                "participants",
-                "labels",
-                "data-links",
-            }:
-                sp_args = self._get_values_from_cmd_args(args, keys_to_get)
-                with self.sp.suppress_output():
-                    self.cached_jsondata = json_method(
-                        block, "list", "-w", sp_args["workspace"]
-                    )
-            elif block == "members" or block == "workspaces":
-                sp_args = self._get_values_from_cmd_args(args, keys_to_get)
-                with self.sp.suppress_output():
-                    self.cached_jsondata = json_method(
-                        block, "list", "-o", sp_args["organization"]
-                    )
-            else:
-                sp_args = self._get_values_from_cmd_args(args, keys_to_get)
-                with self.sp.suppress_output():
-                    self.cached_jsondata = json_method(block, "list")
+    def _get_list_keys(self, cmd_args_dict):
+        """
+        Returns the list() arguments of every (block, scope) list needed to check
+        the resources in a parsed YAML configuration, keyed by cache key.
+        """
+        lists = {}
+        for block, args_list in cmd_args_dict.items():
+            if block not in self.block_operations:
+                continue
+            keys = self.block_operations[block]["keys"]
+            for args in args_list:
+                cmd_args = args["cmd_args"]
+                if block == "teams":
+                    cmd_args = cmd_args[0]
+                sp_args = self._get_values_from_cmd_args(cmd_args, keys)
+                list_args = self._get_list_args(block, sp_args)
+                lists[(block, list_args[1] if list_args else None)] = list_args
+        return lists
+
+    def prefetch(self, cmd_args_dict, max_workers=4):
+        """
+        Fetches every list needed by a parsed YAML configuration concurrently and
+        seeds the cache with the results, so that applying the resources does
+        not stall on list() calls between creates.
+
+        Lists that cannot be fetched (e.g. for a workspace that will be created
+        in this run) are skipped and fetched lazily when first needed.
+
+        Returns the number of lists that were fetched.
+        """
+        start = time.monotonic()
+        with self._lock:
+            lists = {
+                key: list_args
+                for key, list_args in self._get_list_keys(cmd_args_dict).items()
+                if key not in self.block_jsondata
+            }
+        if not lists:
+            return 0
 
-        self.block_jsondata[block] = self.cached_jsondata
-        return self.cached_jsondata, sp_args
+        def fetch(item):
+            (block, scope), list_args = item
+            try:
+                return self._fetch_list(block, list_args)
+            except (CommandError, ResourceNotFoundError) as err:
+                logging.debug(f" Could not prefetch {block} list for {scope}: {err}")
+                return None
+
+        with tracing.span("prefetch", "list", lists=len(lists)):
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(fetch, lists.items()))
+
+        fetched = 0
+        with self._lock:
+            for key, index in zip(lists, results):
+                if index is not None and key not in self.block_jsondata:
+                    self.block_jsondata[key] = index
+                    fetched += 1
+        logging.info(
+            f" Prefetched {fetched} of {len(lists)} resource lists in "
+            f"{time.monotonic() - start:.2f}s"
+        )
+        return fetched
+
+    def _get_name_key(self, block, sp_args):
+        if block == "participants" and sp_args.get("type") == "TEAM":
+            return "teamName"
+        return self.block_operations[block]["name_key"]
+
+    def _get_record(self, block, sp_args):
+        """
+        Returns the fields identifying a resource in the output of list().
+        """
+        name = sp_args["name"] if block != "members" else sp_args["user"]
+        record = {self._get_name_key(block, sp_args): utils.resolve_env_var(name)}
+        if block == "labels":
+            record["value"] = utils.resolve_env_var(sp_args["value"])
+        elif block == "workspaces":
+            record["orgName"] = utils.resolve_env_var(sp_args["organization"])
+        return record
+
+    def record_created(self, block, args):
+        """
+        Adds a resource that was just created to the cached list for its scope,
+        so that later checks in the same run do not need to call list() again.
 
-    def check_resource_exists(self, name_key, sp_args):
+        The new entry only holds the fields identifying the resource. If an ID
+        is needed later (e.g. to delete it), the list for that scope is fetched
+        again.
+        """
+        if block not in self.block_operations:
+            return
+        with self._lock:
+            keys = self.block_operations[block]["keys"]
+            cmd_args = args[0] if block == "teams" else args
+            sp_args = self._get_values_from_cmd_args(cmd_args, keys)
+            list_args = self._get_list_args(block, sp_args)
+            key = (block, list_args[1] if list_args else None)
+            index = self.block_jsondata.get(key)
+            if index is None:
+                return
+            index.add(self._get_record(block, sp_args))
+            self._partial.add(key)
+
+    def _record_deleted(self, block, sp_args, key):
+        """
+        Removes a deleted resource from the cached list for its scope, stored
+        under key. Deleting a workspace or organization also drops the cached
+        lists of the resources it contained.
+        """
+        criteria = self._get_record(block, sp_args)
+        with self._lock:
+            index = self.block_jsondata.get(key)
+            record = index.find(criteria) if index is not None else None
+            while record is not None:
+                index.remove(record)
+                record = index.find(criteria)
+
+            if block == "workspaces":
+                scopes = {f"{sp_args['organization']}/{sp_args['name']}"}
+            elif block == "organizations":
+                scopes = {sp_args["name"]}
+            else:
+                return
+            for cached_key in list(self.block_jsondata):
+                scope = cached_key[1]
+                if scope is None or cached_key == key:
+                    continue
+                if scope in scopes or scope.split("/", 1)[0] in scopes:
+                    del self.block_jsondata[cached_key]
+
+    def find_resource(self, block, args):
+        """
+        Returns the record of an existing resource in the list() output for its
+        scope, or None if it does not exist. Only the cached list is used, which
+        is fetched first if needed. Resources in a workspace or organization
+        that does not exist yet (e.g. one created by the same configuration)
+        do not exist either.
+        """
+        operation = self.block_operations[block]
+        cmd_args = args[0] if block == "teams" else args
+        sp_args = self._get_values_from_cmd_args(cmd_args, operation["keys"])
+        list_args = self._get_list_args(block, sp_args)
+        key = (block, list_args[1] if list_args else None)
+        with self._lock:
+            if key in self._missing:
+                return None
+        try:
+            index = self._get_list(block, list_args)
+        except ResourceNotFoundError as err:
+            logging.debug(f" Could not list {block} for {key[1]}: {err}")
+            with self._lock:
+                self._missing.add(key)
+            return None
+        criteria = self._get_record(block, sp_args)
+        if block == "labels":
+            # Labels are matched by name, the value is compared by the plan
+            del criteria["value"]
+        with self._lock:
+            return index.find(criteria)
+
+    def check_resource_exists(self, name_key, sp_args, index):
         """
         Check if a resource exists in Seqera Platform by looking for the name and value
         in the json data generated from the list() method.
         """
-        return utils.check_if_exists(
-            self.cached_jsondata, name_key, utils.resolve_env_var(sp_args["name"])
+        if not index:
+            return False
+        resolved_value = utils.resolve_env_var(sp_args["name"])
+        logging.info(
+            f" Checking if {name_key} {resolved_value} exists in Seqera Platform..."
         )
-
-    def delete_resource(self, block, operation, sp_args):
+        with self._lock:
+            return index.exists(name_key, resolved_value)
+
+    def _refresh_partial(self, block, sp_args, key):
+        # Entries added by record_created() do not hold the IDs used to delete
+        # or update resources, so list the resources of the scope again
+        with self._lock:
+            partial = key in self._partial
+        if partial:
+            self._get_list(block, self._get_list_args(block, sp_args), refresh=True)
+
+    def delete_resource(self, block, operation, sp_args, key):
         """
         Delete a resource in Seqera Platform by calling the delete() method and
-        arguments defined in the operation dictionary.
+        arguments defined in the operation dictionary. key is the key of the
+        cached list of the resource in self.block_jsondata.
         """
+        self._refresh_partial(block, sp_args, key)
         method_args = operation["method_args"](sp_args)
         method = getattr(self.sp, block)
         method(*method_args)
+        self._record_deleted(block, sp_args, key)
+
+    def can_update(self, block, cmd_args):
+        """
+        Returns True if every option of a resource can be updated in place.
+        """
+        if block not in self.block_updates:
+            return False
+        options = self.block_updates[block]["options"]
+        if options is None:
+            return True
+        for arg in cmd_args:
+            if arg.startswith("--") and arg not in options:
+                return False
+        if block == "pipelines":
+            # Pipelines imported from a JSON file cannot be updated
+            return any(utils.is_url(arg) for arg in cmd_args)
+        return True
+
+    def update_resource(self, block, cmd_args, sp_args, key):
+        """
+        Update a resource in Seqera Platform in place by calling the update()
+        method with the arguments defined in the block_updates dictionary.
+        """
+        self._refresh_partial(block, sp_args, key)
+        method_args = self.block_updates[block]["method_args"](cmd_args, sp_args)
+        method = getattr(self.sp, block)
+        method(*method_args)
+
+    def _get_update_args(self, cmd_args, sp_args):
+        """
+        Returns a list of arguments for the update() method for resources that
+        are updated with the same options they are added with.
+        """
+        return ("update", *cmd_args)
+
+    def _get_workspace_update_args(self, cmd_args, sp_args):
+        """
+        Returns a list of arguments for the update() method for workspaces, which
+        are updated by workspaceId.
+        """
+        workspace_id = self._find_workspace_id(sp_args["organization"], sp_args["name"])
+        method_args = ["update", "--id", str(workspace_id)]
+        for option in ("--full-name", "--description"):
+            if option in cmd_args:
+                method_args.extend([option, cmd_args[cmd_args.index(option) + 1]])
+        return tuple(method_args)
+
+    def _get_label_update_args(self, cmd_args, sp_args):
+        """
+        Returns a list of arguments for the update() method for labels. Labels are
+        matched by name, so the label_id is looked up by name only.
+        """
+        index = self._get_list("labels", ("-w", sp_args["workspace"]))
+        with self._lock:
+            label = index.find(
+                {"name": utils.resolve_env_var(sp_args["name"])}, collection="labels"
+            )
+        label_id = label.get("id") if label else None
+        return (
+            "update",
+            "--id",
+            str(label_id),
+            "--value",
+            sp_args["value"],
+            "-w",
+            sp_args["workspace"],
+        )
+
+    def _get_pipeline_update_args(self, cmd_args, sp_args):
+        """
+        Returns a list of arguments for the update() method for pipelines, where
+        the repository URL is passed with '--pipeline'.
+        """
+        method_args = ["update"]
+        for arg in cmd_args:
+            if utils.is_url(arg):
+                method_args.extend(["--pipeline", arg])
+            else:
+                method_args.append(arg)
+        return tuple(method_args)
 
     def _get_values_from_cmd_args(self, cmd_args, keys):
         """
@@ -363,20 +799,18 @@ class Overwrite:
         organization name and workspace name. This ID will be used to delete the
         workspace.
         """
-        jsondata = json.loads(self.cached_jsondata)
-        workspaces = jsondata["workspaces"]
-
-        for workspace in workspaces:
-            if workspace.get("orgName") == utils.resolve_env_var(
-                organization
-            ) and workspace.get("workspaceName") == utils.resolve_env_var(
-                workspace_name
-            ):
-                workspace_id = workspace.get("workspaceId")
-                return workspace_id
-        return None
+        index = self._get_list("workspaces", ("-o", organization))
+        with self._lock:
+            workspace = index.find(
+                {
+                    "workspaceName": utils.resolve_env_var(workspace_name),
+                    "orgName": utils.resolve_env_var(organization),
+                },
+                collection="workspaces",
+            )
+        return workspace.get("workspaceId") if workspace else None
 
-    def _find_id(self, resource_type, name, value=None):
+    def _find_id(self, resource_type, workspace, name, value=None):
         """
         Finds the unique identifier (ID) for a Seqera Platform resource by searching
         through the cached JSON data. This method is necessary because certain Platform
@@ -386,6 +820,7 @@ class Overwrite:
             resource_type (str): Type of resource to search for. Currently supports:
                 - 'labels': Platform labels that require both name and value matching
                 - 'data-links': Data link resources that only require name matching
+            workspace (str): Workspace the resource belongs to
             name (str): Name of the resource to find
             value (str, optional): For labels only, the value field that must match
                 along with the name. Defaults to None for non-label resources.
@@ -397,20 +832,15 @@ class Overwrite:
         Note:
             - For labels, both name and value must match to find the correct ID
             - For data-links, only the name needs to match
-            - The method uses cached JSON data from previous API calls to avoid
+            - The method uses the indexed JSON data from previous API calls to avoid
               redundant requests to the Platform
         """
-        jsondata = json.loads(self.cached_jsondata)
         json_key = "dataLinks" if resource_type == "data-links" else resource_type
-        resources = jsondata[json_key]
-
-        for resource in resources:
-            if resource_type == "labels":
-                if resource.get("name") == utils.resolve_env_var(name) and resource.get(
-                    "value"
-                ) == utils.resolve_env_var(value):
-                    return resource.get("id")
-            elif resource_type == "data-links":
-                if resource.get("name") == utils.resolve_env_var(name):
-                    return resource.get("id")
-        return None
+        criteria = {"name": utils.resolve_env_var(name)}
+        if resource_type == "labels":
+            criteria["value"] = utils.resolve_env_var(value)
+
+        index = self._get_list(resource_type, ("-w", workspace))
+        with self._lock:
+            resource = index.find(criteria, collection=json_key)
+        return resource.get("id") if resource else None
@@ -0,0 +1,277 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compute the changes needed to bring Seqera Platform in line with a YAML
+configuration, using only the output of 'tw <block> list' commands.
+"""
+
+import json
+
+from seqerakit import utils
+from seqerakit.helper import find_name, find_option, find_scope
+from seqerakit.on_exists import OnExists
+
+CREATE = "create"
+UPDATE = "update"
+UNCHANGED = "unchanged"
+DELETE = "delete"
+# Existing resources with options that cannot be compared to the list() output
+UNKNOWN = "unknown"
+
+ACTIONS = [CREATE, UPDATE, UNCHANGED, DELETE, UNKNOWN]
+SYMBOLS = {CREATE: "+", UPDATE: "~", UNCHANGED: "=", DELETE: "-", UNKNOWN: "?"}
+
+# Options that can be compared against the fields of the list() output, per
+# block. Options that are not in the list() output (e.g. credentials secrets or
+# pipeline parameters) cannot be compared, so resources setting them are
+# planned as UNKNOWN when they exist.
+COMPARABLE_FIELDS = {
+    "workspaces": {"--full-name": "workspaceFullName"},
+    "teams": {"--description": "description"},
+    "labels": {"--value": "value"},
+    "participants": {"--role": "wspRole"},
+    "datasets": {"--description": "description"},
+    "pipelines": {"--description": "description"},
+}
+
+# Fields of the list() output that are compared ignoring case
+CASE_INSENSITIVE_FIELDS = {"wspRole"}
+
+
+class ResourceChange:
+    """
+    A single resource of the YAML configuration and the action needed to apply it.
+    """
+
+    def __init__(
+        self,
+        block,
+        args,
+        action,
+        name=None,
+        scope=None,
+        changes=None,
+        uncompared=None,
+        updatable=False,
+    ):
+        self.block = block
+        self.args = args
+        self.action = action
+        self.name = name
+        self.scope = scope
+        self.changes = changes or {}
+        # Options of an existing resource that cannot be compared
+        self.uncompared = uncompared or []
+        # True if the resource can be updated in place
+        self.updatable = updatable
+
+    def to_dict(self):
+        return {
+            "action": self.action,
+            "block": self.block,
+            "name": self.name,
+            "scope": self.scope,
+            "changes": {
+                field: {"current": current, "desired": desired}
+                for field, (current, desired) in self.changes.items()
+            },
+            "uncompared": self.uncompared,
+        }
+
+
+class Plan:
+    """
+    The list of ResourceChange objects for a YAML configuration, in the order
+    returned by helper.parse_all_yaml().
+    """
+
+    def __init__(self, changes=None):
+        self.changes = changes or []
+
+    def summary(self):
+        counts = {action: 0 for action in ACTIONS}
+        for change in self.changes:
+            counts[change.action] += 1
+        return counts
+
+    def pending(self):
+        """
+        Returns the parsed YAML configuration restricted to the resources that
+        need to be created, updated or deleted.
+
+        Resources whose changes cannot be known are updated if that can be done
+        in place. Otherwise they are only applied if their on_exists is
+        'overwrite' or 'update', as they would be deleted and created again.
+        """
+        cmd_args_dict = {}
+        for change in self.changes:
+            if change.action == UNCHANGED:
+                continue
+            args = change.args
+            if change.action == UPDATE or (
+                change.action == UNKNOWN and change.updatable
+            ):
+                args = dict(args, on_exists="update")
+            elif change.action == UNKNOWN and _on_exists(args) not in (
+                OnExists.OVERWRITE,
+                OnExists.UPDATE,
+            ):
+                continue
+            cmd_args_dict.setdefault(change.block, []).append(args)
+        return cmd_args_dict
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "summary": self.summary(),
+                "resources": [change.to_dict() for change in self.changes],
+            },
+            indent=2,
+        )
+
+    def to_text(self):
+        counts = self.summary()
+        lines = [
+            f"Plan: {counts[CREATE]} to create, {counts[UPDATE]} to update, "
+            f"{counts[DELETE]} to delete, {counts[UNCHANGED]} unchanged, "
+            f"{counts[UNKNOWN]} unknown."
+        ]
+        for change in self.changes:
+            scope = f" ({change.scope})" if change.scope else ""
+            lines.append(
+                f"  {SYMBOLS[change.action]} {change.block} {change.name}{scope}"
+            )
+            for field, (current, desired) in change.changes.items():
+                lines.append(f"      {field}: {current!r} -> {desired!r}")
+            if change.action == UNKNOWN:
+                lines.append(f"      not compared: {', '.join(change.uncompared)}")
+        return "\n".join(lines)
+
+
+def _on_exists(args):
+    on_exists = args.get("on_exists", OnExists.FAIL)
+    if isinstance(on_exists, str):
+        return OnExists[on_exists.upper()]
+    return on_exists
+
+
+def _resolve(value):
+    return utils.resolve_env_var(value) if value is not None else None
+
+
+def _desired_fields(block, cmd_args):
+    fields = {
+        field: _resolve(find_option(cmd_args, {option}))
+        for option, field in COMPARABLE_FIELDS.get(block, {}).items()
+    }
+    if block == "pipelines":
+        url = next((arg for arg in cmd_args if utils.is_url(arg)), None)
+        fields["repository"] = _resolve(url)
+    return {field: value for field, value in fields.items() if value is not None}
+
+
+def _uncompared(block, cmd_args, keys):
+    """
+    Returns the options of a resource, and its arguments that are not options,
+    that cannot be compared to the list() output: all but those identifying it
+    (keys), those in COMPARABLE_FIELDS, and the repository of pipelines.
+    """
+    compared = {f"--{key}" for key in keys} | set(COMPARABLE_FIELDS.get(block, {}))
+    options = cmd_args[0] if block == "teams" else cmd_args
+    uncompared = []
+    skip_value = False
+    for arg in options:
+        if skip_value and not str(arg).startswith("--"):
+            skip_value = False
+            continue
+        skip_value = False
+        if str(arg).startswith("--"):
+            if arg in compared:
+                skip_value = True
+            elif arg not in uncompared:
+                uncompared.append(arg)
+                skip_value = True
+        elif not (block == "pipelines" and utils.is_url(arg)):
+            uncompared.append(arg)
+    if block == "teams" and cmd_args[1]:
+        uncompared.append("members")
+    return uncompared
+
+
+def _compare(record, desired):
+    """
+    Returns the fields that differ between a list() record and the desired
+    values. Fields missing from the record are not compared.
+    """
+    changes = {}
+    for field, value in desired.items():
+        if field not in record or record[field] is None:
+            continue
+        current = str(record[field])
+        if field in CASE_INSENSITIVE_FIELDS:
+            current, value = current.lower(), value.lower()
+        elif field == "repository":
+            current, value = current.rstrip("/"), value.rstrip("/")
+        if current != value:
+            changes[field] = (record[field], desired[field])
+    return changes
+
+
+def build_plan(overwrite, cmd_args_dict, destroy=False):
+    """
+    Classify every resource in a parsed YAML configuration, as returned by
+    helper.parse_all_yaml(), by comparing it to the cached list() output of an
+    Overwrite instance.
+
+    Resources that cannot be listed (e.g. launches) are always planned for
+    creation, or left unchanged when destroying.
+    """
+    changes = []
+    for block, args_list in cmd_args_dict.items():
+        for args in args_list:
+            cmd_args = args["cmd_args"]
+            options = cmd_args[0] if block == "teams" else cmd_args
+            change = ResourceChange(
+                block,
+                args,
+                UNCHANGED,
+                find_name(args),
+                _resolve(find_scope(block, options)),
+            )
+            changes.append(change)
+
+            if block not in overwrite.block_operations:
+                if not destroy:
+                    change.action = CREATE
+                continue
+
+            record = overwrite.find_resource(block, cmd_args)
+            if destroy:
+                change.action = DELETE if record is not None else UNCHANGED
+            elif record is None:
+                change.action = CREATE
+            else:
+                change.changes = _compare(record, _desired_fields(block, options))
+                change.uncompared = _uncompared(
+                    block, cmd_args, overwrite.block_operations[block]["keys"]
+                )
+                if change.changes:
+                    change.action = UPDATE
+                elif change.uncompared:
+                    change.action = UNKNOWN
+                    change.updatable = block != "teams" and overwrite.can_update(
+                        block, cmd_args
+                    )
+    return Plan(changes)
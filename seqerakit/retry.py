@@ -0,0 +1,167 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Retry policy for 'tw' commands failing with transient errors, such as rate
+limiting (HTTP 429), gateway errors (HTTP 502/503/504) or timeouts.
+"""
+
+import random
+import re
+import threading
+import time
+
+from seqerakit.cache import command_name, is_read_only
+
+# HTTP status codes of transient errors, matched only after words giving them
+# an HTTP context so that resource names such as 'pipeline-504' do not match
+HTTP_CONTEXT = r"\b(?:HTTP(?:/[\d.]+)?|status(?: code)?|response(?: code)?):?\s*"
+
+# Patterns of 'tw' output for errors that may succeed when retried
+RETRYABLE_PATTERNS = [
+    HTTP_CONTEXT + r"(?:429|50[234])\b",
+    r"\b(?:429 )?too many requests",
+    r"\b(?:502 )?bad gateway",
+    r"\b(?:503 )?service unavailable",
+    r"\b(?:504 )?gateway time-?out",
+    r"timed out",
+    r"connection (reset|refused)",
+]
+
+# Patterns of transient errors returned before a request was processed, after
+# which commands changing resources can be retried without doing it twice
+REJECTED_PATTERNS = [
+    HTTP_CONTEXT + r"(?:429|503)\b",
+    r"too many requests",
+    r"service unavailable",
+    r"connection refused",
+]
+
+# Patterns of 'tw' output for resources that already exist or are not found,
+# as told apart by SeqeraPlatform._handle_command_errors(), which retrying
+# cannot change
+RESOURCE_EXISTS_PATTERN = r"ERROR: .*already (exists|a participant)"
+RESOURCE_NOT_FOUND_PATTERN = r"ERROR: .*not found"
+
+# Subcommands that can be retried after any transient error, as an 'already
+# exists' error on a retry means that a previous attempt created the resource
+RETRIED_SUBCOMMANDS = {"add"}
+
+
+def is_resource_exists(output):
+    return re.search(RESOURCE_EXISTS_PATTERN, output, flags=re.IGNORECASE) is not None
+
+
+def is_resource_not_found(output):
+    return (
+        re.search(RESOURCE_NOT_FOUND_PATTERN, output, flags=re.IGNORECASE) is not None
+    )
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed command is retried and how long to wait first.
+
+    Delays grow exponentially from base_delay up to max_delay, with full jitter
+    (a random delay between 0 and the exponential delay) so that concurrent
+    commands failing together do not retry together.
+
+    Args:
+        retries: Number of times a command is retried, 0 disables retries.
+        base_delay: Delay in seconds before the first retry.
+        max_delay: Maximum delay in seconds before a retry.
+        deadline: Optional time in seconds after the first attempt of a command
+        after which it is no longer retried.
+        patterns: Additional regular expressions for retryable errors, matched
+        case-insensitively against the command output.
+    """
+
+    def __init__(
+        self, retries=0, base_delay=1.0, max_delay=30.0, deadline=None, patterns=()
+    ):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.patterns = []
+        self.retried_commands = 0
+        self.total_retries = 0
+        self._lock = threading.Lock()
+        self.configure(patterns=RETRYABLE_PATTERNS + list(patterns))
+        self.rejected_patterns = [
+            re.compile(p, re.IGNORECASE) for p in REJECTED_PATTERNS
+        ]
+
+    def configure(self, **settings):
+        """
+        Updates the policy from keyword arguments or the 'retry' settings of a
+        YAML configuration, where keys use dashes (e.g. 'base-delay').
+        Patterns are added to the existing ones.
+        """
+        for key, value in settings.items():
+            attribute = key.replace("-", "_")
+            if attribute == "patterns":
+                self.patterns.extend(re.compile(p, re.IGNORECASE) for p in value)
+            elif attribute in ("retries", "base_delay", "max_delay", "deadline"):
+                if value is not None and float(value) < 0:
+                    raise ValueError(f"The retry setting '{key}' must not be negative.")
+                setattr(self, attribute, value)
+            else:
+                raise ValueError(f"Invalid retry setting: '{key}'")
+        self.retries = int(self.retries)
+
+    def is_retryable(self, output, command=None):
+        """
+        Returns True if a command failing with output may succeed when retried.
+
+        Errors for resources that already exist or are not found are never
+        retried. Commands changing resources, e.g. 'launch', are only retried
+        after errors returned before the request was processed, except for
+        'add', whose resource may have been created by the failed attempt: it
+        is retried and SeqeraPlatform treats 'already exists' as success then.
+        """
+        if is_resource_exists(output) or is_resource_not_found(output):
+            return False
+        if not any(pattern.search(output) for pattern in self.patterns):
+            return False
+        if command is None or is_read_only(command):
+            return True
+        if command_name(command)[1] in RETRIED_SUBCOMMANDS:
+            return True
+        return any(pattern.search(output) for pattern in self.rejected_patterns)
+
+    def next_delay(self, attempt, returncode, output, started, command=None):
+        """
+        Returns the delay before retrying a command that completed its attempt
+        number 'attempt' (starting at 1), or None if it should not be retried.
+        """
+        if (
+            returncode == 0
+            or attempt > self.retries
+            or not self.is_retryable(output, command)
+        ):
+            return None
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        if (
+            self.deadline is not None
+            and time.monotonic() + delay - started > self.deadline
+        ):
+            return None
+        with self._lock:
+            if attempt == 1:
+                self.retried_commands += 1
+            self.total_retries += 1
+        return delay
@@ -0,0 +1,324 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Dependency-graph scheduler for applying resources in parallel.
+
+Edges between resources are inferred from the references in their command
+line arguments (e.g. a pipeline referencing a compute environment in the same
+workspace), so independent resources can be applied at the same time while
+dependent ones still wait for what they reference.
+"""
+
+import heapq
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from seqerakit import utils
+from seqerakit.helper import find_option
+
+WORKSPACE_KEYS = {"--workspace", "-w"}
+
+
+class ResourceNode:
+    """
+    A single resource from the parsed YAML and the keys it provides and requires.
+    """
+
+    def __init__(self, index, block, args):
+        self.index = index
+        self.block = block
+        self.args = args
+        self.provides = set()
+        self.requires = set()
+        self.dependencies = set()
+        self.dependents = set()
+
+    def __repr__(self):
+        return f"ResourceNode({self.block}, {sorted(self.provides)})"
+
+
+def _resolve(value):
+    """
+    Resolve environment variables in a reference if possible, so that '$ORG/ws'
+    and 'my-org/ws' refer to the same workspace.
+    """
+    if value is None:
+        return None
+    try:
+        return utils.resolve_env_var(value)
+    except EnvironmentError:
+        return value
+
+
+def _option(cmd_args, *keys):
+    return _resolve(find_option(cmd_args, set(keys)))
+
+
+def _organization(workspace):
+    if workspace and "/" in workspace:
+        return workspace.split("/", 1)[0]
+    return None
+
+
+def _launch_pipeline(cmd_args):
+    """
+    The pipeline of a launch is its last positional argument, which precedes any
+    trailing '--params-file' added by helper.parse_launch_block().
+    """
+    args = list(cmd_args)
+    if len(args) >= 2 and args[-2] == "--params-file":
+        args = args[:-2]
+    if args and not args[-1].startswith("--"):
+        return _resolve(args[-1])
+    return None
+
+
+def _add_references(node):
+    """
+    Populate the 'provides' and 'requires' keys of a node from its cmd_args.
+    """
+    block = node.block
+    cmd_args = node.args["cmd_args"]
+    if block == "teams":
+        cmd_args = cmd_args[0]
+
+    name = _option(cmd_args, "--name", "--user", "--email")
+    organization = _option(cmd_args, "--organization")
+    workspace = _option(cmd_args, *WORKSPACE_KEYS)
+
+    if block == "organizations":
+        node.provides.add(("organizations", name))
+        return
+
+    if block in ("teams", "members", "workspaces"):
+        node.requires.add(("organizations", organization))
+        if block == "workspaces":
+            node.provides.add(("workspaces", f"{organization}/{name}"))
+        else:
+            node.provides.add((block, organization, name))
+        return
+
+    node.requires.add(("workspaces", workspace))
+    node.requires.add(("organizations", _organization(workspace)))
+    if block != "launch":
+        node.provides.add((block, workspace, name))
+
+    if block == "participants":
+        participant_type = _option(cmd_args, "--type")
+        source = "teams" if participant_type == "TEAM" else "members"
+        node.requires.add((source, _organization(workspace), name))
+
+    references = {
+        "--credentials": "credentials",
+        "--compute-env": "compute-envs",
+        "--pipeline": "pipelines",
+    }
+    for key, reference_block in references.items():
+        value = _option(cmd_args, key)
+        if value:
+            node.requires.add((reference_block, workspace, value))
+
+    labels = _option(cmd_args, "--labels")
+    if labels:
+        for label in labels.split(","):
+            node.requires.add(("labels", workspace, label.split("=", 1)[0]))
+
+    if block == "launch":
+        pipeline = _launch_pipeline(cmd_args)
+        if pipeline:
+            node.requires.add(("pipelines", workspace, pipeline))
+
+
+def build_graph(cmd_args_dict, destroy=False):
+    """
+    Build the list of ResourceNode objects for a parsed YAML configuration,
+    as returned by helper.parse_all_yaml(), with their dependency edges.
+
+    References to resources that are not defined in the configuration are
+    assumed to exist already and do not create edges. When destroy is True the
+    edges are reversed, so that resources are deleted before what they reference.
+    """
+    nodes = []
+    for block, args_list in cmd_args_dict.items():
+        for args in args_list:
+            node = ResourceNode(len(nodes), block, args)
+            _add_references(node)
+            nodes.append(node)
+
+    providers = {}
+    for node in nodes:
+        for key in node.provides:
+            providers.setdefault(key, []).append(node)
+
+    for node in nodes:
+        for key in node.requires:
+            for provider in providers.get(key, []):
+                if provider is node:
+                    continue
+                if destroy:
+                    node.dependents.add(provider.index)
+                    provider.dependencies.add(node.index)
+                else:
+                    node.dependencies.add(provider.index)
+                    provider.dependents.add(node.index)
+    return nodes
+
+
+def run_graph(nodes, handler, jobs=1):
+    """
+    Run handler(node) for every node on a pool of 'jobs' worker threads, starting
+    each node as soon as all of its dependencies have completed.
+
+    Ready nodes are started in the order of the configuration. On the first
+    exception no further nodes are started; nodes already running are allowed
+    to finish and the exception is then re-raised.
+    """
+    remaining = {node.index: len(node.dependencies) for node in nodes}
+    ready = [node.index for node in nodes if not node.dependencies]
+    error = None
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while ready or running:
+            while ready and error is None and len(running) < jobs:
+                node = nodes[ready.pop(0)]
+                logging.debug(f" Scheduling {node.block} resource #{node.index}")
+                running[pool.submit(handler, node)] = node
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for index in sorted(node.dependents):
+                    remaining[index] -= 1
+                    if remaining[index] == 0:
+                        ready.append(index)
+            ready.sort()
+
+    if error is not None:
+        raise error
+
+    unfinished = [index for index, count in remaining.items() if count > 0]
+    if unfinished:
+        raise ValueError(
+            "Could not schedule all resources, the YAML configuration contains "
+            "circular references."
+        )
+
+
+def run_stream(resources, handler, jobs=1, destroy=False, window=None):
+    """
+    Run handler(node) for the resources of an iterator of (block, args) pairs,
+    as returned by helper.iter_parse_all_yaml(), on a pool of 'jobs' worker
+    threads while the iterator is still being consumed.
+
+    The resources come in the order of their blocks, so a resource can only
+    depend on resources that came before it: when it arrives, it waits for
+    those it references that have not completed yet, or for those referencing
+    it if destroy is True. At most 'window' resources (4 * jobs by default) are
+    taken from the iterator ahead of their completion, and completed resources
+    are not kept, so that memory does not grow with the size of the
+    configuration.
+
+    On the first exception, from a handler or from the iterator, no further
+    resources are started; those already running are allowed to finish and
+    the exception is then re-raised.
+    """
+    window = window or 4 * jobs
+    resources = iter(resources)
+    # Unfinished nodes by index, and by the keys other nodes can wait on
+    nodes = {}
+    keys = {}
+    ready = []
+    count = 0
+    error = None
+    exhausted = False
+
+    def add(node):
+        nodes[node.index] = node
+        for key in node.requires if destroy else node.provides:
+            keys.setdefault(key, set()).add(node.index)
+        for key in node.provides if destroy else node.requires:
+            for index in keys.get(key, ()):
+                if index != node.index:
+                    node.dependencies.add(index)
+                    nodes[index].dependents.add(node.index)
+        if not node.dependencies:
+            heapq.heappush(ready, node.index)
+
+    def complete(node):
+        del nodes[node.index]
+        for key in node.requires if destroy else node.provides:
+            keys[key].discard(node.index)
+            if not keys[key]:
+                del keys[key]
+        for index in node.dependents:
+            dependent = nodes[index]
+            dependent.dependencies.discard(node.index)
+            if not dependent.dependencies:
+                heapq.heappush(ready, index)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while True:
+            while ready and error is None and len(running) < jobs:
+                node = nodes[heapq.heappop(ready)]
+                logging.debug(f" Scheduling {node.block} resource #{node.index}")
+                running[pool.submit(handler, node)] = node
+
+            timeout = None
+            if not exhausted and error is None and len(nodes) < window:
+                # Parse the next resource while the running ones are waiting on
+                # Seqera Platform, then only collect those already completed
+                timeout = 0
+                try:
+                    block, args = next(resources)
+                except StopIteration:
+                    exhausted = True
+                except Exception as e:
+                    error = e
+                else:
+                    node = ResourceNode(count, block, args)
+                    count += 1
+                    _add_references(node)
+                    add(node)
+
+            if not running:
+                if ready and error is None:
+                    continue
+                if timeout is None or exhausted or error is not None:
+                    break
+                continue
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                complete(node)
+
+    if error is not None:
+        raise error
+    if nodes:
+        raise ValueError(
+            "Could not schedule all resources, the YAML configuration contains "
+            "circular references."
+        )
@@ -13,12 +13,25 @@
 # limitations under the License.
 
 from contextlib import contextmanager
+import asyncio
+import contextvars
 import os
 import shlex
 import logging
-import subprocess
 import re
 import json
+import time
+
+from seqerakit.cache import (
+    AsyncSingleFlight,
+    SingleFlight,
+    command_key,
+    command_name,
+    is_read_only,
+)
+from seqerakit import tracing
+from seqerakit.retry import is_resource_exists, is_resource_not_found
+from seqerakit.executor import get_executor, read_output_async
 
 
 class SeqeraPlatform:
@@ -30,6 +43,15 @@ class SeqeraPlatform:
     The arguments of the subcommand can be passed as arguments to the method.
 
     Each command is run in a subprocess, with the output being captured and returned.
+    The subprocess is started by an executor (see seqerakit.executor), which by
+    default forks a new shell for every command. With shell=False, commands are
+    passed to the executor as argv lists instead, and environment variables are
+    expanded in Python rather than by the shell.
+
+    If a ResultCache is given, the output of read-only commands (e.g. 'list') is
+    cached, and other commands invalidate the cached output of their scope.
+    Identical read-only commands run concurrently share a single subprocess,
+    also across instances given the same SingleFlight.
     """
 
     class TwCommand:
@@ -43,7 +65,20 @@ class SeqeraPlatform:
             return self.tw_instance._tw_run(command, **kwargs)
 
     # Constructs a new SeqeraPlatform instance
-    def __init__(self, cli_args=None, dryrun=False, print_stdout=True, json=False):
+    def __init__(
+        self,
+        cli_args=None,
+        dryrun=False,
+        print_stdout=True,
+        json=False,
+        executor=None,
+        shell=True,
+        cache=None,
+        single_flight=None,
+        retry_policy=None,
+        limiter=None,
+        stats=None,
+    ):
         if cli_args and "--verbose" in cli_args:
             raise ValueError(
                 "--verbose is not supported as a CLI argument to seqerakit."
@@ -52,7 +87,17 @@ class SeqeraPlatform:
         self.dryrun = dryrun
         self.print_stdout = print_stdout
         self.json = json
-        self._suppress_output = False
+        self.shell = shell
+        self.cache = cache
+        self.single_flight = single_flight or SingleFlight()
+        self.retry_policy = retry_policy
+        self.limiter = limiter
+        self.stats = stats
+        # Output suppression is tracked per thread / asyncio task
+        self._suppress_var = contextvars.ContextVar(
+            f"seqerakit_suppress_output_{id(self)}", default=False
+        )
+        self.executor = get_executor(executor)
 
     def _construct_command(self, cmd, *args, **kwargs):
         command = ["tw"] + self.cli_args
@@ -72,6 +117,8 @@ class SeqeraPlatform:
         # Check for empty string arguments and handle them
         self._check_empty_args(command)
 
+        if not self.shell:
+            return self._expand_env_vars(command)
         return self._check_env_vars(command)
 
     def _check_empty_args(self, command):
@@ -131,15 +178,177 @@ class SeqeraPlatform:
 
         return " ".join(full_cmd_parts)
 
+    # Expands environment variables in Python to build an argv list run without
+    # a shell, with the same rules as _check_env_vars(). As when running through
+    # '/bin/sh', only Unix variables are expanded, Windows and PowerShell ones
+    # are checked and passed on as they are.
+    def _expand_env_vars(self, command):
+        argv = []
+        special_vars = {"$TW_AGENT_WORK"}
+        unix_pattern = re.compile(r"\$\{(\w+)\}|\$(?!env:)(\w+)")
+        other_patterns = [r"\$env:(\w+)", r"%(\w+)%"]
+
+        def _check(var_name, env_var):
+            if var_name not in os.environ:
+                raise EnvironmentError(f"Environment variable {env_var} not found!")
+            return os.environ[var_name]
+
+        def _replace(match):
+            var_name = match.group(1) or match.group(2)
+            return _check(var_name, match.group())
+
+        for arg in command:
+            # Special variables are passed on escaped, as in the shell command
+            if arg in special_vars:
+                argv.append(f"\\{arg}")
+                continue
+
+            # Skip interpolation for explicitly escaped vars
+            if arg.startswith("\\") or (arg.startswith("'") and arg.endswith("'")):
+                argv.append(arg.lstrip("\\").strip("'"))
+                continue
+
+            if "$(" in arg or "`" in arg:
+                raise ValueError(
+                    f"Command substitution in '{arg}' requires a shell, it is not "
+                    "supported when commands are run without a shell."
+                )
+
+            if "$" in arg or "%" in arg:
+                for pattern in other_patterns:
+                    for match in re.finditer(pattern, arg):
+                        _check(match.group(1), match.group())
+                arg = unix_pattern.sub(_replace, arg)
+            argv.append(arg)
+
+        return argv
+
+    def _format_command(self, full_cmd):
+        if isinstance(full_cmd, list):
+            return shlex.join(full_cmd)
+        return full_cmd
+
+    # Returns the cache key and generation, and the cached output of a command
+    def _cache_lookup(self, full_cmd, command):
+        if self.cache is None or command is None or not is_read_only(command):
+            return None, None
+        key = (self.cache.key(full_cmd), self.cache.generation)
+        return key, self.cache.get(key[0])
+
+    # Caches the output of a read-only command, or invalidates the cached output
+    # that another command may have changed
+    def _cache_update(self, key, command, returncode, stdout):
+        if self.cache is None or command is None:
+            return
+        if key is None:
+            self.cache.invalidate(command)
+        elif returncode == 0:
+            self.cache.put(key[0], command, stdout, generation=key[1])
+
     # Executes a 'tw' command in a subprocess and returns the output.
-    def _execute_command(self, full_cmd, to_json=False, print_stdout=True):
-        logging.info(f" Running command: {full_cmd}")
-        process = subprocess.Popen(
-            full_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True
+    def _execute_command(
+        self, full_cmd, to_json=False, print_stdout=True, command=None
+    ):
+        started = time.monotonic()
+        key, cached = self._cache_lookup(full_cmd, command)
+        if cached is not None:
+            logging.info(f" Using cached output of: {self._format_command(full_cmd)}")
+            self._record_command(command, started, 0, cached, cached=True)
+            return self._process_output(cached, 0, to_json, print_stdout)
+
+        ran = []
+
+        def run():
+            ran.append(True)
+            logging.info(f" Running command: {self._format_command(full_cmd)}")
+            attempt = 1
+            while True:
+                if self.limiter is not None:
+                    returncode, stdout = self.limiter.call(
+                        command, lambda: self._run_traced(full_cmd, command)
+                    )
+                else:
+                    returncode, stdout = self._run_traced(full_cmd, command)
+                returncode = self._check_retried(attempt, command, returncode, stdout)
+                delay = self._retry_delay(attempt, returncode, stdout, started, command)
+                if delay is None:
+                    break
+                with tracing.span("retry backoff", "wait"):
+                    time.sleep(delay)
+                attempt += 1
+            self._cache_update(key, command, returncode, stdout)
+            return returncode, stdout, attempt - 1
+
+        if command is not None and is_read_only(command):
+            returncode, stdout, retries = self.single_flight.do(
+                command_key(full_cmd), run
+            )
+        else:
+            returncode, stdout, retries = run()
+        # Callers sharing the output of an identical command did not run 'tw'
+        self._record_command(
+            command,
+            started,
+            returncode,
+            stdout,
+            retries if ran else 0,
+            cached=not ran,
         )
-        stdout, _ = process.communicate()
-        stdout = stdout.decode("utf-8").strip()
+        return self._process_output(stdout, returncode, to_json, print_stdout)
+
+    # Runs a command with the executor, recording it as a trace span
+    def _run_traced(self, full_cmd, command):
+        with tracing.span(self._span_name(command), "command"):
+            return self.executor.run(full_cmd)
+
+    def _span_name(self, command):
+        if command is None:
+            return "tw"
+        return " ".join(["tw"] + [part for part in command_name(command) if part])
+
+    # Records the timing of a command in the statistics of the run
+    def _record_command(
+        self, command, started, returncode, stdout, retries=0, cached=False
+    ):
+        if self.stats is not None and command is not None:
+            self.stats.record_command(
+                command, started, returncode, stdout, retries, cached
+            )
 
+    # Returns the delay before retrying a command failing with a transient error,
+    # or None if it should not be retried.
+    def _retry_delay(self, attempt, returncode, stdout, started, command=None):
+        if self.retry_policy is None:
+            return None
+        delay = self.retry_policy.next_delay(
+            attempt, returncode, stdout, started, command=command
+        )
+        if delay is not None:
+            logging.warning(
+                f" Command failed with a transient error, retrying in {delay:.1f}s "
+                f"(retry {attempt} of {self.retry_policy.retries}): '{stdout}'"
+            )
+        return delay
+
+    # Returns the return code of an attempt of a command, where a retried 'add'
+    # failing because the resource exists means that an earlier attempt failing
+    # with a transient error did create it.
+    def _check_retried(self, attempt, command, returncode, stdout):
+        if (
+            attempt > 1
+            and returncode != 0
+            and command is not None
+            and command_name(command)[1] == "add"
+            and is_resource_exists(stdout)
+        ):
+            logging.warning(
+                " The resource was created by a previous attempt of the command."
+            )
+            return 0
+        return returncode
+
+    # Logs, parses and checks the output of an executed 'tw' command.
+    def _process_output(self, stdout, returncode, to_json=False, print_stdout=True):
         should_print = (
             print_stdout if print_stdout is not None else self.print_stdout
         ) and not self._suppress_output
@@ -158,7 +367,7 @@ class SeqeraPlatform:
             except json.JSONDecodeError:
                 pass
 
-        if process.returncode != 0:
+        if returncode != 0:
             self._handle_command_errors(stdout)
 
         if should_print:
@@ -167,13 +376,11 @@ class SeqeraPlatform:
 
     def _handle_command_errors(self, stdout):
         # Check for specific tw cli error patterns and raise custom exceptions
-        if re.search(
-            r"ERROR: .*already (exists|a participant)", stdout, flags=re.IGNORECASE
-        ):
+        if is_resource_exists(stdout):
             raise ResourceExistsError(
                 "Resource already exists. Please delete first or set 'overwrite: true'"
             )
-        elif re.search(r"ERROR: .*not found", stdout, flags=re.IGNORECASE):
+        elif is_resource_not_found(stdout):
             raise ResourceNotFoundError(f"Resource not found: '{stdout}'")
         else:
             raise CommandError(
@@ -184,18 +391,29 @@ class SeqeraPlatform:
         print_stdout = kwargs.pop("print_stdout", None)
         full_cmd = self._construct_command(cmd, *args, **kwargs)
         if not full_cmd or self.dryrun:
-            logging.info(f"DRYRUN: Running command {full_cmd}")
+            logging.info(f"DRYRUN: Running command {self._format_command(full_cmd)}")
             return None
-        return self._execute_command(full_cmd, kwargs.get("to_json"), print_stdout)
+        return self._execute_command(
+            full_cmd, kwargs.get("to_json"), print_stdout, command=cmd + list(args)
+        )
+
+    def close(self):
+        """
+        Releases any resources (e.g. long-lived workers) held by the executor.
+        """
+        self.executor.close()
+
+    @property
+    def _suppress_output(self):
+        return self._suppress_var.get()
 
     @contextmanager
     def suppress_output(self):
-        original_suppress = self._suppress_output
-        self._suppress_output = True
+        token = self._suppress_var.set(True)
         try:
             yield
         finally:
-            self._suppress_output = original_suppress
+            self._suppress_var.reset(token)
 
     # Allow any 'tw' subcommand to be called as a method.
     def __getattr__(self, cmd):
@@ -210,6 +428,113 @@ class SeqeraPlatform:
         return self.TwCommand(self, cmd.replace("_", "-"))
 
 
+class AsyncSeqeraPlatform(SeqeraPlatform):
+    """
+    Asynchronous variant of SeqeraPlatform where every 'tw' subcommand is a
+    coroutine, e.g. 'await sp.pipelines("add", ...)'.
+
+    Commands are started with asyncio.create_subprocess_exec and share the
+    command construction, error handling and JSON parsing of SeqeraPlatform.
+    At most 'max_concurrency' 'tw' processes run at the same time.
+    """
+
+    def __init__(self, *args, max_concurrency=4, **kwargs):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._semaphore_loop = None
+        self.async_single_flight = AsyncSingleFlight()
+
+    def _get_semaphore(self):
+        # Semaphores are bound to the event loop they are first used in
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _execute_command(
+        self, full_cmd, to_json=False, print_stdout=True, command=None
+    ):
+        started = time.monotonic()
+        key, cached = self._cache_lookup(full_cmd, command)
+        if cached is not None:
+            logging.info(f" Using cached output of: {self._format_command(full_cmd)}")
+            self._record_command(command, started, 0, cached, cached=True)
+            return self._process_output(cached, 0, to_json, print_stdout)
+
+        async def run_once():
+            async with self._get_semaphore():
+                if isinstance(full_cmd, list):
+                    process = await asyncio.create_subprocess_exec(
+                        *full_cmd,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.STDOUT,
+                    )
+                    stdout = await read_output_async(process.stdout)
+                    await process.wait()
+                else:
+                    process = await asyncio.create_subprocess_exec(
+                        "/bin/sh",
+                        "-c",
+                        full_cmd,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.STDOUT,
+                    )
+                    stdout, _ = await process.communicate()
+                    stdout = stdout.decode("utf-8").strip()
+            return process.returncode, stdout
+
+        ran = []
+
+        async def run():
+            ran.append(True)
+            logging.info(f" Running command: {self._format_command(full_cmd)}")
+            attempt = 1
+            while True:
+                with tracing.span(self._span_name(command), "command"):
+                    returncode, stdout = await run_once()
+                returncode = self._check_retried(attempt, command, returncode, stdout)
+                delay = self._retry_delay(attempt, returncode, stdout, started, command)
+                if delay is None:
+                    break
+                # Wait outside of the semaphore so other commands can run
+                with tracing.span("retry backoff", "wait"):
+                    await asyncio.sleep(delay)
+                attempt += 1
+            self._cache_update(key, command, returncode, stdout)
+            return returncode, stdout, attempt - 1
+
+        if command is not None and is_read_only(command):
+            returncode, stdout, retries = await self.async_single_flight.do(
+                command_key(full_cmd), run
+            )
+        else:
+            returncode, stdout, retries = await run()
+        # Callers sharing the output of an identical command did not run 'tw'
+        self._record_command(
+            command,
+            started,
+            returncode,
+            stdout,
+            retries if ran else 0,
+            cached=not ran,
+        )
+        return self._process_output(stdout, returncode, to_json, print_stdout)
+
+    async def _tw_run(self, cmd, *args, **kwargs):
+        print_stdout = kwargs.pop("print_stdout", None)
+        full_cmd = self._construct_command(cmd, *args, **kwargs)
+        if not full_cmd or self.dryrun:
+            logging.info(f"DRYRUN: Running command {self._format_command(full_cmd)}")
+            return None
+        return await self._execute_command(
+            full_cmd, kwargs.get("to_json"), print_stdout, command=cmd + list(args)
+        )
+
+
 class CommandError(Exception):
     pass
 
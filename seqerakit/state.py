@@ -0,0 +1,158 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local journal of the resources applied by previous runs, used to skip the
+resources whose YAML definition has not changed since they were last applied.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from seqerakit.helper import find_name, find_scope
+
+STATE_VERSION = 1
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _canonical(value):
+    """
+    Returns a JSON-serializable copy of cmd_args where environment variables are
+    expanded and arguments pointing to files (e.g. params files, which are
+    written to a new temporary file on every run) are replaced by the hash of
+    their contents.
+    """
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, str):
+        value = os.path.expandvars(value)
+        if os.path.isfile(value):
+            return _hash_file(value)
+    return value
+
+
+def resource_digest(cmd_args):
+    """
+    Returns a hash of the parsed cmd_args of a resource and the contents of the
+    files it references.
+    """
+    canonical = json.dumps(_canonical(cmd_args), sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def resource_key(block, cmd_args):
+    """
+    Returns the key of a resource in the journal, i.e. 'block/scope/name'.
+    """
+    name = find_name({"cmd_args": cmd_args})
+    scope = find_scope(block, cmd_args)
+    return "/".join(
+        os.path.expandvars(str(part))
+        for part in (block, scope, name)
+        if part is not None
+    )
+
+
+class StateJournal:
+    """
+    A JSON file mapping the key of every resource applied successfully to the
+    hash of its definition.
+
+    Args:
+        path: Path of the state file. It is created on the first save().
+        force: If True, every resource is considered changed.
+    """
+
+    # Blocks that are run every time rather than created once
+    UNTRACKED_BLOCKS = {"launch"}
+
+    def __init__(self, path, force=False):
+        self.path = path
+        self.force = force
+        self.skipped = 0
+        self._changed = False
+        self._lock = threading.Lock()
+        self._resources = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self._resources = data.get("resources", {})
+            else:
+                logging.warning(
+                    f" Ignoring state file '{path}' written by an unsupported version."
+                )
+
+    def is_unchanged(self, block, cmd_args):
+        """
+        Returns True if the resource was applied by a previous run with the same
+        definition, and counts it as skipped.
+        """
+        if self.force or block in self.UNTRACKED_BLOCKS:
+            return False
+        key = resource_key(block, cmd_args)
+        digest = resource_digest(cmd_args)
+        with self._lock:
+            if self._resources.get(key) != digest:
+                return False
+            self.skipped += 1
+        return True
+
+    def record(self, block, cmd_args):
+        """
+        Records a resource as applied with its current definition.
+        """
+        if block in self.UNTRACKED_BLOCKS:
+            return
+        key = resource_key(block, cmd_args)
+        digest = resource_digest(cmd_args)
+        with self._lock:
+            self._changed = self._changed or self._resources.get(key) != digest
+            self._resources[key] = digest
+
+    def forget(self, block, cmd_args):
+        """
+        Removes a resource from the journal, e.g. after it has been deleted.
+        """
+        with self._lock:
+            if self._resources.pop(resource_key(block, cmd_args), None):
+                self._changed = True
+
+    def save(self):
+        """
+        Writes the journal to the state file, replacing it atomically. Nothing is
+        written if no resource has been recorded or removed.
+        """
+        with self._lock:
+            if not self._changed:
+                return
+            data = {"version": STATE_VERSION, "resources": self._resources}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile(
+                "w", dir=directory, delete=False, suffix=".tmp"
+            ) as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(f.name, self.path)
+            self._changed = False
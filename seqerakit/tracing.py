@@ -0,0 +1,133 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Spans of the work done by a run (YAML parsing, resource lists, existence checks,
+'tw' commands and waits), written as Chrome trace events that can be opened in
+Perfetto or chrome://tracing.
+
+Tracing is disabled unless start() is called, in which case span() returns a
+shared no-op context manager.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL_SPAN = nullcontext()
+_tracer = None
+
+
+class Tracer:
+    """
+    Collects complete ('X') trace events, with timestamps in microseconds since
+    the tracer was created, and the names of the threads they ran in.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def span(self, name, category, args):
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            with self._lock:
+                self._threads[thread.ident] = thread.name
+        start = self._now()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start,
+                "dur": self._now() - start,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+            }
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def to_dict(self):
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": ident,
+                "args": {"name": name},
+            }
+            for ident, name in self._threads.items()
+        ]
+        return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+
+def start():
+    """
+    Enables tracing and returns the Tracer collecting the spans.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    """
+    Disables tracing and returns the Tracer that collected the spans, if any.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name, category="seqerakit", **args):
+    """
+    Returns a context manager recording the time spent in its body as a span.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, category, args)
+
+
+def traced(category):
+    """
+    Decorator recording every call of a function as a span named after it.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.span(fn.__name__, category, None):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -16,9 +16,10 @@ import logging
 import json
 import tempfile
 import os
-import yaml
 from urllib.parse import urlparse
 import re
+from seqerakit import yaml_io
+from seqerakit.yaml_io import quoted_str, quoted_str_representer  # noqa: F401
 
 
 def find_key_value_in_dict(data, target_key, target_value, return_key):
@@ -82,9 +83,9 @@ def is_valid_yaml(file_path):
     """
     try:
         with open(file_path, "r") as file:
-            yaml.safe_load(file)
+            yaml_io.load(file)
         return True
-    except yaml.YAMLError:
+    except yaml_io.YAMLError:
         return False
 
 
@@ -110,15 +111,17 @@ def is_url(s):
         return False
 
 
-class quoted_str(str):
-    pass
+# Prefix of the names of the params files written by create_temp_yaml()
+PARAMS_FILE_PREFIX = "seqerakit-params-"
 
 
-def quoted_str_representer(dumper, data):
-    return dumper.represent_scalar("tag:yaml.org,2002:str", data, style='"')
-
-
-yaml.add_representer(quoted_str, quoted_str_representer)
+def is_params_file(path):
+    """
+    Returns True if path is a params file written by create_temp_yaml().
+    """
+    return os.path.basename(path).startswith(PARAMS_FILE_PREFIX) and (
+        os.path.dirname(os.path.abspath(path)) == tempfile.gettempdir()
+    )
 
 
 def create_temp_yaml(params_dict, params_file=None):
@@ -130,7 +133,7 @@ def create_temp_yaml(params_dict, params_file=None):
     def read_file(file_path):
         with open(file_path, "r") as file:
             return (
-                json.load(file) if file_path.endswith(".json") else yaml.safe_load(file)
+                json.load(file) if file_path.endswith(".json") else yaml_io.load(file)
             )
 
     combined_params = {}
@@ -147,9 +150,9 @@ def create_temp_yaml(params_dict, params_file=None):
             combined_params[key] = quoted_str(resolved_value)
 
     with tempfile.NamedTemporaryFile(
-        mode="w", delete=False, suffix=".yaml"
+        mode="w", delete=False, prefix=PARAMS_FILE_PREFIX, suffix=".yaml"
     ) as temp_file:
-        yaml.dump(combined_params, temp_file, default_flow_style=False)
+        yaml_io.dump(combined_params, temp_file)
         return temp_file.name
 
 
@@ -0,0 +1,93 @@
+# Copyright 2023, Seqera
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reading and writing of YAML, with the libyaml C implementation of PyYAML when
+it is available and its pure Python implementation otherwise.
+"""
+
+import yaml  # type: ignore
+
+try:
+    from yaml import CSafeDumper as _SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+
+    BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeDumper as _SafeDumper
+    from yaml import SafeLoader
+
+    BACKEND = "pure Python"
+
+YAMLError = yaml.YAMLError
+
+
+class quoted_str(str):
+    pass
+
+
+def quoted_str_representer(dumper, data):
+    # The libyaml emitter only accepts instances of str itself
+    return dumper.represent_scalar("tag:yaml.org,2002:str", str(data), style='"')
+
+
+class SafeDumper(_SafeDumper):
+    """
+    Safe dumper writing quoted_str values as double-quoted strings.
+    """
+
+
+SafeDumper.add_representer(quoted_str, quoted_str_representer)
+# Keep quoted_str usable with yaml.dump() and the default dumper
+yaml.add_representer(quoted_str, quoted_str_representer)
+
+
+def load(stream):
+    """
+    Parses the YAML document of a string or file, like yaml.safe_load().
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_with_lines(stream):
+    """
+    Like load(), but also returns the line numbers (starting at 1) of the items
+    of the top-level lists, e.g. {"pipelines": [3, 10]}.
+    """
+    loader = SafeLoader(stream)
+    try:
+        node = loader.get_single_node()
+        if node is None:
+            return None, {}
+        data = loader.construct_document(node)
+    finally:
+        loader.dispose()
+
+    lines = {}
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            if isinstance(value_node, yaml.SequenceNode):
+                lines[key_node.value] = [
+                    item.start_mark.line + 1 for item in value_node.value
+                ]
+    return data, lines
+
+
+def dump(data, stream=None, **kwargs):
+    """
+    Writes data as YAML to a stream, or returns it as a string if stream is
+    None, like yaml.safe_dump() with block style by default.
+    """
+    kwargs.setdefault("default_flow_style", False)
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
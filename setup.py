@@ -25,7 +25,12 @@ setup(
     author_email="esha.joshi@seqera.io, adam.talbot@seqera.io, harshil.patel@seqera.io",
     url="https://github.com/seqeralabs/seqera-kit",
     license="Apache 2.0",
-    entry_points={"console_scripts": ["seqerakit=seqerakit.cli:main"]},
+    entry_points={
+        "console_scripts": [
+            "seqerakit=seqerakit.cli:main",
+            "seqerakit-bench=seqerakit.bench:main",
+        ]
+    },
     python_requires=">=3.8, <4",  # untested
     install_requires=["pyyaml>=6.0.0"],
     packages=find_packages(exclude=("docs")),
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from seqerakit import bench, cli, helper
+
+
+class TestGenerate(unittest.TestCase):
+    def test_references(self):
+        config = bench.generate_config(
+            workspaces=4,
+            organizations=2,
+            credentials_per_ws=3,
+            compute_envs_per_ws=2,
+            pipelines_per_ws=5,
+            launches_per_ws=2,
+        )
+
+        self.assertEqual(list(config), list(bench.BLOCKS))
+        self.assertEqual(len(config["organizations"]), 2)
+        self.assertEqual(len(config["credentials"]), 12)
+        self.assertEqual(len(config["pipelines"]), 20)
+        self.assertEqual(len(config["launch"]), 8)
+
+        organizations = {org["name"] for org in config["organizations"]}
+        workspaces = {
+            f"{ws['organization']}/{ws['name']}" for ws in config["workspaces"]
+        }
+        self.assertTrue(
+            {ws["organization"] for ws in config["workspaces"]} <= organizations
+        )
+
+        def names(block, workspace):
+            return {
+                item["name"] for item in config[block] if item["workspace"] == workspace
+            }
+
+        for block in ("credentials", "compute-envs", "pipelines", "launch"):
+            for item in config[block]:
+                self.assertIn(item["workspace"], workspaces)
+        for ce in config["compute-envs"]:
+            self.assertIn(ce["credentials"], names("credentials", ce["workspace"]))
+        for pipeline in config["pipelines"]:
+            self.assertIn(
+                pipeline["compute-env"], names("compute-envs", pipeline["workspace"])
+            )
+        for launch in config["launch"]:
+            self.assertIn(launch["pipeline"], names("pipelines", launch["workspace"]))
+
+    def test_deterministic(self):
+        first = bench.dump(bench.generate_config(workspaces=3, seed=1))
+        self.assertEqual(first, bench.dump(bench.generate_config(workspaces=3, seed=1)))
+        self.assertNotEqual(
+            first, bench.dump(bench.generate_config(workspaces=3, seed=2))
+        )
+
+    def test_workspace_independent_of_count(self):
+        small = bench.generate_parts(workspaces=2)
+        large = bench.generate_parts(workspaces=5)
+        self.assertEqual(small[1:], large[1:3])
+
+    def test_invalid_counts(self):
+        with self.assertRaises(ValueError):
+            bench.generate_parts(compute_envs_per_ws=1, credentials_per_ws=0)
+        with self.assertRaises(ValueError):
+            bench.generate_parts(launches_per_ws=1, pipelines_per_ws=0)
+        with self.assertRaises(ValueError):
+            bench.generate_parts(workspaces=1, organizations=2)
+
+
+class TestWriteFiles(unittest.TestCase):
+    @patch.dict(os.environ, {bench.SECRET_ENV_VAR: "token"})
+    def test_split_files_parse(self):
+        parts = bench.generate_parts(workspaces=7, pipelines_per_ws=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = bench.write_files(parts, tmp, files=3, dirs=2)
+
+            self.assertEqual(len(paths), 3)
+            self.assertEqual(len({os.path.dirname(path) for path in paths}), 2)
+            found = cli.find_yaml_files([tmp])
+            self.assertEqual(sorted(found), sorted(paths))
+
+            cmd_args = helper.parse_all_yaml(found)
+
+        self.assertEqual(len(cmd_args["workspaces"]), 7)
+        self.assertEqual(len(cmd_args["pipelines"]), 21)
+
+    def test_not_empty_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            open(os.path.join(tmp, "old.yml"), "w").close()
+            with self.assertRaises(ValueError):
+                bench.write_files(bench.generate_parts(workspaces=1), tmp)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "configs")
+            bench.main(
+                ["generate", "--workspaces", "2", "--seed", "3", "--output", output]
+            )
+            with open(os.path.join(output, "config-0.yml")) as f:
+                config = yaml.safe_load(f)
+
+        self.assertEqual(config, bench.generate_config(workspaces=2, seed=3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from seqerakit import seqeraplatform
+from seqerakit.cache import (
+    AsyncSingleFlight,
+    ResultCache,
+    SingleFlight,
+    command_scope,
+    is_read_only,
+)
+
+
+class TestCommandClassification(unittest.TestCase):
+    def test_read_only(self):
+        self.assertTrue(is_read_only(["pipelines", "list", "-w", "org/ws"]))
+        self.assertTrue(is_read_only(["-o", "json", "teams", "list", "-o", "org"]))
+        self.assertTrue(is_read_only(["info"]))
+        self.assertTrue(is_read_only(["datasets", "url", "-n", "d", "-w", "org/ws"]))
+        self.assertFalse(is_read_only(["pipelines", "add", "--name", "p"]))
+        self.assertFalse(is_read_only(["launch", "--workspace", "org/ws", "p"]))
+
+    def test_scope(self):
+        self.assertEqual(
+            command_scope(["-o", "json", "teams", "list", "-o", "org"]), "org"
+        )
+        self.assertEqual(
+            command_scope(["pipelines", "add", "--workspace", "org/ws"]), "org/ws"
+        )
+        self.assertIsNone(command_scope(["organizations", "add", "--name", "org"]))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_entries=2)
+
+    def put(self, command):
+        key = self.cache.key(" ".join(["tw"] + command))
+        self.cache.put(key, command, "output")
+        return key
+
+    def test_hits_and_misses(self):
+        key = self.cache.key("tw pipelines list -w org/ws")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, ["pipelines", "list", "-w", "org/ws"], "output")
+        self.assertEqual(self.cache.get(key), "output")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        first = self.put(["pipelines", "list", "-w", "org/ws1"])
+        second = self.put(["pipelines", "list", "-w", "org/ws2"])
+        self.cache.get(first)
+        self.put(["pipelines", "list", "-w", "org/ws3"])
+
+        self.assertEqual(self.cache.get(first), "output")
+        self.assertIsNone(self.cache.get(second))
+
+    def test_key_depends_on_endpoint_and_token(self):
+        with patch.dict(os.environ, {"TOWER_ACCESS_TOKEN": "one"}):
+            first = self.cache.key("tw info")
+        with patch.dict(os.environ, {"TOWER_ACCESS_TOKEN": "two"}):
+            second = self.cache.key("tw info")
+        self.assertNotEqual(first, second)
+
+    def test_invalidation_by_scope(self):
+        self.cache.max_entries = 10
+        ws1 = self.put(["pipelines", "list", "-w", "org/ws1"])
+        ws2 = self.put(["pipelines", "list", "-w", "org/ws2"])
+        org = self.put(["workspaces", "list", "-o", "org"])
+        other = self.put(["pipelines", "list", "-w", "other/ws"])
+
+        self.cache.invalidate(["pipelines", "add", "--workspace", "org/ws1"])
+        self.assertIsNone(self.cache.get(ws1))
+        self.assertIsNone(self.cache.get(org))
+        self.assertEqual(self.cache.get(ws2), "output")
+
+        self.cache.invalidate(["workspaces", "delete", "--organization", "org"])
+        self.assertIsNone(self.cache.get(ws2))
+        self.assertEqual(self.cache.get(other), "output")
+
+        self.cache.invalidate(["organizations", "add", "--name", "new"])
+        self.assertIsNone(self.cache.get(other))
+
+    def test_stale_output_not_stored_after_invalidation(self):
+        key = self.cache.key("tw pipelines list -w org/ws")
+        generation = self.cache.generation
+        self.cache.invalidate(["pipelines", "add", "--workspace", "org/ws"])
+        self.cache.put(key, ["pipelines", "list", "-w", "org/ws"], "old", generation)
+        self.assertIsNone(self.cache.get(key))
+
+    @patch("time.time")
+    def test_disk_tier_with_ttl(self, mock_time):
+        mock_time.return_value = 1000
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResultCache(ttl=60, cache_dir=cache_dir)
+            key = cache.key("tw info")
+            cache.put(key, ["info"], "output")
+
+            later_run = ResultCache(ttl=60, cache_dir=cache_dir)
+            mock_time.return_value = 1030
+            self.assertEqual(later_run.get(key), "output")
+
+            expired_run = ResultCache(ttl=60, cache_dir=cache_dir)
+            mock_time.return_value = 1100
+            self.assertIsNone(expired_run.get(key))
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_disk_invalidation(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ResultCache(ttl=60, cache_dir=cache_dir).put(
+                "key", ["pipelines", "list", "-w", "org/ws"], "output"
+            )
+            cache = ResultCache(ttl=60, cache_dir=cache_dir)
+            cache.invalidate(["pipelines", "delete", "--workspace", "org/ws"])
+            self.assertIsNone(cache.get("key"))
+
+
+class TestSeqeraPlatformCache(unittest.TestCase):
+    def setUp(self):
+        self.executor = MagicMock()
+        self.executor.run.return_value = (0, "{}")
+        self.sp = seqeraplatform.SeqeraPlatform(
+            executor=self.executor, cache=ResultCache()
+        )
+
+    def test_read_only_command_cached(self):
+        json_method = getattr(self.sp, "-o json")
+        self.assertEqual(json_method("pipelines", "list", "-w", "org/ws"), "{}")
+        self.assertEqual(json_method("pipelines", "list", "-w", "org/ws"), "{}")
+        self.executor.run.assert_called_once()
+
+    def test_mutating_command_invalidates(self):
+        json_method = getattr(self.sp, "-o json")
+        json_method("pipelines", "list", "-w", "org/ws")
+        self.sp.pipelines("add", "--name", "p", "--workspace", "org/ws")
+        json_method("pipelines", "list", "-w", "org/ws")
+        self.assertEqual(self.executor.run.call_count, 3)
+
+    def test_failed_command_not_cached(self):
+        self.executor.run.return_value = (1, "ERROR: Workspace not found")
+        for _ in range(2):
+            with self.assertRaises(seqeraplatform.ResourceNotFoundError):
+                self.sp.pipelines("list", "-w", "org/ws")
+        self.assertEqual(self.executor.run.call_count, 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            leader = pool.submit(single_flight.do, "key", fn)
+            started.wait(5)
+            followers = [pool.submit(single_flight.do, "key", fn) for _ in range(3)]
+            while single_flight.shared < 3:
+                time.sleep(0.001)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_error_propagates_to_all_waiters(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fn():
+            started.set()
+            release.wait(5)
+            raise seqeraplatform.CommandError("failed")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(single_flight.do, "key", fn)
+            started.wait(5)
+            follower = pool.submit(single_flight.do, "key", fn)
+            while single_flight.shared < 1:
+                time.sleep(0.001)
+            release.set()
+            for future in (leader, follower):
+                with self.assertRaises(seqeraplatform.CommandError):
+                    future.result()
+
+    def test_sequential_calls_run_again(self):
+        single_flight = SingleFlight()
+        fn = MagicMock(return_value="result")
+        single_flight.do("key", fn)
+        single_flight.do("key", fn)
+        self.assertEqual(fn.call_count, 2)
+
+    def test_async_concurrent_calls_share_result(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run_all():
+            return await asyncio.gather(
+                *(single_flight.do("key", fn) for _ in range(4))
+            )
+
+        self.assertEqual(asyncio.run(run_all()), ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+
+
+class TestSeqeraPlatformSingleFlight(unittest.TestCase):
+    def test_identical_read_only_commands_share_subprocess(self):
+        release = threading.Event()
+        executor = MagicMock()
+
+        def run(full_cmd):
+            release.wait(5)
+            return 0, '{"pipelines": []}'
+
+        executor.run.side_effect = run
+        sp = seqeraplatform.SeqeraPlatform(executor=executor, json=True)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(sp.pipelines, "list", "-w", "org/ws") for _ in range(4)
+            ]
+            while sp.single_flight.shared < 3:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{"pipelines": []}] * 4)
+        self.assertIsNot(results[0], results[1])
+        executor.run.assert_called_once()
+
+    def test_mutating_commands_are_not_coalesced(self):
+        executor = MagicMock()
+        executor.run.return_value = (0, "OK")
+        sp = seqeraplatform.SeqeraPlatform(executor=executor)
+        sp.single_flight = MagicMock()
+
+        sp.pipelines("add", "--name", "p", "--workspace", "org/ws")
+
+        sp.single_flight.do.assert_not_called()
+        executor.run.assert_called_once()
+
+    @patch("asyncio.create_subprocess_exec", new_callable=AsyncMock)
+    def test_async_identical_commands_share_subprocess(self, mock_exec):
+        async def communicate():
+            await asyncio.sleep(0.01)
+            return b"{}", None
+
+        process = MagicMock(returncode=0)
+        process.communicate = communicate
+        mock_exec.return_value = process
+        sp = seqeraplatform.AsyncSeqeraPlatform(json=True)
+
+        async def run_all():
+            return await asyncio.gather(
+                *(sp.pipelines("list", "-w", "org/ws") for _ in range(3))
+            )
+
+        self.assertEqual(asyncio.run(run_all()), [{}] * 3)
+        mock_exec.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from seqerakit import helper
+from seqerakit.checkpoint import Checkpoint, config_digest
+
+DATASET_CONFIG = """\
+pipelines:
+  - name: first
+    workspace: org/ws
+    url: https://github.com/nextflow-io/hello
+    params:
+      dataset: samples
+  - name: second
+    workspace: org/ws
+    url: https://github.com/nextflow-io/hello
+    params:
+      dataset: samples
+"""
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "checkpoint.jsonl")
+        self.yaml_file = os.path.join(self.tmpdir.name, "config.yaml")
+        with open(self.yaml_file, "w") as f:
+            f.write("pipelines: []\n")
+        self.cmd_args_dict = {
+            "credentials": [
+                {"cmd_args": ["--name", "c1", "--workspace", "org/ws"]},
+                {"cmd_args": ["--name", "c2", "--workspace", "org/ws"]},
+            ],
+            "launch": [
+                {"cmd_args": ["--workspace", "org/ws", "hello"]},
+                {"cmd_args": ["--workspace", "org/ws", "hello"]},
+            ],
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def digest(self):
+        return config_digest([self.yaml_file])
+
+    def test_config_digest(self):
+        digest = self.digest()
+        self.assertNotEqual(digest, config_digest([self.yaml_file], destroy=True))
+        self.assertNotEqual(digest, config_digest([self.yaml_file], targets="teams"))
+        with open(self.yaml_file, "a") as f:
+            f.write("teams: []\n")
+        self.assertNotEqual(digest, self.digest())
+
+    def test_stdin_cannot_be_checkpointed(self):
+        with self.assertRaises(ValueError):
+            config_digest(["-"])
+
+    def test_resume_skips_completed_resources(self):
+        checkpoint = Checkpoint(self.path, self.digest())
+        checkpoint.record(
+            "credentials", self.cmd_args_dict["credentials"][0]["cmd_args"]
+        )
+        checkpoint.record("launch", self.cmd_args_dict["launch"][0]["cmd_args"])
+        checkpoint.close()
+
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        pending = checkpoint.pending(self.cmd_args_dict)
+        checkpoint.close()
+
+        self.assertEqual(pending["credentials"], self.cmd_args_dict["credentials"][1:])
+        # Identical resources are only skipped as many times as they completed
+        self.assertEqual(pending["launch"], self.cmd_args_dict["launch"][1:])
+
+    def test_iter_pending(self):
+        checkpoint = Checkpoint(self.path, self.digest())
+        checkpoint.record("launch", self.cmd_args_dict["launch"][0]["cmd_args"])
+        checkpoint.close()
+
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        resources = [
+            (block, args)
+            for block, args_list in self.cmd_args_dict.items()
+            for args in args_list
+        ]
+        pending = list(checkpoint.iter_pending(iter(resources)))
+        checkpoint.close()
+
+        self.assertEqual(pending, resources[:2] + resources[3:])
+
+    def test_resume_appends_after_incomplete_line(self):
+        checkpoint = Checkpoint(self.path, self.digest())
+        checkpoint.record(
+            "credentials", self.cmd_args_dict["credentials"][0]["cmd_args"]
+        )
+        checkpoint.close()
+        with open(self.path, "a") as f:
+            f.write('{"block": "credentials", "ke')
+
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        self.assertEqual(sum(checkpoint.completed.values()), 1)
+        checkpoint.record(
+            "credentials", self.cmd_args_dict["credentials"][1]["cmd_args"]
+        )
+        checkpoint.close()
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(json.loads(lines[-1])["block"], "credentials")
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        self.assertEqual(checkpoint.pending(self.cmd_args_dict)["credentials"], [])
+        checkpoint.close()
+
+    def platform(self):
+        sp = MagicMock()
+        sp.datasets.return_value = {"datasetUrl": "s3://bucket/samples.csv"}
+        return sp
+
+    def test_resume_does_not_parse_completed_resources(self):
+        with open(self.yaml_file, "w") as f:
+            f.write(DATASET_CONFIG)
+        checkpoint = Checkpoint(self.path, self.digest())
+        cmd_args_dict = checkpoint.pending(
+            helper.parse_all_yaml(
+                [self.yaml_file], sp=self.platform(), skip=checkpoint.skip
+            )
+        )
+        checkpoint.record("pipelines", cmd_args_dict["pipelines"][0]["cmd_args"])
+        checkpoint.close()
+
+        sp = self.platform()
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        pending = checkpoint.pending(
+            helper.parse_all_yaml([self.yaml_file], sp=sp, skip=checkpoint.skip)
+        )
+        # The dataset of the completed pipeline is not resolved again
+        sp.datasets.assert_called_once_with("url", "-n", "samples", "-w", "org/ws")
+        self.assertEqual(
+            [helper.find_name(args) for args in pending["pipelines"]], ["second"]
+        )
+        checkpoint.record("pipelines", pending["pipelines"][0]["cmd_args"])
+        checkpoint.close()
+
+        sp = self.platform()
+        checkpoint = Checkpoint(self.path, self.digest(), resume=True)
+        resources = checkpoint.iter_pending(
+            helper.iter_parse_all_yaml([self.yaml_file], sp=sp, skip=checkpoint.skip)
+        )
+        self.assertEqual(list(resources), [])
+        sp.datasets.assert_not_called()
+        checkpoint.close()
+
+    def test_resume_rejects_changed_configuration(self):
+        Checkpoint(self.path, self.digest()).close()
+        with open(self.yaml_file, "a") as f:
+            f.write("teams: []\n")
+
+        with self.assertRaises(ValueError):
+            Checkpoint(self.path, self.digest(), resume=True)
+
+    def test_resume_missing_file(self):
+        with self.assertRaises(ValueError):
+            Checkpoint(self.path, self.digest(), resume=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
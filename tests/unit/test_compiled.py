@@ -0,0 +1,174 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from seqerakit import compiled, helper
+from seqerakit.on_exists import OnExists
+
+CONFIG = """\
+teams:
+  - name: team
+    organization: org
+    members:
+      - user@example.com
+pipelines:
+  - name: pipeline
+    workspace: org/ws
+    url: https://github.com/nextflow-io/hello
+    on_exists: ignore
+    params:
+      outdir: s3://bucket/$RUN_ID
+retry:
+  retries: 2
+"""
+
+
+class TestCompiledPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.yaml_file = os.path.join(self.tmpdir.name, "config.yml")
+        with open(self.yaml_file, "w") as f:
+            f.write(CONFIG)
+        self.plan_file = os.path.join(self.tmpdir.name, "plan.json")
+        self.env = patch.dict(os.environ, {"RUN_ID": "42"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def params_file(self, cmd_args_dict):
+        cmd_args = cmd_args_dict["pipelines"][0]["cmd_args"]
+        return cmd_args[cmd_args.index("--params-file") + 1]
+
+    def test_round_trip(self):
+        settings = {}
+        plan = compiled.compile_plan([self.yaml_file], settings=settings)
+        plan.write(self.plan_file)
+        self.assertEqual(settings, {"retry": {"retries": 2}})
+        self.assertEqual(stat.S_IMODE(os.stat(self.plan_file).st_mode), 0o600)
+
+        loaded = compiled.load(self.plan_file)
+        self.assertEqual(loaded.settings, settings)
+        self.assertEqual(len(loaded), 2)
+        resources = loaded.resources()
+        self.assertEqual(list(resources), ["teams", "pipelines"])
+        self.assertEqual(resources["pipelines"][0]["on_exists"], OnExists.IGNORE)
+        self.assertEqual(
+            resources["teams"][0]["cmd_args"][0],
+            ["--name", "team", "--organization", "org"],
+        )
+        # The params file still exists unchanged, so it is reused
+        self.assertEqual(
+            self.params_file(resources), self.params_file(plan.cmd_args_dict)
+        )
+
+    def test_params_files_written_again(self):
+        plan = compiled.compile_plan([self.yaml_file])
+        plan.write(self.plan_file)
+        os.remove(self.params_file(plan.cmd_args_dict))
+
+        resources = compiled.load(self.plan_file).resources()
+        path = self.params_file(resources)
+        try:
+            with open(path) as f:
+                self.assertEqual(f.read(), 'outdir: "s3://bucket/42"\n')
+        finally:
+            os.remove(path)
+
+    def test_key(self):
+        key = compiled.plan_key([self.yaml_file])
+        self.assertEqual(key, compiled.plan_key([self.yaml_file]))
+        self.assertNotEqual(key, compiled.plan_key([self.yaml_file], destroy=True))
+        # Referenced environment variables are part of the key, others are not
+        with patch.dict(os.environ, {"RUN_ID": "43", "OTHER": "1"}):
+            self.assertNotEqual(key, compiled.plan_key([self.yaml_file]))
+        with patch.dict(os.environ, {"OTHER": "1"}):
+            self.assertEqual(key, compiled.plan_key([self.yaml_file]))
+        with open(self.yaml_file, "a") as f:
+            f.write("labels: []\n")
+        self.assertNotEqual(key, compiled.plan_key([self.yaml_file]))
+
+    def test_key_covers_referenced_files(self):
+        params_file = os.path.join(self.tmpdir.name, "params.yml")
+        with open(params_file, "w") as f:
+            f.write("foo: one\nbar: $BAR\n")
+        with open(self.yaml_file, "a") as f:
+            f.write(
+                "launch:\n"
+                "  - name: run\n"
+                "    workspace: org/ws\n"
+                "    pipeline: pipeline\n"
+                f"    params-file: '{params_file}'\n"
+                "    params:\n"
+                "      outdir: s3://bucket\n"
+            )
+        self.assertEqual(compiled.referenced_files([self.yaml_file]), [params_file])
+
+        with patch.dict(os.environ, {"BAR": "1"}):
+            key = compiled.plan_key([self.yaml_file])
+            first = compiled.parse_cached(self.plan_file, [self.yaml_file])
+            # Environment variables referenced in the params file are part of it
+            with patch.dict(os.environ, {"BAR": "2"}):
+                self.assertNotEqual(key, compiled.plan_key([self.yaml_file]))
+
+            with open(params_file, "w") as f:
+                f.write("foo: two\nbar: $BAR\n")
+            self.assertNotEqual(key, compiled.plan_key([self.yaml_file]))
+            second = compiled.parse_cached(self.plan_file, [self.yaml_file])
+
+        cmd_args = second["launch"][0]["cmd_args"]
+        with open(cmd_args[cmd_args.index("--params-file") + 1]) as f:
+            self.assertIn('foo: "two"', f.read())
+        self.assertNotEqual(second["launch"], first["launch"])
+
+    def test_stdin_cannot_be_compiled(self):
+        with self.assertRaises(ValueError):
+            compiled.plan_key(["-"])
+
+    def test_check(self):
+        plan = compiled.compile_plan([self.yaml_file], targets="pipelines")
+        plan.check([self.yaml_file])
+        plan.check(targets="pipelines")
+        with self.assertRaises(ValueError):
+            plan.check(destroy=True)
+        with self.assertRaises(ValueError):
+            plan.check(targets="teams")
+        with patch.dict(os.environ, {"RUN_ID": "43"}):
+            with self.assertRaises(ValueError):
+                plan.check([self.yaml_file])
+
+    def test_invalid_plan(self):
+        with open(self.plan_file, "w") as f:
+            json.dump({"version": 0}, f)
+        with self.assertRaises(ValueError):
+            compiled.load(self.plan_file)
+        with self.assertRaises(ValueError):
+            compiled.load(os.path.join(self.tmpdir.name, "missing.json"))
+
+    def test_parse_cached(self):
+        with patch.object(
+            helper, "parse_all_yaml", wraps=helper.parse_all_yaml
+        ) as parse:
+            first = compiled.parse_cached(self.plan_file, [self.yaml_file])
+            settings = {}
+            second = compiled.parse_cached(
+                self.plan_file, [self.yaml_file], settings=settings
+            )
+            self.assertEqual(parse.call_count, 1)
+            self.assertEqual(settings, {"retry": {"retries": 2}})
+            self.assertEqual(
+                [args["cmd_args"] for args in second["pipelines"]],
+                [args["cmd_args"] for args in first["pipelines"]],
+            )
+
+            with patch.dict(os.environ, {"RUN_ID": "43"}):
+                compiled.parse_cached(self.plan_file, [self.yaml_file])
+            self.assertEqual(parse.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
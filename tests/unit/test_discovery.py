@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from seqerakit import cli, helper
+
+
+class TestFindYamlFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        for path in [
+            "b.yml",
+            "a.YAML",
+            "notes.txt",
+            "teams/z.yaml",
+            "teams/drafts/draft.yml",
+            "pipelines/p.local.yml",
+            "pipelines/p.yml",
+            "pipelines/nested/q.yaml",
+            "drafts/x.yml",
+        ]:
+            full_path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write("teams: []\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.root) for path in paths]
+
+    def test_sorted_yaml_files(self):
+        found = cli.find_yaml_files([self.root])
+        self.assertEqual(
+            self.relative(found),
+            [
+                "a.YAML",
+                "b.yml",
+                "drafts/x.yml",
+                "pipelines/nested/q.yaml",
+                "pipelines/p.local.yml",
+                "pipelines/p.yml",
+                "teams/drafts/draft.yml",
+                "teams/z.yaml",
+            ],
+        )
+        self.assertEqual(found, cli.find_yaml_files([self.root], workers=1))
+
+    def test_ignore_patterns(self):
+        found = cli.find_yaml_files(
+            [self.root], ignore=["drafts", "*.local.yml", "pipelines/nested"]
+        )
+        self.assertEqual(
+            self.relative(found), ["a.YAML", "b.yml", "pipelines/p.yml", "teams/z.yaml"]
+        )
+
+    def test_ignore_relative_path(self):
+        found = cli.find_yaml_files([self.root], ignore=["teams/drafts"])
+        self.assertIn("drafts/x.yml", self.relative(found))
+        self.assertNotIn("teams/drafts/draft.yml", self.relative(found))
+
+    def test_files_given_are_not_ignored(self):
+        path = os.path.join(self.root, "pipelines", "p.local.yml")
+        self.assertEqual(cli.find_yaml_files([path], ignore=["*.local.yml"]), [path])
+
+
+class TestParallelParsing(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_same_merge_as_serial(self):
+        paths = [
+            self.write(
+                f"{i}.yml",
+                f"organizations:\n- name: org{i % 3}\n"
+                f"teams:\n- name: team{i}\n  organization: org{i % 3}\n",
+            )
+            for i in range(12)
+        ]
+
+        serial = helper.load_all_yaml(paths)
+        with patch.object(helper, "PARALLEL_PARSE_MIN_FILES", 2):
+            parallel = helper.load_all_yaml(paths, workers=2)
+
+        self.assertEqual(parallel, serial)
+        # Identical items are merged once, in the order of the files
+        self.assertEqual(
+            [org["name"] for org in parallel["organizations"]],
+            ["org0", "org1", "org2"],
+        )
+        self.assertEqual(len(parallel["teams"]), 12)
+
+    def test_errors_name_every_file(self):
+        paths = [
+            self.write("good.yml", "teams: []\n"),
+            self.write("invalid.yml", "teams: [\n"),
+            self.write("empty.yml", ""),
+        ]
+        for workers in (1, 2):
+            with patch.object(helper, "PARALLEL_PARSE_MIN_FILES", 2):
+                with self.assertRaises(ValueError) as context:
+                    helper.load_all_yaml(paths, workers=workers)
+            message = str(context.exception)
+            self.assertIn("'" + paths[1] + "' is not valid YAML", message)
+            self.assertIn("'" + paths[2] + "' is empty", message)
+            self.assertNotIn(paths[0], message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import io
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from seqerakit import executor as executor_module
+from seqerakit import seqeraplatform
+from seqerakit.executor import (
+    BatchExecutor,
+    SubprocessExecutor,
+    get_executor,
+    read_output,
+)
+
+
+class TestGetExecutor(unittest.TestCase):
+    def test_default_executor(self):
+        self.assertIsInstance(get_executor(), SubprocessExecutor)
+
+    def test_executor_by_name(self):
+        executor = get_executor("batch", workers=2)
+        self.assertIsInstance(executor, BatchExecutor)
+        executor.close()
+
+    def test_executor_instance_passthrough(self):
+        executor = SubprocessExecutor()
+        self.assertIs(get_executor(executor), executor)
+
+    def test_invalid_executor(self):
+        with self.assertRaises(ValueError):
+            get_executor("invalid")
+
+
+class TestBatchExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = BatchExecutor(workers=1)
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_reuses_worker(self):
+        first = self.executor.run("echo $$")
+        second = self.executor.run("echo $$")
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 0)
+
+    def test_combined_output_and_returncode(self):
+        returncode, stdout = self.executor.run("echo out; echo err >&2; false")
+        self.assertEqual(returncode, 1)
+        self.assertEqual(stdout, "out\nerr")
+
+    def test_output_without_trailing_newline(self):
+        self.assertEqual(self.executor.run("printf 'abc'"), (0, "abc"))
+
+    def test_worker_restarted_after_exit(self):
+        self.assertEqual(self.executor.run("echo bye; exit 3"), (3, "bye"))
+        self.assertEqual(self.executor.run("echo hello"), (0, "hello"))
+
+    def test_syntax_error_fails_only_that_command(self):
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(self.executor.run("echo R&D team's org")),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive(), "the worker did not print the sentinel")
+        self.assertNotEqual(result[0][0], 0)
+        self.assertEqual(self.executor.run("echo hello"), (0, "hello"))
+
+    def test_environment_changes_are_visible(self):
+        self.executor.run("true")
+        os.environ["SEQERAKIT_TEST_BATCH_VAR"] = "value"
+        try:
+            self.assertEqual(
+                self.executor.run("echo $SEQERAKIT_TEST_BATCH_VAR"), (0, "value")
+            )
+        finally:
+            del os.environ["SEQERAKIT_TEST_BATCH_VAR"]
+
+
+class TestArgvExecution(unittest.TestCase):
+    def test_argv_is_not_interpreted_by_a_shell(self):
+        returncode, stdout = SubprocessExecutor().run(
+            ["printf", "%s", "$HOME; echo injected"]
+        )
+        self.assertEqual((returncode, stdout), (0, "$HOME; echo injected"))
+
+    def test_argv_returncode_and_combined_output(self):
+        script = "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"
+        self.assertEqual(
+            SubprocessExecutor().run([sys.executable, "-c", script]), (3, "out\nerr")
+        )
+
+    def test_missing_command(self):
+        returncode, stdout = SubprocessExecutor().run(["seqerakit-missing-command"])
+        self.assertEqual(returncode, 127)
+        self.assertIn("command not found", stdout)
+
+    def test_batch_executor_quotes_argv(self):
+        batch = BatchExecutor()
+        try:
+            self.assertEqual(batch.run(["echo", "a  b", "$HOME"]), (0, "a  b $HOME"))
+        finally:
+            batch.close()
+
+    @patch.object(executor_module, "CHUNK_SIZE", 4)
+    @patch.object(executor_module, "SPOOL_MAX_SIZE", 8)
+    def test_large_output_is_spooled_and_stripped(self):
+        self.assertEqual(
+            read_output(io.BytesIO(b"\n  \n" + b"x" * 30 + b" \n\n\n")), "x" * 30
+        )
+        self.assertEqual(read_output(io.BytesIO(b" \n\t ")), "")
+
+
+class TestSeqeraPlatformArgv(unittest.TestCase):
+    def setUp(self):
+        self.executor = MagicMock()
+        self.executor.run.return_value = (0, "OK")
+        self.sp = seqeraplatform.SeqeraPlatform(executor=self.executor, shell=False)
+
+    def test_argv_passed_to_executor(self):
+        self.sp.pipelines("add", "--name", "my pipeline", "--description", "a;b")
+        self.executor.run.assert_called_once_with(
+            ["tw", "pipelines", "add", "--name", "my pipeline", "--description", "a;b"]
+        )
+
+    @patch.dict(os.environ, {"SEQERAKIT_TEST_WS": "org/ws"})
+    def test_env_vars_expanded(self):
+        self.sp.pipelines(
+            "list", "-w", "$SEQERAKIT_TEST_WS", "--x", "${SEQERAKIT_TEST_WS}/a"
+        )
+        self.executor.run.assert_called_once_with(
+            ["tw", "pipelines", "list", "-w", "org/ws", "--x", "org/ws/a"]
+        )
+
+    def test_missing_env_var(self):
+        with self.assertRaises(EnvironmentError):
+            self.sp.pipelines("list", "-w", "$SEQERAKIT_TEST_MISSING")
+        self.executor.run.assert_not_called()
+
+    def test_escaped_and_special_vars(self):
+        self.sp.compute_envs("add", "--work-dir", "$TW_AGENT_WORK", "--x", "\\$LITERAL")
+        self.executor.run.assert_called_once_with(
+            [
+                "tw",
+                "compute-envs",
+                "add",
+                "--work-dir",
+                "\\$TW_AGENT_WORK",
+                "--x",
+                "$LITERAL",
+            ]
+        )
+
+    def test_command_substitution_rejected(self):
+        with self.assertRaises(ValueError):
+            self.sp.pipelines("add", "--name", "$(whoami)")
+
+
+class TestSeqeraPlatformExecutor(unittest.TestCase):
+    def test_errors_raised_from_executor_output(self):
+        executor = MagicMock()
+        executor.run.return_value = (1, "ERROR: Resource already exists")
+        sp = seqeraplatform.SeqeraPlatform(executor=executor)
+
+        with self.assertRaises(seqeraplatform.ResourceExistsError):
+            sp.pipelines("add", "--name", "pipeline_name")
+        executor.run.assert_called_once_with("tw pipelines add --name pipeline_name")
+
+    @patch("subprocess.Popen")
+    def test_close_releases_executor(self, mock_subprocess):
+        executor = MagicMock()
+        sp = seqeraplatform.SeqeraPlatform(executor=executor)
+        sp.close()
+        executor.close.assert_called_once()
+        mock_subprocess.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -685,3 +685,38 @@ def test_process_params_dict_with_dataset_resolution(mocker, mock_seqera_platfor
         assert written_params["input"] == "https://api.cloud.seqera.io/datasets/123"
         assert written_params["outdir"] == "s3://bucket/results"
         assert "dataset" not in written_params
+
+
+def test_iter_parse_all_yaml(mock_yaml_file):
+    test_data = {
+        "retry": {"retries": 2},
+        "workspaces": [
+            {"name": "ws", "full-name": "ws", "organization": "org"},
+        ],
+        "organizations": [{"name": "org", "full-name": "org"}],
+        "teams": [],
+    }
+    file_path = mock_yaml_file(test_data)
+    settings = {}
+
+    with patch.object(helper, "parse_block", wraps=helper.parse_block) as parse:
+        resources = helper.iter_parse_all_yaml([file_path], settings=settings)
+        # The files are read before iterating, the resources parsed lazily
+        assert settings == {"retry": {"retries": 2}}
+        assert parse.call_count == 0
+        assert next(resources)[0] == "organizations"
+        assert parse.call_count == 1
+        resources = [("organizations", None)] + list(resources)
+
+    assert [block for block, _ in resources] == ["organizations", "workspaces"]
+    assert resources[1][1] == helper.parse_all_yaml([file_path])["workspaces"][0]
+
+
+def test_iter_parse_all_yaml_duplicate_names(mock_yaml_file):
+    test_data = {"organizations": [{"name": "org"}, {"name": "org"}]}
+    file_path = mock_yaml_file(test_data)
+
+    resources = helper.iter_parse_all_yaml([file_path])
+    next(resources)
+    with pytest.raises(ValueError, match="Duplicate name key"):
+        next(resources)
@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from seqerakit import seqeraplatform
+from seqerakit.limiter import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_initial_limit(self):
+        self.assertEqual(AdaptiveLimiter(8).limit, 4)
+        self.assertEqual(AdaptiveLimiter(1).limit, 1)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(0)
+
+    def test_additive_increase_on_stable_latency(self):
+        limiter = AdaptiveLimiter(4, initial=2)
+        for _ in range(4):
+            limiter.call(["pipelines", "list"], lambda: (0, "[]"))
+        self.assertEqual(int(limiter.limit), 3)
+        self.assertEqual(limiter.increases, 1)
+        for _ in range(20):
+            limiter.call(["pipelines", "list"], lambda: (0, "[]"))
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.peak, 4)
+
+    def test_no_increase_on_rising_latency(self):
+        limiter = AdaptiveLimiter(4, initial=2)
+        with patch("seqerakit.limiter.time.monotonic", side_effect=[0, 1, 10, 15]):
+            limiter.call(["pipelines", "list"], lambda: (0, "[]"))
+            limiter.call(["pipelines", "list"], lambda: (0, "[]"))
+        self.assertEqual(limiter.limit, 2.5)
+
+    def test_multiplicative_decrease_on_throttling(self):
+        limiter = AdaptiveLimiter(16, initial=8)
+        limiter.call(["pipelines", "list"], lambda: (1, "ERROR: 429 Too Many Requests"))
+        self.assertEqual(limiter.limit, 4)
+        limiter.call(["pipelines", "list"], lambda: (1, "ERROR: HTTP 503"))
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.decreases, 2)
+        self.assertEqual(limiter.lowest, 2)
+
+        # Other errors do not change the limit
+        limiter.call(["pipelines", "list"], lambda: (1, "ERROR: not found"))
+        self.assertEqual(limiter.limit, 2)
+
+    def test_errors_from_same_period_decrease_once(self):
+        limiter = AdaptiveLimiter(16, initial=8)
+        first = limiter.acquire()
+        second = limiter.acquire()
+        limiter.release(None, first, returncode=1, output="ERROR: 502 Bad Gateway")
+        limiter.release(None, second, returncode=1, output="ERROR: 502 Bad Gateway")
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_not_adaptive(self):
+        limiter = AdaptiveLimiter(4, initial=4, adaptive=False)
+        limiter.call(["pipelines", "list"], lambda: (1, "ERROR: HTTP 429"))
+        self.assertEqual(limiter.limit, 4)
+
+    def test_not_adaptive_starts_at_max_limit(self):
+        limiter = AdaptiveLimiter(8, max_per_scope=2, adaptive=False)
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(AdaptiveLimiter(8).limit, 4)
+
+    def test_limits_concurrent_commands(self):
+        limiter = AdaptiveLimiter(8, initial=2, max_per_scope=1, adaptive=False)
+        running = {"all": 0, "org/a": 0}
+        peak = {"all": 0, "org/a": 0}
+        lock = threading.Lock()
+
+        def run(scope):
+            def fn():
+                with lock:
+                    for key in {"all", scope}:
+                        running[key] = running.get(key, 0) + 1
+                        peak[key] = max(peak.get(key, 0), running[key])
+                time.sleep(0.02)
+                with lock:
+                    for key in {"all", scope}:
+                        running[key] -= 1
+                return 0, ""
+
+            limiter.call(["pipelines", "list", "-w", scope], fn)
+
+        threads = [
+            threading.Thread(target=run, args=(scope,))
+            for scope in ["org/a", "org/a", "org/a", "org/b", "org/b"]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak["all"], 2)
+        self.assertEqual(peak["org/a"], 1)
+        self.assertGreater(limiter.waits, 0)
+        self.assertIn(f"{limiter.waits} commands waited for a slot", limiter.summary())
+
+
+class TestSeqeraPlatformLimiter(unittest.TestCase):
+    def test_commands_run_through_limiter(self):
+        executor = MagicMock()
+        executor.run.return_value = (1, "ERROR: 504 Gateway Timeout")
+        limiter = AdaptiveLimiter(8, initial=8)
+        sp = seqeraplatform.SeqeraPlatform(executor=executor, limiter=limiter)
+
+        with self.assertRaises(seqeraplatform.CommandError):
+            sp.pipelines("list", "-w", "org/ws")
+
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter._in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
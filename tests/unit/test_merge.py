@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from seqerakit import helper, merge, yaml_io
+from seqerakit.merge import MergeEngine, Source
+
+
+def pipeline(name, workspace="org/ws", **options):
+    return {"name": name, "workspace": workspace, **options}
+
+
+class TestMergeEngine(unittest.TestCase):
+    def test_identical_resources_merged_once(self):
+        engine = MergeEngine()
+        engine.add({"pipelines": [pipeline("a", revision="main"), pipeline("b")]})
+        engine.add(
+            {"pipelines": [{"revision": "main", "workspace": "org/ws", "name": "a"}]}
+        )
+        engine.add({"pipelines": [pipeline("c")]})
+
+        self.assertEqual([p["name"] for p in engine.data["pipelines"]], ["a", "b", "c"])
+        self.assertEqual(engine.conflicts, [])
+
+    def test_duplicates_in_one_file_are_kept(self):
+        # They fail later as duplicate names, as they did before
+        engine = MergeEngine()
+        engine.add({"pipelines": [pipeline("a"), pipeline("a")]})
+        self.assertEqual(len(engine.data["pipelines"]), 2)
+
+    def test_other_values_replaced(self):
+        engine = MergeEngine()
+        engine.add({"retry": {"retries": 1}, "teams": [{"name": "t"}]})
+        engine.add({"retry": {"retries": 2}, "teams": ["not", "resources"]})
+        self.assertEqual(
+            engine.data, {"retry": {"retries": 2}, "teams": ["not", "resources"]}
+        )
+
+    def test_sources(self):
+        data, lines = yaml_io.load_with_lines(
+            "pipelines:\n  - name: a\n    workspace: org/ws\n  - name: b\n"
+        )
+        engine = MergeEngine()
+        engine.add(data, "a.yml", lines)
+        engine.add({"pipelines": [pipeline("c")]}, "b.yml")
+
+        self.assertEqual(
+            engine.sources["pipelines"],
+            [Source("a.yml", 2), Source("a.yml", 4), Source("b.yml", None)],
+        )
+
+    def test_conflicts(self):
+        engine = MergeEngine()
+        engine.add({"pipelines": [pipeline("a", revision="main")]}, "a.yml", {})
+        engine.add(
+            {
+                "pipelines": [
+                    pipeline("a", revision="dev"),
+                    pipeline("a", workspace="org/other", revision="dev"),
+                ]
+            },
+            "b.yml",
+            {"pipelines": [7, 12]},
+        )
+
+        self.assertEqual(len(engine.conflicts), 1)
+        self.assertEqual(
+            engine.conflict_messages(),
+            [
+                " Conflicting definitions of pipelines 'a' in 'org/ws': a.yml and "
+                "b.yml:7. Please define it once or give the definitions unique names."
+            ],
+        )
+
+    def test_linear_in_resources(self):
+        files = [
+            {"pipelines": [pipeline(f"p{f}-{i}") for i in range(50)]}
+            for f in range(100)
+        ]
+        engine = MergeEngine()
+        with patch.object(merge, "item_digest", wraps=merge.item_digest) as digest:
+            for data in files:
+                engine.add(data)
+
+        self.assertEqual(len(engine.data["pipelines"]), 5000)
+        # Every resource is serialized once, whatever the number of files
+        self.assertEqual(digest.call_count, 5000)
+
+
+class TestLoadAllYaml(unittest.TestCase):
+    def test_conflict_names_files_and_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, revision in (("a.yml", "main"), ("b.yml", "dev")):
+                path = os.path.join(tmp, name)
+                with open(path, "w") as f:
+                    f.write(
+                        "pipelines:\n"
+                        "  - name: p\n"
+                        "    workspace: org/ws\n"
+                        f"    revision: {revision}\n"
+                    )
+                paths.append(path)
+
+            with self.assertRaises(ValueError) as context:
+                helper.load_all_yaml(paths)
+
+        self.assertIn(f"{paths[0]}:2 and {paths[1]}:2", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
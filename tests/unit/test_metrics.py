@@ -0,0 +1,239 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from seqerakit import cli, seqeraplatform
+from seqerakit.cache import ResultCache
+from seqerakit.metrics import RunStats, command_phase
+from seqerakit.retry import RetryPolicy
+
+
+class TestRunStats(unittest.TestCase):
+    def test_command_phase(self):
+        self.assertEqual(command_phase(["-o", "json", "pipelines", "list"]), "check")
+        self.assertEqual(command_phase(["pipelines", "add", "--name", "p"]), "create")
+        self.assertEqual(command_phase(["compute-envs", "import", "ce.json"]), "create")
+        self.assertEqual(command_phase(["labels", "update", "--id", "1"]), "update")
+        self.assertEqual(command_phase(["teams", "delete", "--name", "t"]), "delete")
+        self.assertEqual(command_phase(["launch", "--workspace", "org/ws"]), "launch")
+        self.assertEqual(command_phase(["info"]), "other")
+
+    def test_commands_attributed_to_resource(self):
+        stats = RunStats()
+        stats.record_command(["-o", "json", "pipelines", "list"], 0, 0, "[]")
+        with stats.resource("pipelines", "p") as record:
+            stats.record_command(["pipelines", "add", "--name", "p"], 0, 0, "ok", 2)
+            record["action"] = "create"
+
+        data = stats.to_dict()
+        self.assertEqual(data["commands"], 2)
+        self.assertEqual(data["retries"], 2)
+        self.assertEqual(data["output_bytes"], 4)
+        self.assertEqual(data["command_log"][0]["resource"], None)
+        self.assertEqual(data["command_log"][1]["resource"], "pipelines/p")
+        self.assertEqual(data["blocks"]["pipelines"]["commands"], 1)
+        self.assertEqual(data["blocks"]["pipelines"]["actions"], {"create": 1})
+        self.assertEqual(set(data["phases"]), {"check", "create"})
+
+    def test_failed_resource(self):
+        stats = RunStats()
+        with self.assertRaises(seqeraplatform.CommandError):
+            with stats.resource("pipelines", "p"):
+                raise seqeraplatform.CommandError("failed")
+        self.assertEqual(stats.resources[0]["action"], "failed")
+
+    def test_report(self):
+        stats = RunStats()
+        with patch("seqerakit.metrics.time.monotonic", return_value=3):
+            stats.record_command(["pipelines", "add", "--name", "slow"], 0, 1, "")
+            stats.record_command(["pipelines", "add", "--name", "fast"], 2, 0, "")
+
+        report = stats.report()
+        self.assertIn("2 commands (0 cached, 0 retries) took 4.00s", report)
+        self.assertIn("   create: 2 commands, 4.00s", report)
+        slowest = report.index("Slowest commands:")
+        self.assertLess(
+            report.index("pipelines add --name slow", slowest),
+            report.index("pipelines add --name fast", slowest),
+        )
+
+    def test_write_json(self):
+        stats = RunStats()
+        stats.record_command(["pipelines", "list"], 0, 0, "[]")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.json")
+            stats.write_json(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["commands"], 1)
+
+
+class TestInstrumentation(unittest.TestCase):
+    @patch("seqerakit.retry.random.uniform", return_value=0)
+    def test_seqeraplatform_records_commands(self, mock_uniform):
+        executor = MagicMock()
+        executor.run.side_effect = [(1, "ERROR: HTTP 503"), (0, "[]")]
+        stats = RunStats()
+        sp = seqeraplatform.SeqeraPlatform(
+            executor=executor,
+            cache=ResultCache(),
+            retry_policy=RetryPolicy(retries=1),
+            stats=stats,
+        )
+
+        sp.pipelines("list", "-w", "org/ws")
+        sp.pipelines("list", "-w", "org/ws")
+
+        first, second = stats.commands
+        self.assertEqual(first["retries"], 1)
+        self.assertFalse(first["cached"])
+        self.assertEqual(first["output_bytes"], 2)
+        self.assertTrue(second["cached"])
+
+    def test_coalesced_commands_recorded_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def run(full_cmd):
+            started.set()
+            release.wait(5)
+            return 0, "[]"
+
+        executor = MagicMock()
+        executor.run.side_effect = run
+        stats = RunStats()
+        sp = seqeraplatform.SeqeraPlatform(executor=executor, stats=stats)
+
+        threads = [
+            threading.Thread(target=sp.pipelines, args=("list", "-w", "org/ws"))
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        # Wait for the other threads to join the running command
+        while sp.single_flight.shared < len(threads) - 1:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(executor.run.call_count, 1)
+        executed = [record for record in stats.commands if not record["cached"]]
+        self.assertEqual(len(executed), 1)
+        self.assertEqual(len(stats.commands), len(threads))
+        textfile = stats.to_textfile()
+        self.assertIn(
+            'seqerakit_command_duration_seconds_count{subcommand="pipelines list"} 1',
+            textfile,
+        )
+
+    def test_block_parser_records_resources(self):
+        sp = MagicMock()
+        sp.global_on_exists = None
+        sp.overwrite = False
+        sp.stats = RunStats()
+        block_parser = cli.BlockParser(sp, ["credentials"])
+        block_parser.overwrite_method = MagicMock()
+        block_parser.overwrite_method.handle_overwrite.return_value = True
+
+        block_parser.handle_block(
+            "credentials", {"cmd_args": ["--name", "creds", "--workspace", "org/ws"]}
+        )
+        block_parser.handle_block(
+            "credentials", {"cmd_args": ["--name", "old"]}, destroy=True
+        )
+
+        self.assertEqual(
+            [(r["name"], r["action"]) for r in sp.stats.resources],
+            [("creds", "create"), ("old", "delete")],
+        )
+
+
+class TestTextfile(unittest.TestCase):
+    def setUp(self):
+        self.stats = RunStats()
+        with patch("seqerakit.metrics.time.monotonic", return_value=0.3):
+            self.stats.record_command(["pipelines", "list", "-w", "org/ws"], 0, 0, "")
+            with self.stats.resource("pipelines", "p") as record:
+                self.stats.record_command(["pipelines", "delete", "-n", "p"], 0, 0, "")
+                self.stats.record_command(["pipelines", "add", "-n", "p"], 0, 1, "", 1)
+                record["action"] = "create"
+            with self.stats.resource("pipelines", "q") as record:
+                record["action"] = "ignore"
+        self.stats.record_command(
+            ["pipelines", "list", "-w", "org/ws"], 0, 0, "", 0, True
+        )
+
+    def test_overwritten_resource(self):
+        self.assertEqual(
+            [r["action"] for r in self.stats.resources], ["overwrite", "ignore"]
+        )
+
+    def test_textfile(self):
+        text = self.stats.to_textfile(
+            cache_stats={"hits": 1, "misses": 3},
+            success=False,
+            info={"endpoint": 'https://"api"'},
+        )
+        lines = text.splitlines()
+
+        self.assertIn('seqerakit_run_info{endpoint="https://\\"api\\""} 1', lines)
+        self.assertIn("seqerakit_run_success 0", lines)
+        self.assertIn("# TYPE seqerakit_command_duration_seconds histogram", lines)
+        self.assertIn(
+            'seqerakit_command_duration_seconds_bucket{subcommand="pipelines list",'
+            'le="0.25"} 0',
+            lines,
+        )
+        self.assertIn(
+            'seqerakit_command_duration_seconds_bucket{subcommand="pipelines list",'
+            'le="0.5"} 1',
+            lines,
+        )
+        self.assertIn(
+            'seqerakit_command_duration_seconds_count{subcommand="pipelines list"} 1',
+            lines,
+        )
+        self.assertIn(
+            'seqerakit_command_failures_total{subcommand="pipelines add"} 1', lines
+        )
+        self.assertIn(
+            'seqerakit_command_retries_total{subcommand="pipelines add"} 1', lines
+        )
+        self.assertIn(
+            'seqerakit_resources_total{block="pipelines",action="overwritten"} 1',
+            lines,
+        )
+        self.assertIn(
+            'seqerakit_resources_total{block="pipelines",action="skipped"} 1', lines
+        )
+        self.assertIn("seqerakit_cache_hit_ratio 0.25", lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+    def test_write_textfile_atomically(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "seqerakit.prom")
+            with open(path, "w") as f:
+                f.write("old")
+            self.stats.write_textfile(path)
+
+            self.assertEqual(os.listdir(tmp), ["seqerakit.prom"])
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+            with open(path) as f:
+                self.assertIn("seqerakit_run_duration_seconds", f.read())
+
+    def test_metrics_file_must_end_with_prom(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "seqerakit.txt")
+            with self.assertLogs(level="ERROR"), self.assertRaises(SystemExit):
+                cli.main(["file.yml", "--metrics-file", path])
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
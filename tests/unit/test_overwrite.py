@@ -1,8 +1,9 @@
+import threading
 import unittest
 from unittest.mock import Mock, patch
 import json
-from seqerakit.overwrite import Overwrite
-from seqerakit.seqeraplatform import ResourceExistsError
+from seqerakit.overwrite import Overwrite, ResourceIndex
+from seqerakit.seqeraplatform import ResourceExistsError, SeqeraPlatform
 from seqerakit.on_exists import OnExists
 
 
@@ -261,6 +262,354 @@ class TestOverwrite(unittest.TestCase):
             self.overwrite.handle_overwrite("credentials", args, overwrite=False)
 
 
+class TestResourceIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ResourceIndex(
+            json.dumps(
+                {
+                    "workspaceRef": "[org / ws]",
+                    "dataLinks": [
+                        {
+                            "id": "1",
+                            "name": "bucket",
+                            "credentials": [{"id": "2", "name": "creds"}],
+                        }
+                    ],
+                }
+            )
+        )
+
+    def test_exists_searches_nested_records(self):
+        self.assertTrue(self.index.exists("name", "bucket"))
+        self.assertTrue(self.index.exists("name", "creds"))
+        self.assertTrue(self.index.exists("workspaceRef", "[org / ws]"))
+        self.assertFalse(self.index.exists("name", "missing"))
+
+    def test_find_with_multiple_criteria(self):
+        index = ResourceIndex(
+            {
+                "labels": [
+                    {"id": "1", "name": "env", "value": "dev"},
+                    {"id": "2", "name": "env", "value": "prod"},
+                ]
+            }
+        )
+        self.assertEqual(index.find({"name": "env", "value": "prod"})["id"], "2")
+        self.assertIsNone(index.find({"name": "env", "value": "test"}))
+
+    def test_find_within_collection(self):
+        self.assertIsNone(self.index.find({"name": "creds"}, collection="dataLinks"))
+        self.assertEqual(
+            self.index.find({"name": "bucket"}, collection="dataLinks")["id"], "1"
+        )
+
+    def test_add_and_remove_update_indexes(self):
+        self.assertFalse(self.index.exists("name", "new"))
+        record = {"name": "new"}
+        self.index.add(record, collection="dataLinks")
+        self.assertTrue(self.index.exists("name", "new"))
+
+        self.index.remove(record)
+        self.assertFalse(self.index.exists("name", "new"))
+        self.assertTrue(self.index.exists("name", "bucket"))
+
+    def test_empty_data(self):
+        self.assertFalse(ResourceIndex(None).exists("name", "anything"))
+        self.assertFalse(ResourceIndex("").exists("name", "anything"))
+
+
+class TestOverwriteCaching(unittest.TestCase):
+    def setUp(self):
+        self.mock_sp = Mock()
+        self.mock_sp.suppress_output.return_value.__enter__ = Mock()
+        self.mock_sp.suppress_output.return_value.__exit__ = Mock()
+        self.overwrite = Overwrite(self.mock_sp)
+
+    def test_list_called_once_per_block(self):
+        json_method_mock = Mock(
+            return_value=json.dumps(
+                {"credentials": [{"name": "creds1"}, {"name": "creds2"}]}
+            )
+        )
+        self.mock_sp.configure_mock(**{"-o json": json_method_mock})
+
+        for name in ["creds1", "creds2"]:
+            result = self.overwrite.handle_overwrite(
+                "credentials",
+                ["--name", name, "--workspace", "org/ws"],
+                on_exists=OnExists.IGNORE,
+            )
+            self.assertFalse(result)
+
+        self.assertEqual(json_method_mock.call_count, 1)
+        self.assertIsInstance(
+            self.overwrite.block_jsondata[("credentials", "org/ws")], ResourceIndex
+        )
+
+    def test_list_called_once_per_scope(self):
+        json_method_mock = Mock(return_value=json.dumps({"credentials": []}))
+        self.mock_sp.configure_mock(**{"-o json": json_method_mock})
+
+        for workspace in ["org/ws1", "org/ws2", "org/ws1"]:
+            self.overwrite.handle_overwrite(
+                "credentials",
+                ["--name", "creds", "--workspace", workspace],
+                on_exists=OnExists.FAIL,
+            )
+
+        self.assertEqual(json_method_mock.call_count, 2)
+        json_method_mock.assert_any_call("credentials", "list", "-w", "org/ws1")
+        json_method_mock.assert_any_call("credentials", "list", "-w", "org/ws2")
+
+    def test_record_created_updates_cached_list(self):
+        json_method_mock = Mock(return_value=json.dumps({"credentials": []}))
+        self.mock_sp.configure_mock(**{"-o json": json_method_mock})
+        args = ["--name", "creds", "--workspace", "org/ws"]
+
+        self.assertTrue(
+            self.overwrite.handle_overwrite("credentials", args, OnExists.IGNORE)
+        )
+        self.overwrite.record_created("credentials", args)
+        self.assertFalse(
+            self.overwrite.handle_overwrite("credentials", args, OnExists.IGNORE)
+        )
+        self.assertEqual(json_method_mock.call_count, 1)
+
+    def test_partial_list_refreshed_before_delete_by_id(self):
+        json_method_mock = Mock(
+            side_effect=[
+                json.dumps({"labels": []}),
+                json.dumps({"labels": [{"name": "l", "value": "v", "id": "42"}]}),
+            ]
+        )
+        self.mock_sp.configure_mock(**{"-o json": json_method_mock})
+        args = ["--name", "l", "--value", "v", "--workspace", "org/ws"]
+
+        self.overwrite.handle_overwrite("labels", args, OnExists.OVERWRITE)
+        self.overwrite.record_created("labels", args)
+        self.overwrite.handle_overwrite("labels", args, OnExists.OVERWRITE)
+
+        self.assertEqual(json_method_mock.call_count, 2)
+        self.mock_sp.labels.assert_called_once_with(
+            "delete", "--id", "42", "-w", "org/ws"
+        )
+        self.assertFalse(
+            self.overwrite.block_jsondata[("labels", "org/ws")].exists("name", "l")
+        )
+
+    def test_lock_not_held_during_delete(self):
+        self.overwrite.block_jsondata = {
+            ("labels", "org/ws"): ResourceIndex(
+                {"labels": [{"name": "l", "value": "v", "id": "42"}]}
+            )
+        }
+        acquired = []
+
+        def check():
+            if self.overwrite._lock.acquire(blocking=False):
+                acquired.append(True)
+                self.overwrite._lock.release()
+
+        def delete(*args):
+            # Another thread can check its resources while this one deletes
+            thread = threading.Thread(target=check)
+            thread.start()
+            thread.join()
+
+        self.mock_sp.labels.side_effect = delete
+        self.overwrite.handle_overwrite(
+            "labels",
+            ["--name", "l", "--value", "v", "--workspace", "org/ws"],
+            OnExists.OVERWRITE,
+        )
+
+        self.mock_sp.labels.assert_called_once_with(
+            "delete", "--id", "42", "-w", "org/ws"
+        )
+        self.assertEqual(acquired, [True])
+
+    def test_workspace_delete_drops_cached_lists_in_scope(self):
+        self.overwrite.block_jsondata = {
+            ("workspaces", "org"): ResourceIndex(
+                {
+                    "workspaces": [
+                        {"workspaceName": "ws", "orgName": "org", "workspaceId": 1}
+                    ]
+                }
+            ),
+            ("pipelines", "org/ws"): ResourceIndex({"pipelines": []}),
+            ("pipelines", "org/other"): ResourceIndex({"pipelines": []}),
+        }
+
+        self.overwrite.handle_overwrite(
+            "workspaces",
+            ["--name", "ws", "--organization", "org"],
+            destroy=True,
+        )
+
+        self.mock_sp.workspaces.assert_called_once_with("delete", "--id", "1")
+        self.assertNotIn(("pipelines", "org/ws"), self.overwrite.block_jsondata)
+        self.assertIn(("pipelines", "org/other"), self.overwrite.block_jsondata)
+        self.assertFalse(
+            self.overwrite.block_jsondata[("workspaces", "org")].exists(
+                "workspaceName", "ws"
+            )
+        )
+
+
+class TestOverwritePrefetch(unittest.TestCase):
+    def setUp(self):
+        self.mock_sp = Mock()
+        self.mock_sp.suppress_output.return_value.__enter__ = Mock()
+        self.mock_sp.suppress_output.return_value.__exit__ = Mock()
+        self.overwrite = Overwrite(self.mock_sp)
+        self.cmd_args_dict = {
+            "teams": [
+                {"cmd_args": (["--name", "team", "--organization", "org"], [])},
+            ],
+            "pipelines": [
+                {"cmd_args": ["--name", "p1", "--workspace", "org/ws1"]},
+                {"cmd_args": ["--name", "p2", "--workspace", "org/ws2"]},
+                {"cmd_args": ["--name", "p3", "--workspace", "org/ws1"]},
+            ],
+            "launch": [{"cmd_args": ["--workspace", "org/ws1", "p1"]}],
+        }
+
+    def test_prefetch_fetches_each_list_once(self):
+        json_method_mock = Mock(return_value=json.dumps({}))
+        self.mock_sp.configure_mock(**{"-o json": json_method_mock})
+
+        self.assertEqual(self.overwrite.prefetch(self.cmd_args_dict), 3)
+        self.assertEqual(json_method_mock.call_count, 3)
+        json_method_mock.assert_any_call("teams", "list", "-o", "org")
+        json_method_mock.assert_any_call("pipelines", "list", "-w", "org/ws1")
+        json_method_mock.assert_any_call("pipelines", "list", "-w", "org/ws2")
+
+        self.overwrite.handle_overwrite(
+            "pipelines", ["--name", "p1", "--workspace", "org/ws1"]
+        )
+        self.assertEqual(json_method_mock.call_count, 3)
+
+    def test_prefetch_skips_lists_that_fail(self):
+        # The workspace and organization are created later in the run
+        def run(full_cmd):
+            command = " ".join(full_cmd) if isinstance(full_cmd, list) else full_cmd
+            if "org/ws2" in command:
+                return 1, "ERROR: Workspace 'org/ws2' not found"
+            if "teams" in command:
+                return 1, "ERROR: Failed to list teams: 500 Internal Server Error"
+            return 0, json.dumps({"pipelines": []})
+
+        executor = Mock()
+        executor.run.side_effect = run
+        overwrite = Overwrite(SeqeraPlatform(executor=executor))
+
+        self.assertEqual(overwrite.prefetch(self.cmd_args_dict), 1)
+        self.assertIn(("pipelines", "org/ws1"), overwrite.block_jsondata)
+        self.assertNotIn(("pipelines", "org/ws2"), overwrite.block_jsondata)
+        self.assertNotIn(("teams", "org"), overwrite.block_jsondata)
+
+
+class TestOverwriteUpdate(unittest.TestCase):
+    def setUp(self):
+        self.mock_sp = Mock()
+        self.mock_sp.suppress_output.return_value.__enter__ = Mock()
+        self.mock_sp.suppress_output.return_value.__exit__ = Mock()
+        self.overwrite = Overwrite(self.mock_sp)
+
+    def set_list_output(self, data):
+        self.mock_sp.configure_mock(**{"-o json": Mock(return_value=json.dumps(data))})
+
+    def test_pipeline_updated_in_place(self):
+        self.set_list_output({"pipelines": [{"name": "p"}]})
+        args = [
+            "--name",
+            "p",
+            "--workspace",
+            "org/ws",
+            "--revision",
+            "main",
+            "https://github.com/org/p",
+        ]
+
+        result = self.overwrite.handle_overwrite("pipelines", args, OnExists.UPDATE)
+
+        self.assertFalse(result)
+        self.mock_sp.pipelines.assert_called_once_with(
+            "update",
+            "--name",
+            "p",
+            "--workspace",
+            "org/ws",
+            "--revision",
+            "main",
+            "--pipeline",
+            "https://github.com/org/p",
+        )
+
+    def test_label_updated_by_id(self):
+        self.set_list_output({"labels": [{"name": "l", "value": "old", "id": 7}]})
+        args = ["--name", "l", "--value", "new", "--workspace", "org/ws"]
+
+        result = self.overwrite.handle_overwrite("labels", args, "update")
+
+        self.assertFalse(result)
+        self.mock_sp.labels.assert_called_once_with(
+            "update", "--id", "7", "--value", "new", "-w", "org/ws"
+        )
+
+    def test_workspace_updated_by_id(self):
+        self.set_list_output(
+            {
+                "workspaces": [
+                    {"workspaceName": "ws", "orgName": "org", "workspaceId": 3}
+                ]
+            }
+        )
+        args = ["--name", "ws", "--organization", "org", "--full-name", "WS"]
+
+        self.overwrite.handle_overwrite("workspaces", args, OnExists.UPDATE)
+
+        self.mock_sp.workspaces.assert_called_once_with(
+            "update", "--id", "3", "--full-name", "WS"
+        )
+
+    def test_fallback_to_overwrite(self):
+        self.set_list_output({"pipelines": [{"name": "p"}]})
+        args = [
+            "--name",
+            "p",
+            "--workspace",
+            "org/ws",
+            "--labels",
+            "a,b",
+            "https://github.com/org/p",
+        ]
+
+        result = self.overwrite.handle_overwrite("pipelines", args, OnExists.UPDATE)
+
+        self.assertTrue(result)
+        self.mock_sp.pipelines.assert_called_once_with(
+            "delete", "--name", "p", "--workspace", "org/ws"
+        )
+
+    def test_compute_envs_are_not_updated_in_place(self):
+        self.assertFalse(
+            self.overwrite.can_update(
+                "compute-envs", ["aws-batch", "--name", "ce", "--workspace", "org/ws"]
+            )
+        )
+
+    def test_missing_resource_is_created(self):
+        self.set_list_output({"pipelines": []})
+        args = ["--name", "p", "--workspace", "org/ws", "https://github.com/org/p"]
+
+        result = self.overwrite.handle_overwrite("pipelines", args, OnExists.UPDATE)
+
+        self.assertTrue(result)
+        self.mock_sp.pipelines.assert_not_called()
+
+
 # TODO: tests for destroy and JSON caching
 
 if __name__ == "__main__":
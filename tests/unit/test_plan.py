@@ -0,0 +1,235 @@
+import json
+import unittest
+from unittest.mock import Mock
+
+from seqerakit import cli, plan
+from seqerakit.on_exists import OnExists
+from seqerakit.overwrite import Overwrite
+from seqerakit.seqeraplatform import SeqeraPlatform
+
+
+def resource(*cmd_args):
+    return {"cmd_args": list(cmd_args)}
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.mock_sp = Mock()
+        self.mock_sp.suppress_output.return_value.__enter__ = Mock()
+        self.mock_sp.suppress_output.return_value.__exit__ = Mock()
+        self.lists = {
+            "pipelines": {
+                "pipelines": [
+                    {
+                        "name": "same",
+                        "description": "desc",
+                        "repository": "https://github.com/org/same",
+                    },
+                    {
+                        "name": "changed",
+                        "description": "old",
+                        "repository": "https://github.com/org/changed",
+                    },
+                ]
+            },
+            "participants": {
+                "participants": [{"email": "user@org.com", "wspRole": "launch"}]
+            },
+        }
+        self.json_method = Mock(
+            side_effect=lambda block, *args: json.dumps(self.lists.get(block, {}))
+        )
+        self.mock_sp.configure_mock(**{"-o json": self.json_method})
+        self.overwrite = Overwrite(self.mock_sp)
+        self.cmd_args_dict = {
+            "participants": [
+                resource(
+                    "--name",
+                    "user@org.com",
+                    "--type",
+                    "MEMBER",
+                    "--workspace",
+                    "org/ws",
+                    "--role",
+                    "LAUNCH",
+                ),
+            ],
+            "pipelines": [
+                resource(
+                    "--name",
+                    "same",
+                    "--workspace",
+                    "org/ws",
+                    "--description",
+                    "desc",
+                    "https://github.com/org/same",
+                ),
+                resource(
+                    "--name",
+                    "changed",
+                    "--workspace",
+                    "org/ws",
+                    "--description",
+                    "new",
+                    "https://github.com/org/changed",
+                ),
+                resource(
+                    "--name",
+                    "new",
+                    "--workspace",
+                    "org/ws",
+                    "https://github.com/org/new",
+                ),
+            ],
+            "launch": [resource("--workspace", "org/ws", "same")],
+        }
+
+    def test_classifies_resources(self):
+        resource_plan = plan.build_plan(self.overwrite, self.cmd_args_dict)
+
+        actions = [(c.block, c.name, c.action) for c in resource_plan.changes]
+        self.assertEqual(
+            actions,
+            [
+                ("participants", "user@org.com", plan.UNCHANGED),
+                ("pipelines", "same", plan.UNCHANGED),
+                ("pipelines", "changed", plan.UPDATE),
+                ("pipelines", "new", plan.CREATE),
+                ("launch", None, plan.CREATE),
+            ],
+        )
+        self.assertEqual(
+            resource_plan.changes[2].changes, {"description": ("old", "new")}
+        )
+
+    def test_only_list_calls_are_made(self):
+        plan.build_plan(self.overwrite, self.cmd_args_dict)
+
+        self.assertEqual(self.json_method.call_count, 2)
+        for call in self.json_method.call_args_list:
+            self.assertEqual(call.args[1], "list")
+        self.mock_sp.pipelines.assert_not_called()
+        self.mock_sp.participants.assert_not_called()
+
+    def test_destroy_plan(self):
+        resource_plan = plan.build_plan(
+            self.overwrite, self.cmd_args_dict, destroy=True
+        )
+
+        self.assertEqual(
+            [c.action for c in resource_plan.changes],
+            [plan.DELETE, plan.DELETE, plan.DELETE, plan.UNCHANGED, plan.UNCHANGED],
+        )
+
+    def test_pending_skips_unchanged_and_updates_changed(self):
+        resource_plan = plan.build_plan(self.overwrite, self.cmd_args_dict)
+        pending = resource_plan.pending()
+
+        self.assertNotIn("participants", pending)
+        self.assertEqual(
+            [args.get("on_exists") for args in pending["pipelines"]],
+            ["update", None],
+        )
+        self.assertEqual(len(pending["launch"]), 1)
+
+    def test_plan_output(self):
+        resource_plan = plan.build_plan(self.overwrite, self.cmd_args_dict)
+
+        text = resource_plan.to_text()
+        self.assertIn(
+            "Plan: 2 to create, 1 to update, 0 to delete, 2 unchanged, 0 unknown.", text
+        )
+        self.assertIn("  ~ pipelines changed (org/ws)", text)
+        self.assertIn("      description: 'old' -> 'new'", text)
+
+        data = json.loads(resource_plan.to_json())
+        self.assertEqual(data["summary"][plan.UPDATE], 1)
+        self.assertEqual(
+            data["resources"][2]["changes"],
+            {"description": {"current": "old", "desired": "new"}},
+        )
+
+    def test_uncompared_options_are_unknown(self):
+        self.lists["credentials"] = {"credentials": [{"name": "creds"}]}
+        self.lists["compute-envs"] = {"computeEnvs": [{"name": "ce"}]}
+        cmd_args_dict = {
+            "credentials": [
+                resource("--name", "creds", "--workspace", "org/ws", "--password", "x")
+            ],
+            "compute-envs": [
+                dict(
+                    resource("aws-batch", "--name", "ce", "--workspace", "org/ws"),
+                    on_exists=OnExists.FAIL,
+                ),
+                dict(
+                    resource("aws-batch", "--name", "ce", "--workspace", "org/ws"),
+                    on_exists=OnExists.OVERWRITE,
+                ),
+            ],
+            "pipelines": [
+                resource(
+                    "--name",
+                    "same",
+                    "--workspace",
+                    "org/ws",
+                    "--description",
+                    "desc",
+                    "--revision",
+                    "dev",
+                    "https://github.com/org/same",
+                ),
+            ],
+        }
+
+        resource_plan = plan.build_plan(self.overwrite, cmd_args_dict)
+
+        self.assertEqual([c.action for c in resource_plan.changes], [plan.UNKNOWN] * 4)
+        self.assertEqual(resource_plan.changes[0].uncompared, ["--password"])
+        self.assertEqual(resource_plan.changes[1].uncompared, ["aws-batch"])
+        self.assertIn(
+            "  ? pipelines same (org/ws)\n      not compared: --revision",
+            resource_plan.to_text(),
+        )
+        # Compute environments cannot be updated in place, they are only
+        # created again if their on_exists allows it
+        pending = resource_plan.pending()
+        self.assertEqual(pending["credentials"][0]["on_exists"], "update")
+        self.assertEqual(pending["pipelines"][0]["on_exists"], "update")
+        self.assertEqual(
+            [args["on_exists"] for args in pending["compute-envs"]],
+            [OnExists.OVERWRITE],
+        )
+
+    def test_scope_created_by_configuration(self):
+        executor = Mock()
+        executor.run.return_value = (1, "ERROR: Workspace 'org/new' not found")
+        overwrite = Overwrite(SeqeraPlatform(executor=executor))
+        cmd_args_dict = {
+            "pipelines": [
+                resource("--name", name, "--workspace", "org/new", "https://a.b/c")
+                for name in ("p1", "p2")
+            ]
+        }
+
+        resource_plan = plan.build_plan(overwrite, cmd_args_dict)
+
+        self.assertEqual(
+            [c.action for c in resource_plan.changes], [plan.CREATE, plan.CREATE]
+        )
+        executor.run.assert_called_once()
+
+
+class TestPlanCommand(unittest.TestCase):
+    def test_command_before_yaml_files(self):
+        options = cli.parse_args(["plan", "file.yaml"])
+        self.assertEqual(options.command, "plan")
+        self.assertEqual(options.yaml, ["file.yaml"])
+
+    def test_no_command(self):
+        options = cli.parse_args(["file.yaml"])
+        self.assertIsNone(options.command)
+        self.assertEqual(options.yaml, ["file.yaml"])
+
+
+if __name__ == "__main__":
+    unittest.main()
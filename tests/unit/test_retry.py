@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from seqerakit import cli, seqeraplatform
+from seqerakit.retry import RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classifies_transient_errors(self):
+        policy = RetryPolicy(retries=1)
+        for output in [
+            "ERROR: Unexpected response: 429 Too Many Requests",
+            "ERROR: 502 Bad Gateway",
+            "ERROR: Service Unavailable",
+            "ERROR: Read timed out",
+            "ERROR: Connection reset by peer",
+        ]:
+            self.assertTrue(policy.is_retryable(output), output)
+        for output in [
+            "ERROR: Workspace 'org/ws' not found",
+            "ERROR: Pipeline 'p' already exists",
+            "ERROR: Unknown option '--foo'",
+            # Status codes in resource names are not transient errors
+            "ERROR: Compute environment 'ce-502' not found",
+            "ERROR: Unknown pipeline 'hello-504'",
+            "ERROR: Workspace 'org/ws' not found after HTTP 503",
+        ]:
+            self.assertFalse(policy.is_retryable(output), output)
+        self.assertTrue(policy.is_retryable("ERROR: status code: 504"))
+        self.assertIsNone(
+            RetryPolicy(retries=3).next_delay(
+                1, 1, "ERROR: Pipeline 'hello-504' already exists", 0
+            )
+        )
+
+    def test_mutating_commands(self):
+        policy = RetryPolicy(retries=1)
+        launch = ["launch", "--workspace", "org/ws", "hello"]
+        add = ["pipelines", "add", "--name", "hello"]
+        # A gateway timeout may come after the run was launched
+        self.assertFalse(policy.is_retryable("ERROR: 504 Gateway Timeout", launch))
+        self.assertTrue(policy.is_retryable("ERROR: 429 Too Many Requests", launch))
+        self.assertTrue(policy.is_retryable("ERROR: 504 Gateway Timeout", add))
+        self.assertTrue(
+            policy.is_retryable("ERROR: 504 Gateway Timeout", ["pipelines", "list"])
+        )
+
+    @patch("seqerakit.retry.random.uniform", side_effect=lambda low, high: high)
+    def test_exponential_backoff(self, mock_uniform):
+        policy = RetryPolicy(retries=5, base_delay=1, max_delay=5)
+        delays = [
+            policy.next_delay(attempt, 1, "ERROR: HTTP 503", started=0)
+            for attempt in range(1, 7)
+        ]
+        self.assertEqual(delays, [1, 2, 4, 5, 5, None])
+        self.assertEqual(policy.retried_commands, 1)
+        self.assertEqual(policy.total_retries, 5)
+
+    def test_no_retry_on_success_or_permanent_error(self):
+        policy = RetryPolicy(retries=3)
+        self.assertIsNone(policy.next_delay(1, 0, "429", started=0))
+        self.assertIsNone(policy.next_delay(1, 1, "ERROR: not found", started=0))
+
+    @patch("seqerakit.retry.time.monotonic", return_value=100)
+    def test_deadline(self, mock_monotonic):
+        policy = RetryPolicy(retries=3, base_delay=1, deadline=10)
+        self.assertIsNotNone(policy.next_delay(1, 1, "ERROR: status 504", started=95))
+        self.assertIsNone(policy.next_delay(2, 1, "ERROR: status 504", started=80))
+
+    def test_configure_from_yaml_settings(self):
+        policy = RetryPolicy()
+        policy.configure(
+            **{"retries": 2, "base-delay": 0.5, "patterns": ["quota exceeded"]}
+        )
+        self.assertEqual(policy.retries, 2)
+        self.assertEqual(policy.base_delay, 0.5)
+        self.assertTrue(policy.is_retryable("ERROR: Quota exceeded"))
+
+        with self.assertRaises(ValueError):
+            policy.configure(attempts=2)
+        with self.assertRaises(ValueError):
+            policy.configure(retries=-1)
+
+    def test_cli_options_override_yaml(self):
+        options = cli.parse_args(["--retries", "4", "file.yaml"])
+        policy = RetryPolicy()
+        cli.configure_retries(policy, {"retries": 2, "deadline": 60}, options)
+        self.assertEqual(policy.retries, 4)
+        self.assertEqual(policy.deadline, 60)
+
+
+@patch("seqerakit.retry.random.uniform", return_value=0)
+class TestSeqeraPlatformRetry(unittest.TestCase):
+    def setUp(self):
+        self.executor = MagicMock()
+        self.policy = RetryPolicy(retries=2)
+        self.sp = seqeraplatform.SeqeraPlatform(
+            executor=self.executor, retry_policy=self.policy
+        )
+
+    def test_transient_error_is_retried(self, mock_uniform):
+        self.executor.run.side_effect = [
+            (1, "ERROR: 502 Bad Gateway"),
+            (0, "Pipeline 'p' added"),
+        ]
+        self.assertEqual(
+            self.sp.pipelines("add", "--name", "p", "--workspace", "org/ws"),
+            "Pipeline 'p' added",
+        )
+        self.assertEqual(self.executor.run.call_count, 2)
+        self.assertEqual(self.policy.total_retries, 1)
+
+    def test_exists_after_retried_add_is_success(self, mock_uniform):
+        self.executor.run.side_effect = [
+            (1, "ERROR: 504 Gateway Timeout"),
+            (1, "ERROR: Pipeline 'p' already exists"),
+        ]
+        self.sp.pipelines("add", "--name", "p", "--workspace", "org/ws")
+        self.assertEqual(self.executor.run.call_count, 2)
+
+        self.executor.run.side_effect = [(1, "ERROR: Pipeline 'p' already exists")]
+        with self.assertRaises(seqeraplatform.ResourceExistsError):
+            self.sp.pipelines("add", "--name", "p", "--workspace", "org/ws")
+
+    def test_launch_not_retried_after_gateway_timeout(self, mock_uniform):
+        self.executor.run.return_value = (1, "ERROR: 504 Gateway Timeout")
+        with self.assertRaises(seqeraplatform.CommandError):
+            self.sp.launch("--workspace", "org/ws", "hello")
+        self.executor.run.assert_called_once()
+
+    def test_gives_up_after_retries(self, mock_uniform):
+        self.executor.run.return_value = (1, "ERROR: 429 Too Many Requests")
+        with self.assertRaises(seqeraplatform.CommandError):
+            self.sp.pipelines("list", "-w", "org/ws")
+        self.assertEqual(self.executor.run.call_count, 3)
+
+    def test_permanent_error_is_not_retried(self, mock_uniform):
+        self.executor.run.return_value = (1, "ERROR: Workspace not found")
+        with self.assertRaises(seqeraplatform.ResourceNotFoundError):
+            self.sp.pipelines("list", "-w", "org/ws")
+        self.executor.run.assert_called_once()
+
+    @patch("asyncio.create_subprocess_exec")
+    def test_async_transient_error_is_retried(self, mock_exec, mock_uniform):
+        processes = []
+        for returncode, output in [(1, b"ERROR: HTTP 503"), (0, b"ok")]:
+            process = MagicMock()
+            process.returncode = returncode
+            process.communicate = AsyncMock(return_value=(output, b""))
+            processes.append(process)
+        mock_exec.side_effect = processes
+        sp = seqeraplatform.AsyncSeqeraPlatform(retry_policy=RetryPolicy(retries=1))
+
+        result = asyncio.run(sp.pipelines("list", "-w", "org/ws"))
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(mock_exec.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
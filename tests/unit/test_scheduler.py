@@ -0,0 +1,254 @@
+import threading
+import time
+import unittest
+
+from seqerakit import scheduler
+from seqerakit.on_exists import OnExists
+
+
+def resource(*cmd_args):
+    return {"cmd_args": list(cmd_args), "on_exists": OnExists.FAIL}
+
+
+class TestBuildGraph(unittest.TestCase):
+    def setUp(self):
+        self.cmd_args_dict = self.cmd_args_dict_fixture()
+
+    @staticmethod
+    def cmd_args_dict_fixture():
+        return {
+            "organizations": [resource("--name", "org")],
+            "workspaces": [
+                resource("--name", "ws1", "--organization", "org"),
+                resource("--name", "ws2", "--organization", "org"),
+            ],
+            "credentials": [
+                resource("aws", "--name", "creds", "--workspace", "org/ws1")
+            ],
+            "compute-envs": [
+                resource(
+                    "aws-batch",
+                    "forge",
+                    "--name",
+                    "ce",
+                    "--credentials",
+                    "creds",
+                    "--workspace",
+                    "org/ws1",
+                )
+            ],
+            "pipelines": [
+                resource(
+                    "--name",
+                    "hello",
+                    "--workspace",
+                    "org/ws1",
+                    "--compute-env",
+                    "ce",
+                    "https://github.com/nextflow-io/hello",
+                ),
+                resource(
+                    "--name",
+                    "hello",
+                    "--workspace",
+                    "org/ws2",
+                    "https://github.com/nextflow-io/hello",
+                ),
+            ],
+            "launch": [
+                resource(
+                    "--name",
+                    "run",
+                    "--workspace",
+                    "org/ws1",
+                    "hello",
+                    "--params-file",
+                    "/tmp/params.yaml",
+                )
+            ],
+        }
+
+    def deps(self, nodes, index):
+        return {(nodes[i].block, i) for i in nodes[index].dependencies}
+
+    def test_edges_follow_references(self):
+        nodes = scheduler.build_graph(self.cmd_args_dict)
+
+        self.assertEqual(self.deps(nodes, 0), set())
+        self.assertEqual(self.deps(nodes, 1), {("organizations", 0)})
+        self.assertEqual(self.deps(nodes, 3), {("workspaces", 1), ("organizations", 0)})
+        self.assertIn(("credentials", 3), self.deps(nodes, 4))
+        self.assertIn(("compute-envs", 4), self.deps(nodes, 5))
+        self.assertEqual(self.deps(nodes, 6), {("workspaces", 2), ("organizations", 0)})
+        self.assertIn(("pipelines", 5), self.deps(nodes, 7))
+        self.assertNotIn(("pipelines", 6), self.deps(nodes, 7))
+
+    def test_edges_reversed_for_destroy(self):
+        nodes = scheduler.build_graph(self.cmd_args_dict, destroy=True)
+
+        self.assertEqual(nodes[7].dependencies, set())
+        self.assertIn(7, nodes[5].dependencies)
+        self.assertIn(4, nodes[3].dependencies)
+
+    def test_unknown_references_have_no_edges(self):
+        nodes = scheduler.build_graph(
+            {"pipelines": [resource("--name", "p", "--workspace", "org/other")]}
+        )
+        self.assertEqual(nodes[0].dependencies, set())
+
+
+class TestRunGraph(unittest.TestCase):
+    def test_dependencies_complete_first(self):
+        cmd_args_dict = {
+            "workspaces": [resource("--name", "ws", "--organization", "org")],
+            "credentials": [
+                resource("aws", "--name", f"creds{i}", "--workspace", "org/ws")
+                for i in range(4)
+            ],
+        }
+        nodes = scheduler.build_graph(cmd_args_dict)
+        finished = []
+        lock = threading.Lock()
+
+        def handler(node):
+            time.sleep(0.01)
+            with lock:
+                finished.append(node.index)
+
+        scheduler.run_graph(nodes, handler, jobs=4)
+
+        self.assertEqual(finished[0], 0)
+        self.assertEqual(sorted(finished), [0, 1, 2, 3, 4])
+
+    def test_independent_resources_run_concurrently(self):
+        cmd_args_dict = {
+            "credentials": [
+                resource("aws", "--name", "creds", "--workspace", f"org/ws{i}")
+                for i in range(4)
+            ]
+        }
+        nodes = scheduler.build_graph(cmd_args_dict)
+        barrier = threading.Barrier(4, timeout=5)
+
+        scheduler.run_graph(nodes, lambda node: barrier.wait(), jobs=4)
+
+    def test_fail_fast(self):
+        cmd_args_dict = {
+            "workspaces": [resource("--name", "ws", "--organization", "org")],
+            "credentials": [
+                resource("aws", "--name", "creds", "--workspace", "org/ws")
+            ],
+        }
+        nodes = scheduler.build_graph(cmd_args_dict)
+        called = []
+
+        def handler(node):
+            called.append(node.block)
+            if node.block == "workspaces":
+                raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            scheduler.run_graph(nodes, handler, jobs=2)
+        self.assertEqual(called, ["workspaces"])
+
+    def test_circular_references(self):
+        nodes = [scheduler.ResourceNode(0, "a", {}), scheduler.ResourceNode(1, "b", {})]
+        nodes[0].dependencies.add(1)
+        nodes[0].dependents.add(1)
+        nodes[1].dependencies.add(0)
+        nodes[1].dependents.add(0)
+
+        with self.assertRaises(ValueError):
+            scheduler.run_graph(nodes, lambda node: None, jobs=2)
+
+
+class TestRunStream(unittest.TestCase):
+    def setUp(self):
+        self.cmd_args_dict = TestBuildGraph.cmd_args_dict_fixture()
+
+    def items(self):
+        for block, args_list in self.cmd_args_dict.items():
+            for args in args_list:
+                yield block, args
+
+    def assert_dependencies_first(self, destroy):
+        graph = scheduler.build_graph(self.cmd_args_dict, destroy=destroy)
+        items = list(self.items())
+        # Resources are deleted in the reverse order of the configuration
+        position = list(range(len(items)))
+        if destroy:
+            items.reverse()
+            position.reverse()
+        started = {}
+        finished = []
+        lock = threading.Lock()
+
+        def handler(node):
+            with lock:
+                started[position[node.index]] = list(finished)
+            time.sleep(0.01)
+            with lock:
+                finished.append(position[node.index])
+
+        scheduler.run_stream(items, handler, jobs=4, destroy=destroy)
+
+        self.assertEqual(sorted(finished), list(range(len(graph))))
+        for node in graph:
+            for dependency in node.dependencies:
+                self.assertIn(dependency, started[node.index])
+
+    def test_dependencies_complete_first(self):
+        self.assert_dependencies_first(destroy=False)
+
+    def test_dependencies_complete_first_for_destroy(self):
+        self.assert_dependencies_first(destroy=True)
+
+    def test_parses_while_running(self):
+        parsed_second = threading.Event()
+
+        def items():
+            yield "credentials", resource("aws", "--name", "a", "--workspace", "o/w")
+            parsed_second.set()
+            yield "credentials", resource("aws", "--name", "b", "--workspace", "o/w")
+
+        waited = []
+        scheduler.run_stream(
+            items(), lambda node: waited.append(parsed_second.wait(5)), jobs=1
+        )
+        self.assertEqual(waited, [True, True])
+
+    def test_window_limits_parsed_resources(self):
+        parsed = []
+        finished = []
+        outstanding = []
+        lock = threading.Lock()
+
+        def items():
+            for i in range(20):
+                parsed.append(i)
+                yield "credentials", resource("aws", "--name", f"c{i}")
+
+        def handler(node):
+            with lock:
+                outstanding.append(len(parsed) - len(finished))
+            time.sleep(0.001)
+            with lock:
+                finished.append(node.index)
+
+        scheduler.run_stream(items(), handler, jobs=2, window=3)
+        self.assertEqual(sorted(finished), list(range(20)))
+        self.assertLessEqual(max(outstanding), 3)
+
+    def test_iterator_error(self):
+        def items():
+            yield "workspaces", resource("--name", "ws", "--organization", "org")
+            raise ValueError("Duplicate name key")
+
+        called = []
+        with self.assertRaises(ValueError):
+            scheduler.run_stream(items(), lambda node: called.append(node.block))
+        self.assertEqual(called, ["workspaces"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from seqerakit import seqeraplatform
 from seqerakit.seqeraplatform import CommandError
 import json
@@ -480,5 +481,68 @@ class TestSeqeraPlatformOutputHandling(unittest.TestCase):
             mock_logging.assert_any_call(" Command output: Command output")
 
 
+class TestAsyncSeqeraPlatform(unittest.TestCase):
+    def setUp(self):
+        self.sp = seqeraplatform.AsyncSeqeraPlatform(json=True, max_concurrency=2)
+
+    def mock_process(self, stdout, returncode=0):
+        process = MagicMock(returncode=returncode)
+        process.communicate = AsyncMock(return_value=(stdout, None))
+        return process
+
+    @patch("asyncio.create_subprocess_exec", new_callable=AsyncMock)
+    def test_awaitable_subcommand(self, mock_exec):
+        mock_exec.return_value = self.mock_process(b'{"key": "value"}')
+
+        result = asyncio.run(self.sp.pipelines("view", "--name", "pipeline_name"))
+
+        self.assertEqual(result, {"key": "value"})
+        mock_exec.assert_called_once_with(
+            "/bin/sh",
+            "-c",
+            "tw -o json pipelines view --name pipeline_name",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+
+    @patch("asyncio.create_subprocess_exec", new_callable=AsyncMock)
+    def test_error_handling(self, mock_exec):
+        mock_exec.return_value = self.mock_process(
+            b"ERROR: Resource already exists", returncode=1
+        )
+
+        with self.assertRaises(seqeraplatform.ResourceExistsError):
+            asyncio.run(self.sp.pipelines("add", "--name", "pipeline_name"))
+
+    def test_concurrency_is_bounded(self):
+        running = 0
+        peak = 0
+
+        async def fake_exec(*args, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return self.mock_process(b"{}")
+
+        async def launch_all():
+            return await asyncio.gather(
+                *(self.sp.pipelines("list", "-w", f"org/ws{i}") for i in range(6))
+            )
+
+        with patch("asyncio.create_subprocess_exec", side_effect=fake_exec):
+            results = asyncio.run(launch_all())
+
+        self.assertEqual(results, [{}] * 6)
+        self.assertEqual(peak, 2)
+
+    @patch("asyncio.create_subprocess_exec", new_callable=AsyncMock)
+    def test_dryrun(self, mock_exec):
+        self.sp.dryrun = True
+        self.assertIsNone(asyncio.run(self.sp.info()))
+        mock_exec.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from seqerakit import cli
+from seqerakit.state import StateJournal, resource_digest, resource_key
+
+
+class TestStateJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.json")
+        self.cmd_args = ["--name", "creds", "--workspace", "org/ws", "--key", "k"]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_resource_key(self):
+        self.assertEqual(
+            resource_key("credentials", self.cmd_args), "credentials/org/ws/creds"
+        )
+        self.assertEqual(
+            resource_key("teams", (["--name", "t", "--organization", "org"], [])),
+            "teams/org/t",
+        )
+        self.assertEqual(
+            resource_key("organizations", ["--name", "org"]), "organizations/org"
+        )
+
+    def test_digest_uses_file_contents(self):
+        def params_file(content):
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.tmpdir.name, suffix=".yaml", delete=False
+            ) as f:
+                f.write(content)
+            return f.name
+
+        first = resource_digest(["--name", "p", "--params-file", params_file("a: 1")])
+        same = resource_digest(["--name", "p", "--params-file", params_file("a: 1")])
+        changed = resource_digest(["--name", "p", "--params-file", params_file("a: 2")])
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, changed)
+
+    def test_digest_expands_environment_variables(self):
+        cmd_args = ["--name", "p", "--description", "$SEQERAKIT_TEST_STATE"]
+        with patch.dict(os.environ, {"SEQERAKIT_TEST_STATE": "one"}):
+            first = resource_digest(cmd_args)
+        with patch.dict(os.environ, {"SEQERAKIT_TEST_STATE": "two"}):
+            second = resource_digest(cmd_args)
+        self.assertNotEqual(first, second)
+
+    def test_unchanged_after_save(self):
+        journal = StateJournal(self.path)
+        self.assertFalse(journal.is_unchanged("credentials", self.cmd_args))
+        journal.record("credentials", self.cmd_args)
+        journal.save()
+
+        journal = StateJournal(self.path)
+        self.assertTrue(journal.is_unchanged("credentials", self.cmd_args))
+        self.assertFalse(
+            journal.is_unchanged("credentials", self.cmd_args[:-1] + ["other"])
+        )
+        self.assertEqual(journal.skipped, 1)
+
+    def test_force_ignores_journal(self):
+        journal = StateJournal(self.path)
+        journal.record("credentials", self.cmd_args)
+        journal.force = True
+        self.assertFalse(journal.is_unchanged("credentials", self.cmd_args))
+
+    def test_launch_is_not_tracked(self):
+        journal = StateJournal(self.path)
+        cmd_args = ["--workspace", "org/ws", "hello"]
+        journal.record("launch", cmd_args)
+        self.assertFalse(journal.is_unchanged("launch", cmd_args))
+
+    def test_forget_and_save(self):
+        journal = StateJournal(self.path)
+        journal.save()
+        self.assertFalse(os.path.exists(self.path))
+
+        journal.record("credentials", self.cmd_args)
+        journal.save()
+        journal.forget("credentials", self.cmd_args)
+        journal.save()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"version": 1, "resources": {}})
+
+
+class TestBlockParserState(unittest.TestCase):
+    def setUp(self):
+        self.sp = MagicMock()
+        self.sp.global_on_exists = None
+        self.sp.overwrite = False
+        self.journal = MagicMock()
+        self.block_parser = cli.BlockParser(
+            self.sp, ["credentials"], state_journal=self.journal
+        )
+        self.block_parser.overwrite_method = MagicMock()
+        self.args = {"cmd_args": ["--name", "creds", "--workspace", "org/ws"]}
+
+    def test_unchanged_resource_is_skipped(self):
+        self.journal.is_unchanged.return_value = True
+        self.block_parser.handle_block("credentials", self.args)
+
+        self.block_parser.overwrite_method.handle_overwrite.assert_not_called()
+        self.sp.credentials.assert_not_called()
+        self.journal.record.assert_not_called()
+
+    def test_changed_resource_is_recorded(self):
+        self.journal.is_unchanged.return_value = False
+        self.block_parser.handle_block("credentials", self.args)
+
+        self.sp.credentials.assert_called_once_with("add", *self.args["cmd_args"])
+        self.journal.record.assert_called_once_with(
+            "credentials", self.args["cmd_args"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from seqerakit import seqeraplatform, tracing
+
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        tracing.stop()
+
+    def test_disabled_by_default(self):
+        self.assertIs(tracing.span("name"), tracing.span("other"))
+        self.assertIsNone(tracing.stop())
+
+    def test_spans_as_chrome_trace_events(self):
+        tracer = tracing.start()
+        with tracing.span("outer", "parse", block="pipelines"):
+            with tracing.span("inner"):
+                pass
+
+        inner, outer = tracer.events
+        self.assertEqual(outer["name"], "outer")
+        self.assertEqual(outer["cat"], "parse")
+        self.assertEqual(outer["ph"], "X")
+        self.assertEqual(outer["args"], {"block": "pipelines"})
+        self.assertNotIn("args", inner)
+        self.assertLessEqual(outer["ts"], inner["ts"])
+        self.assertGreaterEqual(outer["ts"] + outer["dur"], inner["ts"] + inner["dur"])
+
+    def test_traced_decorator(self):
+        @tracing.traced("parse")
+        def parse(value):
+            return value * 2
+
+        self.assertEqual(parse(2), 4)
+        tracer = tracing.start()
+        self.assertEqual(parse(3), 6)
+        self.assertEqual([e["name"] for e in tracer.events], ["parse"])
+
+    def test_write_with_thread_names(self):
+        tracing.start()
+
+        def work():
+            with tracing.span("work"):
+                pass
+
+        thread = threading.Thread(target=work, name="worker")
+        with tracing.span("main"):
+            pass
+        thread.start()
+        thread.join()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            tracing.stop().write(path)
+            with open(path) as f:
+                data = json.load(f)
+
+        names = {e["args"]["name"] for e in data["traceEvents"] if e["ph"] == "M"}
+        self.assertIn("worker", names)
+        self.assertIn("main", [e["name"] for e in data["traceEvents"]])
+
+    def test_seqeraplatform_commands(self):
+        executor = MagicMock()
+        executor.run.return_value = (0, "[]")
+        sp = seqeraplatform.SeqeraPlatform(executor=executor, json=True)
+        tracer = tracing.start()
+
+        sp.pipelines("list", "-w", "org/ws")
+
+        self.assertEqual(
+            [(e["name"], e["cat"]) for e in tracer.events],
+            [("tw pipelines list", "command")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
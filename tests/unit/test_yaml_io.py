@@ -0,0 +1,60 @@
+import importlib.util
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from seqerakit import utils, yaml_io
+
+DOCUMENT = """
+pipelines:
+  - name: 'pipeline'
+    workspace: 'org/ws'
+    revision: 1.10
+    params:
+      outdir: 's3://bucket'
+      flags: [yes, no, ~]
+      date: 2024-01-01
+"""
+
+
+def load_module_without_libyaml():
+    spec = importlib.util.spec_from_file_location("yaml_io_fallback", yaml_io.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with patch.dict(yaml.__dict__):
+        del yaml.__dict__["CSafeLoader"]
+        del yaml.__dict__["CSafeDumper"]
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestYamlIO(unittest.TestCase):
+    def test_backend(self):
+        self.assertEqual(
+            yaml_io.BACKEND, "libyaml" if yaml.__with_libyaml__ else "pure Python"
+        )
+
+    def test_load_like_safe_load(self):
+        self.assertEqual(yaml_io.load(DOCUMENT), yaml.safe_load(DOCUMENT))
+
+    def test_load_rejects_python_tags(self):
+        with self.assertRaises(yaml_io.YAMLError):
+            yaml_io.load("!!python/object/apply:os.system ['true']")
+
+    def test_dump_quoted_str(self):
+        data = {"outdir": utils.quoted_str("s3://bucket"), "count": 2}
+        self.assertEqual(yaml_io.dump(data), 'count: 2\noutdir: "s3://bucket"\n')
+        # The default dumper of PyYAML keeps writing them too
+        self.assertEqual(yaml.dump(data), yaml_io.dump(data))
+
+    def test_pure_python_fallback(self):
+        fallback = load_module_without_libyaml()
+        self.assertEqual(fallback.BACKEND, "pure Python")
+        self.assertIs(fallback.SafeLoader, yaml.SafeLoader)
+        self.assertEqual(fallback.load(DOCUMENT), yaml_io.load(DOCUMENT))
+        data = {"outdir": fallback.quoted_str("s3://bucket")}
+        self.assertEqual(fallback.dump(data), 'outdir: "s3://bucket"\n')
+
+
+if __name__ == "__main__":
+    unittest.main()